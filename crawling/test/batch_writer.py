@@ -0,0 +1,170 @@
+import threading
+import time
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# --- 크롤러 공용 일괄 저장(batch upsert) ---
+# crawler.py 는 가게마다 filter_by(...).first() 조회 + commit 을, prototype.py 는 게시물마다 commit 후
+# IntegrityError 롤백으로 중복을 걸렀습니다. 행마다 커밋하면 그때마다 디스크 동기화가 일어나고
+# 추천 백엔드의 읽기와 겨루는 쓰기 잠금도 그만큼 자주 잡힙니다.
+# BatchWriter 는 행을 모아 두었다가 max_rows 개 또는 max_seconds 초마다 한 트랜잭션으로
+# INSERT ... ON CONFLICT 를 보내고, 새로 넣은 행 / 보완한 행 / 중복이라 건너뛴 행 수를 셉니다.
+#   - mapinformation: _name_address_uc (name, address2) 충돌 시 비어 있던 좌표만 채움
+#     (--refresh-older-than 로 다시 연 가게는 리뷰 수/평점/갱신 시각도 덮어씀)
+#   - instagram_posts: instagram_post_url 충돌 시 건너뜀 (새 게시물의 해시태그는 on_inserted 로 같은 트랜잭션에 저장)
+# 고유 키에 NULL 이 있는 행(주소를 못 읽은 가게)은 NULL 끼리 충돌하지 않으므로, 예전 filter_by(address2=None) 처럼
+# IS NULL 로 기존 행을 찾아 같은 규칙으로 갱신하거나 새로 넣습니다.
+# 저장이 실패하면(예: WAL 에서 잠깐 database is locked) 잠시 뒤 다시 시도하고, 그래도 안 되면 행을 버퍼에 되돌려
+# 다음 저장 때 다시 보냅니다. close() 뒤에도 남은 행이 있으면 예외로 알립니다.
+
+BATCH_ROWS = 50        # 이만큼 모이면 저장
+BATCH_SECONDS = 30.0   # 첫 행이 들어온 뒤 이만큼 지나면 저장
+FLUSH_ATTEMPTS = 3     # 배치 하나를 연달아 시도하는 횟수
+RETRY_DELAY = 1.0      # 다시 시도하기 전 대기(초), 시도마다 두 배
+
+
+def dialect_insert(bind, table):
+    """ON CONFLICT 를 쓸 수 있는 INSERT (SQLite, 또는 DATABASE_URL 이 PostgreSQL 이면 그쪽)"""
+    return (postgresql_insert if bind.dialect.name == "postgresql" else sqlite_insert)(table)
+
+
+class BatchWriter:
+    """table 에 행(dict)을 모아 두었다가 한 번에 upsert 합니다 (여러 스레드가 같이 써도 안전).
+
+    conflict_columns 는 충돌을 판단할 고유 제약 컬럼들이고, 충돌한 기존 행에서 fill_columns 는
+    비어 있을(NULL) 때만 새 값으로 채우고 update_columns 는 새 값으로 덮어씁니다 (둘 다 없으면 건너뜀).
+    on_inserted(connection, last_id) 는 저장한 배치와 같은 트랜잭션에서 불리며,
+    last_id 보다 큰 id 가 이번 배치에서 새로 들어간 행입니다. on_flushed() 는 배치가 커밋된 뒤 불립니다.
+    """
+
+    def __init__(self, engine, table, conflict_columns, fill_columns=(), update_columns=(), on_inserted=None,
+                 on_flushed=None, max_rows=BATCH_ROWS, max_seconds=BATCH_SECONDS):
+        self.engine = engine
+        self.table = table
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.on_inserted = on_inserted
+        self.on_flushed = on_flushed
+        self.stats = {"inserted": 0, "filled": 0, "skipped": 0, "failed": 0, "batches": 0}
+        self.healthy = True  # 마지막 저장이 성공했는지 (실패한 행이 버퍼에 남아 있으면 False)
+        self.conflict_columns = tuple(conflict_columns)
+        self.fill_columns = tuple(fill_columns)
+        self.update_columns = tuple(update_columns)
+        self._statement = self._upsert_statement(conflict_columns, fill_columns, update_columns)
+        self._id_column = list(table.primary_key.columns)[0]
+        self._rows = []
+        self._first_added = None
+        self._lock = threading.Lock()
+
+    def _upsert_statement(self, conflict_columns, fill_columns, update_columns):
+        statement = dialect_insert(self.engine, self.table)
+        if not fill_columns and not update_columns:
+            return statement.on_conflict_do_nothing(index_elements=list(conflict_columns))
+        columns, excluded = self.table.c, statement.excluded
+        assignments = {name: func.coalesce(columns[name], excluded[name]) for name in fill_columns}
+        assignments.update({name: excluded[name] for name in update_columns})
+        # 덮어쓸 컬럼이 없으면 채울 값이 있을 때만 갱신하므로, 나머지는 rowcount 에 들어가지 않습니다 (건너뜀으로 셈)
+        where = None if update_columns else or_(
+            *(and_(columns[name].is_(None), excluded[name].isnot(None)) for name in fill_columns))
+        return statement.on_conflict_do_update(index_elements=list(conflict_columns), set_=assignments, where=where)
+
+    @property
+    def pending(self):
+        """아직 저장하지 않은 행 수"""
+        return len(self._rows)
+
+    def add(self, row):
+        """행 하나를 모읍니다. 개수나 시간이 차면 바로 저장합니다"""
+        with self._lock:
+            if not self._rows:
+                self._first_added = time.monotonic()
+            self._rows.append(row)
+            if len(self._rows) >= self.max_rows or self._due():
+                self._flush()
+
+    def flush_if_due(self):
+        """행을 더 넣지 않는 동안(페이지 이동, 스크롤)에도 max_seconds 가 지났으면 저장합니다"""
+        with self._lock:
+            if self._rows and self._due():
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """남은 행을 저장합니다. 그래도 저장하지 못한 행이 있으면 RuntimeError"""
+        self.flush()
+        if self._rows:
+            raise RuntimeError(f"{self.table.name} 에 저장하지 못한 행이 {len(self._rows)}개 남았습니다.")
+
+    def _due(self):
+        return time.monotonic() - self._first_added >= self.max_seconds
+
+    def _flush(self):
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        for attempt in range(FLUSH_ATTEMPTS):
+            try:
+                inserted, changed = self._write(rows)
+                break
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f" - 일괄 저장 오류 ({self.table.name}, {len(rows)}행, 시도 {attempt + 1}/{FLUSH_ATTEMPTS}): {e}")
+                if attempt + 1 < FLUSH_ATTEMPTS:
+                    time.sleep(RETRY_DELAY * (2 ** attempt))
+        else:
+            # 버리지 않고 버퍼 앞에 되돌려 다음 저장 때 다시 보냅니다
+            self._rows = rows + self._rows
+            self.healthy = False
+            return
+        self.healthy = True
+        self.stats["batches"] += 1
+        self.stats["inserted"] += inserted
+        self.stats["filled"] += changed - inserted
+        self.stats["skipped"] += len(rows) - changed
+        print(f" - {self.table.name} 일괄 저장: {len(rows)}행 중 신규 {inserted}, 보완 {changed - inserted}, "
+              f"중복 {len(rows) - changed}")
+        if self.on_flushed is not None:
+            self.on_flushed()
+
+    def _write(self, rows):
+        """rows 를 한 트랜잭션으로 저장하고 (새로 넣은 행 수, 넣거나 고친 행 수) 를 돌려줍니다"""
+        keyed = [row for row in rows if all(row.get(name) is not None for name in self.conflict_columns)]
+        null_keyed = [row for row in rows if any(row.get(name) is None for name in self.conflict_columns)]
+        with self.engine.begin() as connection:
+            last_id = connection.execute(select(func.max(self._id_column))).scalar() or 0
+            changed = connection.execute(self._statement, keyed).rowcount if keyed else 0
+            changed += sum(self._write_null_keyed(connection, row) for row in null_keyed)
+            inserted = connection.execute(
+                select(func.count()).select_from(self.table).where(self._id_column > last_id)
+            ).scalar()
+            if inserted and self.on_inserted is not None:
+                self.on_inserted(connection, last_id)
+        return inserted, changed
+
+    def _write_null_keyed(self, connection, row):
+        """고유 키에 NULL 이 있는 행: IS NULL 로 기존 행을 찾아 ON CONFLICT 와 같은 규칙으로 갱신, 없으면 넣습니다"""
+        columns = self.table.c
+        match = and_(*(columns[name].is_(None) if row.get(name) is None else columns[name] == row[name]
+                       for name in self.conflict_columns))
+        existing_id = connection.execute(select(self._id_column).where(match).limit(1)).scalar()
+        if existing_id is None:
+            return connection.execute(self.table.insert(), row).rowcount
+        fillable = [name for name in self.fill_columns if row.get(name) is not None]
+        if not fillable and not self.update_columns:
+            return 0
+        values = {name: func.coalesce(columns[name], row.get(name)) for name in self.fill_columns}
+        values.update({name: row.get(name) for name in self.update_columns})
+        statement = update(self.table).where(self._id_column == existing_id).values(values)
+        if not self.update_columns:
+            statement = statement.where(or_(*(columns[name].is_(None) for name in fillable)))
+        return connection.execute(statement).rowcount
+
+    def format_report(self):
+        stats = self.stats
+        return (f"{self.table.name} 저장 결과: 신규 {stats['inserted']}개, 보완 {stats['filled']}개, "
+                f"중복 건너뜀 {stats['skipped']}개 (배치 {stats['batches']}번, 저장 실패 {stats['failed']}번, 남은 행 {self.pending}개)")
@@ -1,26 +1,48 @@
 # 필요 라이브러리 설치
 # pip install selenium pandas openpyxl webdriver-manager
 
+import argparse
+import json
+import math
+import os
+import queue
+import re
+import threading
 import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from model import SessionLocal
 from model import mapinformation
+from sqlalchemy import select
+from batch_writer import BATCH_ROWS, BATCH_SECONDS, BatchWriter
+from pacing import Backoff, LatencyModel, Pacer, RateLimiter, attribute_changed, scroll_height_changed, text_changed
 
 # --- 데이터베이스 관련 모듈 임포트 ---
 try:
-    from model import mapinformation, SessionLocal
+    from model import mapinformation, SessionLocal, engine, NORMALIZATION_ENABLED, normalized_columns
     print("데이터베이스 모델, 세션, 테이블 생성 함수 임포트 성공.")
     DB_ENABLED = True
 except ImportError:
     print("DB 관련 모듈 임포트 실패. DB 저장 기능 비활성화.")
     DB_ENABLED = False
-    mapinformation, SessionLocal = None, None
+    mapinformation, SessionLocal, engine = None, None, None
+    NORMALIZATION_ENABLED, normalized_columns = False, None
+
+# --- 랭킹 점수 정규화 표 갱신 임포트 (recommend_backend/score_tables.py) ---
+try:
+    from model import BACKEND_DIR, engine
+    from score_tables import build_score_tables
+    SCORE_TABLES_ENABLED = True
+except ImportError:
+    print("점수 정규화 표 모듈 임포트 실패. 정규화 표 갱신 비활성화.")
+    SCORE_TABLES_ENABLED = False
+    build_score_tables = None
 
 # 1. 크롤링할 지역 리스트 정의
 # 경산시의 모든 읍/면/동을 여기에 넣습니다.
@@ -34,6 +56,37 @@ GYEONGSAN_AREAS = [
 SEARCH_KEYWORD = "음식점"
 Search_Area = "경산시"
 
+# --- 병렬 크롤링 설정 ---
+# --workers N 이면 헤드리스 드라이버 N 개가 공유 큐에서 (지역, 페이지) 작업을 나눠 가져갑니다.
+# 네이버에 보내는 요청(검색 페이지 열기, 상세 클릭, 다음 페이지 클릭)은 드라이버별 제한과
+# 모든 드라이버를 합친 전체 제한을 모두 지키도록 간격을 벌립니다.
+GLOBAL_REQUESTS_PER_SEC = 1.0  # 모든 드라이버를 합친 초당 요청 수
+WORKER_REQUESTS_PER_SEC = 0.5  # 드라이버 하나의 초당 요청 수
+MAX_TASK_ATTEMPTS = 2          # (지역, 페이지) 작업 하나를 시도하는 최대 횟수
+
+# --- 대기 설정 (pacing.py) ---
+# 고정 sleep 대신 DOM 조건을 기다리며, 아래는 측정이 모이기 전까지 쓰는 대기 종류별 첫 제한 시간(초)입니다.
+# 이후에는 최근 소요 시간으로 제한 시간을 다시 정하고, 차단 화면/느려짐이 보이면 모든 드라이버가 함께 쉽니다.
+NAVER_WAIT_TIMEOUTS = {
+    "search_page": 10,   # 검색 결과 iframe 등장 (예전: 5초 고정 대기)
+    "place_list": 10,    # 스크롤 가능한 가게 목록
+    "list_scroll": 2,    # 스크롤 후 목록 높이 변화 (없으면 목록 끝, 예전: 1초 고정 대기)
+    "detail_open": 8,    # 클릭한 가게의 상세 iframe 으로 교체 (예전: 3초 고정 대기)
+    "detail_frame": 8,
+    "detail_panel": 10,
+    "back_to_list": 10,  # 목록 복귀 (예전: 2초 고정 대기)
+    "list_items": 10,
+    "next_page": 10,     # 목록이 다음 페이지 내용으로 바뀜 (예전: 3초 고정 대기)
+}
+PLACE_ITEM_SELECTOR = "li.UEzoS.rTjJo"
+PLACE_ITEM_NAME_SELECTOR = "span.TYaxT"  # 목록 항목의 가게 이름 (클릭 전에 이미 저장된 가게인지 확인)
+
+# --- 이어서 크롤링 ---
+# 순차 크롤링은 다음에 볼 (지역, 페이지, 항목 번호)를 체크포인트 파일에 남기고, 중간에 멈추면 다음 실행에서 그 위치부터 이어 갑니다.
+# 목록 항목의 (이름, 지역)이 이미 restarant.db 에 있으면 상세 페이지를 열지 않고 건너뜁니다.
+# --refresh-older-than N 이면 마지막 저장(updated_at)이 N 일보다 오래된 가게는 다시 열어 리뷰 수/평점을 갱신합니다.
+CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl_checkpoint.json")
+
 
 # --- 설정 ---
 CHROMEDRIVER_PATH = 'C:/Users/a/Desktop/programming language/chromedriver-win64/chromedriver.exe' # 크롬 드라이버 경로
@@ -41,7 +94,7 @@ CHROME_BINARY_LOCATION = 'C:/Users/a/Desktop/programming language/chrome-win64/c
 
 
 
-def setup_driver():
+def setup_driver(headless=False):
     """지정된 경로의 로컬 드라이버와 브라우저를 사용해 셀레니움 드라이버를 설정하는 함수"""
     options = webdriver.ChromeOptions()
     
@@ -49,8 +102,12 @@ def setup_driver():
     options.binary_location = CHROME_BINARY_LOCATION
     
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    options.add_argument("--start-maximized")
-    # options.add_argument("--headless")
+    if headless:
+        # 창이 없어도 목록/상세 패널이 데스크톱 배치로 나오도록 창 크기를 지정합니다
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
     
     # ★★★ [수정] 크롬 드라이버의 실행 파일 경로를 Service 객체에 전달합니다. ★★★
     service = Service(executable_path=CHROMEDRIVER_PATH)
@@ -61,185 +118,581 @@ def setup_driver():
     # ★★★ [수정] 생성된 드라이버 객체를 반환합니다. ★★★
     return driver
     
-def switch_frame(frame): #중요요
+def switch_frame(driver, frame): #중요요
     driver.switch_to.default_content()  # frame 초기화
     driver.switch_to.frame(frame)  # frame 변경    
 
-def crawl_places(driver, area):
-    
+def naver_blocked(driver):
+    """네이버가 캡차/비정상 접근 화면을 띄웠는지 (pacing 의 차단 감지용, 시간 초과/느려짐 때만 부름)"""
+    if "captcha" in driver.current_url.lower():
+        return True
+    title = driver.title or ""
+    return any(marker in title for marker in ("캡차", "비정상", "일시적으로 제한"))
+
+def make_pacer(worker_rate, global_limiter=None, model=None, backoff=None):
+    """드라이버 하나의 Pacer. 병렬 모드에서는 global_limiter/model/backoff 를 모든 드라이버가 같이 씁니다"""
+    limiters = (RateLimiter(worker_rate),) + ((global_limiter,) if global_limiter else ())
+    return Pacer(model or LatencyModel(NAVER_WAIT_TIMEOUTS), backoff or Backoff(), limiters, block_check=naver_blocked)
+
+# 상세 페이지(entryIframe)의 Apollo 상태에서 가게 좌표(x=경도, y=위도)를 찾는 스크립트
+COORDINATE_SCRIPT = """
+const state = window.__APOLLO_STATE__ || {};
+for (const key of Object.keys(state)) {
+    const item = state[key];
+    if (key.startsWith('PlaceDetailBase') && item && item.coordinate) {
+        return [item.coordinate.x, item.coordinate.y];
+    }
+}
+for (const key of Object.keys(state)) {
+    const item = state[key];
+    if (key.startsWith('PlaceDetailBase') && item && item.x && item.y) {
+        return [item.x, item.y];
+    }
+}
+return null;
+"""
+
+def mercator_to_wgs84(x, y):
+    """네이버 지도 URL 의 c= 파라미터(EPSG:3857 미터 좌표)를 위도/경도로 바꿉니다"""
+    longitude = x / 6378137.0 * 180.0 / math.pi
+    latitude = math.degrees(2 * math.atan(math.exp(y / 6378137.0)) - math.pi / 2)
+    return latitude, longitude
+
+def extract_coordinates(driver):
+    """상세 페이지에서 (위도, 경도)를 얻습니다. 찾지 못하면 (None, None)"""
+    # 1) 상세 iframe 안의 페이지 데이터
+    try:
+        coordinate = driver.execute_script(COORDINATE_SCRIPT)
+        if coordinate:
+            return float(coordinate[1]), float(coordinate[0])
+    except Exception:
+        pass
+    # 2) 상위 페이지 주소의 지도 중심 좌표 (c=경도,위도 또는 c=미터 좌표)
+    try:
+        driver.switch_to.default_content()
+        query = parse_qs(urlparse(driver.current_url).query)
+        values = [float(v) for v in re.findall(r'-?\d+(?:\.\d+)?', query.get("c", [""])[0])[:2]]
+        if len(values) == 2:
+            x, y = values
+            if abs(x) > 180 or abs(y) > 90:
+                return mercator_to_wgs84(x, y)
+            return y, x
+    except Exception:
+        pass
+    finally:
+        try:
+            driver.switch_to.frame("entryIframe")
+        except Exception:
+            pass
+    return None, None
+
+def open_search(driver, area, pacer):
+    """'경산시 {area} 음식점' 검색 결과(1페이지)를 엽니다"""
     search_query = f"{Search_Area} {area} {SEARCH_KEYWORD}"
     print(f"--- '{search_query}' 검색 시작 ---")
     
     # 네이버버맵 검색 URL로 이동
     naver_map_search_url = f"https://map.naver.com/p/search/{search_query}"
+    pacer.wait()
     driver.get(naver_map_search_url)
     
-    time.sleep(5)  # 페이지 로딩 대기
+    # 검색 결과 목록 iframe 이 붙을 때까지 기다립니다
+    pacer.until(driver, "search_page", EC.frame_to_be_available_and_switch_to_it("searchIframe"))
+    driver.switch_to.default_content()
     print(" - 페이지 로딩 완료, 스크롤 시작")
 
-    db = SessionLocal()
-    page_num = 1
-    while True:
-        print(f" - {page_num}페이지 크롤링 중...")
+def scroll_place_list(driver, pacer):
+    """searchIframe 의 가게 목록을 끝까지 스크롤합니다. 목록을 찾지 못하면 False"""
+    # 현재 페이지의 가게 목록 가져오기
+    # ★★★ 이 부분이 가장 중요! 웹사이트 구조가 바뀌면 여기를 수정해야 합니다. ★★★
+    # frame 변경 메소드
+    switch_frame(driver, "searchIframe") 
+    try:
+        # ★★★ 스크롤 가능한 요소를 찾습니다. ★★★
+        scrollable_element = pacer.until(
+            driver, "place_list", EC.presence_of_element_located((By.CLASS_NAME, "Ryr1F"))
+        )
+    
+        last_height = driver.execute_script("return arguments[0].scrollHeight", scrollable_element)
+        while True:
+            driver.execute_script("arguments[0].scrollTop += 600;", scrollable_element)
+            # 가게가 더 붙으면 높이가 바뀝니다. 제한 시간 안에 그대로면 목록 끝
+            new_height = pacer.until(driver, "list_scroll", scroll_height_changed(scrollable_element, last_height), soft=True)
+            if new_height is None:
+                print(" - 스크롤 끝에 도달했습니다.")
+                break
+            last_height = new_height
+    except TimeoutException:
+        print(" - 스크롤 가능한 요소를 찾을 수 없습니다. 페이지 구조가 변경되었을 수 있습니다.")
+        return False
+    print(" - 스크롤 완료 크롤링 시작")
+    return True
+
+def detail_frame_src(driver):
+    """지금 떠 있는 상세 iframe(entryIframe)의 src, 없으면 None. 끝나면 searchIframe 으로 돌아옵니다"""
+    driver.switch_to.default_content()
+    try:
+        frames = driver.find_elements(By.ID, "entryIframe")
+        return frames[0].get_attribute("src") if frames else None
+    finally:
+        driver.switch_to.frame("searchIframe")
+
+def make_place_writer(max_rows=BATCH_ROWS, max_seconds=BATCH_SECONDS, refresh=False, on_flushed=None):
+    """mapinformation 일괄 저장기. (name, address2) 가 이미 있으면 비어 있던 좌표만 채우고,
+    refresh 면 다시 읽은 카테고리/평점/리뷰 수/갱신 시각도 덮어씁니다"""
+    update_columns = ("category", "rating", "reviewnum", "updated_at") if refresh else ()
+    return BatchWriter(engine, mapinformation.__table__, ("name", "address2"), fill_columns=("latitude", "longitude"),
+                       update_columns=update_columns, on_flushed=on_flushed, max_rows=max_rows, max_seconds=max_seconds)
+
+class KnownPlaces:
+    """이미 저장된 가게: (이름, 지역) → {주소: updated_at}. 목록 항목을 클릭하기 전에 건너뛸지 정합니다 (스레드 안전)
+
+    목록에는 주소 전체가 없어서 (이름, 지역)으로 찾습니다. 같은 이름의 지점이 한 지역에 여럿이면
+    한 페이지에서 그 이름이 나온 횟수가 저장된 지점 수를 넘을 때부터는 건너뛰지 않습니다.
+    """
+
+    def __init__(self, refresh_before=None):
+        self.refresh_before = refresh_before  # 이 시각(ISO 문자열)보다 오래 전에 저장된 가게는 다시 엽니다
+        self._places = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, refresh_older_than_days=None):
+        refresh_before = None
+        if refresh_older_than_days is not None:
+            refresh_before = (datetime.now() - timedelta(days=refresh_older_than_days)).isoformat(timespec="seconds")
+        known = cls(refresh_before)
+        with engine.connect() as connection:
+            rows = connection.execute(select(mapinformation.name, mapinformation.area,
+                                             mapinformation.address2, mapinformation.updated_at))
+            for name, area, address, updated_at in rows:
+                known.remember(name, area, address, updated_at)
+        return known
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(addresses) for addresses in self._places.values())
+
+    def remember(self, name, area, address, updated_at):
+        with self._lock:
+            self._places.setdefault((name, area), {})[address] = updated_at
+
+    def should_skip(self, name, area, occurrence):
+        """이 페이지에서 occurrence 번째(0부터)로 나온 (name, area) 항목을 열지 않아도 되면 True"""
+        with self._lock:
+            addresses = self._places.get((name, area))
+            if not addresses or occurrence >= len(addresses):
+                return False
+            if self.refresh_before is None:
+                return True
+            return all(updated_at is not None and updated_at >= self.refresh_before for updated_at in addresses.values())
+
+class CrawlCheckpoint:
+    """순차 크롤링에서 다음에 볼 (지역, 페이지, 항목 번호)를 파일에 남깁니다.
+
+    앞의 가게들이 DB 에 들어간 뒤에만(저장기가 비어 있거나 방금 배치를 저장했을 때) 파일을 씁니다.
+    마지막 저장이 실패해 저장기에 행이 남아 있으면 위치를 앞으로 옮기지 않습니다.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self.position = None
+        self._saved = None
+
+    def load(self):
+        """남아 있는 (지역, 페이지, 항목 번호), 없으면 None"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data["area"], int(data["page"]), int(data["item"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def mark(self, area, page_num, item, writer):
+        self.position = (area, page_num, item)
+        if writer.healthy and not writer.pending:
+            self.save()
+
+    def save(self):
+        """저장기의 on_flushed 로도 불립니다 (배치가 커밋된 뒤에만 불림)"""
+        if self.position is None or self.position == self._saved:
+            return
+        area, page_num, item = self.position
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"area": area, "page": page_num, "item": item,
+                       "saved_at": datetime.now().isoformat(timespec="seconds")}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self._saved = self.position
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def list_item_name(place):
+    """목록 항목의 가게 이름, 찾지 못하면 None"""
+    try:
+        return place.find_element(By.CSS_SELECTOR, PLACE_ITEM_NAME_SELECTOR).text.strip() or None
+    except NoSuchElementException:
+        return None
+
+def crawl_page_items(driver, writer, area, pacer, known=None, checkpoint=None, page_num=1, start_item=0):
+    """현재 목록 페이지의 가게 상세 페이지를 하나씩 열어 저장기에 넣고, 수집한 가게 수를 돌려줍니다
+
+    known 에 이미 있는 가게는 열지 않고 건너뛰며, checkpoint 가 있으면 항목마다 위치를 남깁니다 (start_item 부터 시작).
+    """
+    collected = skipped = 0
+    seen_names = {}
+    try:
+        place_elements = driver.find_elements(By.CSS_SELECTOR, "li.UEzoS.rTjJo")
+        print(" - %d개의 가게 정보를 찾았습니다." % len(place_elements))
+    except NoSuchElementException:
+        print(" - 가게 목록을 찾을 수 없습니다.")
         
-        # 현재 페이지의 가게 목록 가져오기
-        # ★★★ 이 부분이 가장 중요! 웹사이트 구조가 바뀌면 여기를 수정해야 합니다. ★★★
-        # frame 변경 메소드
-        switch_frame("searchIframe") 
+    item_count_on_page = len(driver.find_elements(By.CSS_SELECTOR, "li.UEzoS.rTjJo"))
+    
+    if known is not None and start_item:
+        # 체크포인트에서 이어서 시작해도 앞 항목들의 같은 이름을 세어 두어야 occurrence(몇 번째 지점인지)가 맞습니다
+        for place in driver.find_elements(By.CSS_SELECTOR, PLACE_ITEM_SELECTOR)[:start_item]:
+            list_name = list_item_name(place)
+            if list_name:
+                seen_names[list_name] = seen_names.get(list_name, 0) + 1
+    
+    for i in range(start_item, item_count_on_page):
+        if checkpoint is not None:
+            checkpoint.mark(area, page_num, i, writer)
+        previous_detail = detail_frame_src(driver)
+        place_elements = driver.find_elements(By.CSS_SELECTOR, PLACE_ITEM_SELECTOR)
         try:
-            # ★★★ 스크롤 가능한 요소를 찾습니다. ★★★
-            scrollable_element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "Ryr1F"))
-            )
+                place = place_elements[i]
+                list_name = list_item_name(place) if known is not None else None
+                if list_name:
+                    occurrence = seen_names.get(list_name, 0)
+                    seen_names[list_name] = occurrence + 1
+                    if known.should_skip(list_name, area, occurrence):
+                        print(f"   -> 이미 저장된 가게 '{list_name}' 건너뜀")
+                        skipped += 1
+                        continue
+                link_selector = "a.place_bluelink.N_KDL.CtW3e"
+                target_link = place.find_element(By.CSS_SELECTOR, link_selector)
+                pacer.wait()
+                target_link.click()  # 가게 상세 페이지로 이동
+                print(" - 가게 상세 페이지로 이동 중...")
         
-            last_height = driver.execute_script("return arguments[0].scrollHeight", scrollable_element)
-            while True:
-                driver.execute_script("arguments[0].scrollTop += 600;", scrollable_element)
-                time.sleep(1)
-                new_height = driver.execute_script("return arguments[0].scrollHeight", scrollable_element)
-                if new_height == last_height:
-                    print(" - 스크롤 끝에 도달했습니다.")
-                    break
-                last_height = new_height
+                driver.switch_to.default_content() 
+                entry_iframe_selector = (By.ID, "entryIframe")  
+                # 상세 iframe 이 방금 누른 가게로 바뀔 때까지 (src 변화) 기다립니다
+                pacer.until(driver, "detail_open", attribute_changed(entry_iframe_selector, "src", previous_detail))
+                pacer.until(driver, "detail_frame", EC.frame_to_be_available_and_switch_to_it(entry_iframe_selector))
+                print(" - 상세 정보 iframe(entryIframe)으로 성공적으로 전환했습니다.")     
+                
+                info_container = pacer.until(
+                    driver, "detail_panel", EC.presence_of_element_located((By.CSS_SELECTOR, "div.zD5Nm"))
+                )
+                print(" - 상세 정보 패널(info_container) 요소를 찾았습니다.")
+        except (NoSuchElementException, IndexError):
+                print(f"   -> {i+1}번째 아이템은 가게 정보가 아니거나 클릭할 수 없어 건너뜁니다.")
+                continue
         except TimeoutException:
-            print(" - 스크롤 가능한 요소를 찾을 수 없습니다. 페이지 구조가 변경되었을 수 있습니다.")
-            break        
-        print(" - 스크롤 완료 크롤링 시작")
+                # 상세 페이지가 뜨지 않음 (pacing 이 차단/느려짐을 확인하고 쉬는 시간을 정함): 목록으로 돌아가 다음 가게로
+                print(f"   -> {i+1}번째 가게의 상세 페이지가 제한 시간 안에 뜨지 않아 건너뜁니다.")
+                switch_frame(driver, "searchIframe")
+                continue
+
+       
         try:
-            place_elements = driver.find_elements(By.CSS_SELECTOR, "li.UEzoS.rTjJo")
-            print(" - %d개의 가게 정보를 찾았습니다." % len(place_elements))
-        except NoSuchElementException:
-            print(" - 가게 목록을 찾을 수 없습니다.")
-            
-        item_count_on_page = len(driver.find_elements(By.CSS_SELECTOR, "li.UEzoS.rTjJo"))
-        
+            # 가게 이름, 주소, 카테고리, 리뷰 수 등을 추출합니다.
+            place_name = info_container.find_element(By.CSS_SELECTOR, "span.GHAhO").text
+            print(f"   -> 상세 정보: 가게 이름 '{place_name}' 획득")
         
-        for i in range(item_count_on_page):
-            place_elements = driver.find_elements(By.CSS_SELECTOR, "li.UEzoS.rTjJo")
             try:
-                    place = place_elements[i]
-                    link_selector = "a.place_bluelink.N_KDL.CtW3e"
-                    target_link = place.find_element(By.CSS_SELECTOR, link_selector)
-                    target_link.click()  # 가게 상세 페이지로 이동
-                    print(" - 가게 상세 페이지로 이동 중...")
-                    time.sleep(3)  # 상세 페이지 로딩 대기
-            
-                    driver.switch_to.default_content() 
-                    entry_iframe_selector = (By.ID, "entryIframe")  
-                    WebDriverWait(driver, 8).until(
-                        EC.frame_to_be_available_and_switch_to_it(entry_iframe_selector)
-                    )
-                    print(" - 상세 정보 iframe(entryIframe)으로 성공적으로 전환했습니다.")     
-                    
-                    info_container = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.zD5Nm"))
-                    )
-                    print(" - 상세 정보 패널(info_container) 요소를 찾았습니다.")
-            except (NoSuchElementException, IndexError):
-                    print(f"   -> {i+1}번째 아이템은 가게 정보가 아니거나 클릭할 수 없어 건너뜁니다.")
-                    continue
+                address = driver.find_element(By.CSS_SELECTOR, "span.LDgIH").text
+                print(f"   -> 주소: '{address}'")
+            except:
+                print("   -> 주소를 찾지 못함")
+                address =  None
 
-           
             try:
-                # 가게 이름, 주소, 카테고리, 리뷰 수 등을 추출합니다.
-                place_name = info_container.find_element(By.CSS_SELECTOR, "span.GHAhO").text
-                print(f"   -> 상세 정보: 가게 이름 '{place_name}' 획득")
-            
-                try:
-                    address = driver.find_element(By.CSS_SELECTOR, "span.LDgIH").text
-                    print(f"   -> 주소: '{address}'")
-                except:
-                    print("   -> 주소를 찾지 못함")
-                    address =  None
-
-                try:
-                    category = info_container.find_element(By.CSS_SELECTOR, "span.lnJFt").text
-                    print(f"   -> 상세 정보: 카테고리 '{category}' 획득")
-                except:
-                    category =  None
-
-                try:
-                    review_link_selector = "a[href*='/review/visitor']" # '방문자 리뷰' 링크를 찾음
-                    review_element = driver.find_element(By.CSS_SELECTOR, review_link_selector)
-                    full_text = review_element.text  # "방문자 리뷰 377"
-                
-                # 텍스트에서 숫자만 추출
-                    digits_only = "".join(filter(str.isdigit, full_text))
-                    if digits_only:
-                        reviewnum = int(digits_only)
-                        print(f"   -> 상세 정보: 리뷰 수 {reviewnum}개 획득")
-                except:
-                    print("   -> 상세 정보: 리뷰 수를 찾지 못함")
-                    reviewnum = 0
-                try: rating = float(place.find_element(By.CSS_SELECTOR, "em.num").text)
-                except: rating = 0.0
+                category = info_container.find_element(By.CSS_SELECTOR, "span.lnJFt").text
+                print(f"   -> 상세 정보: 카테고리 '{category}' 획득")
+            except:
+                category =  None
 
+            try:
+                review_link_selector = "a[href*='/review/visitor']" # '방문자 리뷰' 링크를 찾음
+                review_element = driver.find_element(By.CSS_SELECTOR, review_link_selector)
+                full_text = review_element.text  # "방문자 리뷰 377"
             
-            # ★★★ 2. 추출한 정보를 출력합니다. ★★★
-                existing_item = db.query(mapinformation).filter_by(name=place_name, address2=address).first()
-                print(f" - DB 중복 확인: {place_name} / {address}")
-                # 3. 중복 데이터가 없으면 새로 추가합니다.
-                if not existing_item:
-                        print(f" - 신규 데이터 발견: {place_name} / {address}")
-                        db_item = mapinformation(
-                            area=area, name=place_name, category=category,
-                            address2=address, rating=rating, reviewnum=reviewnum
-                    )
-                        # ★★★ 3. DB에 추가할 아이템을 생성합니다. ★★★
-                        db.add(db_item)
-                        print(f" -> 신규 데이터 추가 준비: {place_name}")
-                        db.commit()  # 즉시 커밋
-                else:
-                        print(f" - 중복 데이터 발견: {place_name} / {address}") 
-                        
-     
-            except Exception as e:
-                print(f" - 오류 발생: {e}")
-            finally:
-                # ★★★ 5. 상세 페이지에서 나와서 목록 페이지로 돌아갑니다. ★★★
-                print(f"   -> 목록 페이지로 복귀.")
-                driver.back()  # 목록 페이지로 돌아가기
-                time.sleep(2)
-                # ★★★ 6. 목록 페이지로 돌아온 후, 다시 iframe으로 전환합니다. ★★★
-                driver.switch_to.default_content()
-                WebDriverWait(driver, 10).until(EC.frame_to_be_available_and_switch_to_it("searchIframe"))
-                WebDriverWait(driver, 10).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li.UEzoS.rTjJo")))
-                    
-        
+            # 텍스트에서 숫자만 추출
+                digits_only = "".join(filter(str.isdigit, full_text))
+                if digits_only:
+                    reviewnum = int(digits_only)
+                    print(f"   -> 상세 정보: 리뷰 수 {reviewnum}개 획득")
+            except:
+                print("   -> 상세 정보: 리뷰 수를 찾지 못함")
+                reviewnum = 0
+            try: rating = float(place.find_element(By.CSS_SELECTOR, "em.num").text)
+            except: rating = 0.0
+
+            # 좌표 (추천 백엔드의 좌표 근처 매칭용 R*Tree 에 들어감)
+            latitude, longitude = extract_coordinates(driver)
+            if latitude is not None:
+                print(f"   -> 상세 정보: 좌표 ({latitude:.6f}, {longitude:.6f}) 획득")
+            else:
+                print("   -> 상세 정보: 좌표를 찾지 못함")
+
         
+        # ★★★ 2. 추출한 정보를 저장기에 넣습니다. ★★★
+            # 중복 확인(_name_address_uc)과 좌표 보완은 일괄 저장의 ON CONFLICT 가 맡습니다
+            updated_at = datetime.now().isoformat(timespec="seconds")
+            writer.add(dict(
+                area=area, name=place_name, category=category,
+                address2=address, rating=rating, reviewnum=reviewnum,
+                latitude=latitude, longitude=longitude, updated_at=updated_at,
+                # 정규화 이름/핵심 이름/도로명 키 (별칭 사전 적용)
+                **(normalized_columns(place_name, address) if NORMALIZATION_ENABLED else {})
+            ))
+            print(f" -> 저장 대기열에 추가: {place_name} / {address}")
+            collected += 1
+            if known is not None:
+                known.remember(place_name, area, address, updated_at)
+ 
+        except Exception as e:
+            print(f" - 오류 발생: {e}")
+        finally:
+            # ★★★ 5. 상세 페이지에서 나와서 목록 페이지로 돌아갑니다. ★★★
+            print(f"   -> 목록 페이지로 복귀.")
+            driver.back()  # 목록 페이지로 돌아가기
+            # ★★★ 6. 목록 페이지로 돌아온 후, 다시 iframe으로 전환합니다. ★★★
+            driver.switch_to.default_content()
+            pacer.until(driver, "back_to_list", EC.frame_to_be_available_and_switch_to_it("searchIframe"))
+            pacer.until(driver, "list_items", EC.presence_of_all_elements_located((By.CSS_SELECTOR, PLACE_ITEM_SELECTOR)))
+
+    if checkpoint is not None:
+        checkpoint.mark(area, page_num, item_count_on_page, writer)
+    if skipped:
+        print(f" - 이미 저장된 가게 {skipped}곳은 열지 않았습니다.")
+    writer.flush_if_due()
+    return collected
+
+def next_page_button(driver):
+    """목록의 '다음페이지' 버튼, 마지막 페이지면 None"""
+    switch_frame(driver, "searchIframe")
+    
+    pagination_container = driver.find_element(By.CSS_SELECTOR, "div.zRM9F") # 예시: 이전 대화에서 나왔던 컨테이너
+    next_button = pagination_container.find_element(
+    By.XPATH, ".//a[contains(@class, 'eUTV2') and .//span[text()='다음페이지']]")
+    if next_button.get_attribute('aria-disabled') == 'true':
+        return None
+    return next_button
+
+def go_to_next_page(driver, pacer):
+    """다음 페이지로 넘어갑니다. 마지막 페이지면 False"""
+    next_button = next_page_button(driver)
+    print(" - 페이지네이션 컨테이너 로딩 확인. 다음 페이지로 이동 준비...")
+    if next_button is None:
+        return False
+    
+    svg_button_to_click = next_button.find_element(By.CSS_SELECTOR, "svg.yUtES")
+    first_items = driver.find_elements(By.CSS_SELECTOR, PLACE_ITEM_SELECTOR)
+    first_text = first_items[0].text if first_items else None
+    pacer.wait()
+    svg_button_to_click.click()
+    # 목록 첫 가게가 바뀌면 다음 페이지가 그려진 것입니다
+    pacer.until(driver, "next_page", text_changed((By.CSS_SELECTOR, PLACE_ITEM_SELECTOR), first_text))
+    return True
+
+def crawl_places(driver, area, writer, pacer=None, known=None, checkpoint=None, start_page=1, start_item=0):
+    """한 지역의 검색 결과를 마지막 페이지까지 순서대로 크롤링합니다 (체크포인트에서 이어 갈 때는 start_page/start_item 부터)"""
+    pacer = pacer or make_pacer(WORKER_REQUESTS_PER_SEC)
+    try:
+        if not open_page(driver, area, start_page, None, pacer):
+            print(f" - '{area}' {start_page}페이지로 이동하지 못해 건너뜁니다.")
+            return
+    except TimeoutException:
+        print(f" - '{area}' 검색 결과가 제한 시간 안에 뜨지 않아 건너뜁니다.")
+        return
+
+    page_num = start_page
+    while True:
+        print(f" - {page_num}페이지 크롤링 중...")
+        if not scroll_place_list(driver, pacer):
+            break
+        crawl_page_items(driver, writer, area, pacer, known, checkpoint, page_num,
+                         start_item if page_num == start_page else 0)
         try:
-            switch_frame("searchIframe")
-            
-            pagination_container = driver.find_element(By.CSS_SELECTOR, "div.zRM9F") # 예시: 이전 대화에서 나왔던 컨테이너
-            print(" - 페이지네이션 컨테이너 로딩 확인. 다음 페이지로 이동 준비...")
-            next_button = pagination_container.find_element(
-            By.XPATH, ".//a[contains(@class, 'eUTV2') and .//span[text()='다음페이지']]")
-            print(" - 다음 페이지 버튼 찾음")
-            page_num += 1
-            if next_button.get_attribute('aria-disabled') == 'true':
+            if not go_to_next_page(driver, pacer):
                 print("다음 페이지 버튼이 비활성화되었습니다. 크롤링을 종료합니다.")
                 break
-            
-            svg_button_to_click = next_button.find_element(By.CSS_SELECTOR, "svg.yUtES")
-            svg_button_to_click.click()
+            page_num += 1
+            if checkpoint is not None:
+                checkpoint.mark(area, page_num, 0, writer)
             print(f" - {page_num}페이지로 이동 완료")
-            time.sleep(3)  # 페이지 로딩 대기
         except Exception as e:
             print(f"페이지네이션 오류: {e}")
             break
-    db.close()        
-    
+
+# --- 병렬 크롤링 (--workers N) ---
+class CrawlTasks:
+    """워커들이 나눠 가져가는 (지역, 페이지, 시도 횟수) 작업 큐. 같은 페이지는 재시도가 아니면 한 번만 넣습니다"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._scheduled = set()
+        self._lock = threading.Lock()
+
+    def add(self, area, page_num, attempt=1):
+        with self._lock:
+            if attempt == 1 and (area, page_num) in self._scheduled:
+                return
+            self._scheduled.add((area, page_num))
+        self.queue.put((area, page_num, attempt))
+
+def open_page(driver, area, page_num, position, pacer):
+    """driver 를 (area, page_num) 목록 페이지로 옮깁니다. position 은 driver 가 지금 보고 있는 (지역, 페이지)
+
+    바로 앞 페이지에 있으면 다음 페이지 버튼만 누르고, 아니면 검색부터 다시 열어 page_num 까지 넘깁니다.
+    """
+    if position == (area, page_num - 1):
+        return go_to_next_page(driver, pacer)
+    open_search(driver, area, pacer)
+    for _ in range(page_num - 1):
+        if not scroll_place_list(driver, pacer) or not go_to_next_page(driver, pacer):
+            return False
+    return True
+
+def crawl_worker(worker_id, tasks, writer, known, pacer, headless, stats):
+    """헤드리스 드라이버 하나로 큐의 (지역, 페이지) 작업을 처리합니다 (저장기는 모든 워커가 같이 씀)"""
+    try:
+        driver = setup_driver(headless=headless)
+    except Exception as e:
+        print(f"[워커 {worker_id}] 드라이버 실행 실패: {e}")
+        return
+    worker_stats = stats[worker_id] = {"pages": 0, "collected": 0, "failed": 0, "pacer": pacer}
+    position = None
+    try:
+        while True:
+            task = tasks.queue.get()
+            if task is None:
+                tasks.queue.task_done()
+                break
+            area, page_num, attempt = task
+            try:
+                print(f"[워커 {worker_id}] '{area}' {page_num}페이지 시작 (시도 {attempt})")
+                if not open_page(driver, area, page_num, position, pacer):
+                    position = None
+                    continue
+                position = (area, page_num)
+                if not scroll_place_list(driver, pacer):
+                    continue
+                # 다음 페이지가 있으면 이 페이지를 처리하기 전에 큐에 넣어 다른 드라이버가 바로 가져가게 합니다
+                if next_page_button(driver) is not None:
+                    tasks.add(area, page_num + 1)
+                worker_stats["collected"] += crawl_page_items(driver, writer, area, pacer, known, page_num=page_num)
+                worker_stats["pages"] += 1
+            except Exception as e:
+                position = None
+                worker_stats["failed"] += 1
+                print(f"[워커 {worker_id}] '{area}' {page_num}페이지 오류: {e}")
+                if attempt < MAX_TASK_ATTEMPTS:
+                    tasks.add(area, page_num, attempt + 1)
+            finally:
+                tasks.queue.task_done()
+    finally:
+        driver.quit()
+
+def crawl_parallel(areas, workers, writer, known=None, global_rate=GLOBAL_REQUESTS_PER_SEC, worker_rate=WORKER_REQUESTS_PER_SEC, headless=True):
+    """드라이버 workers 개로 지역들을 나눠 크롤링합니다. 워커별 {'pages', 'collected', 'failed', 'pacer'} 를 돌려줍니다"""
+    tasks = CrawlTasks()
+    for area in areas:
+        tasks.add(area, 1)
+    # 요청 간격 전체 제한, 대기 시간 측정, backoff 는 모든 드라이버가 같이 씁니다
+    global_limiter = RateLimiter(global_rate)
+    model, backoff = LatencyModel(NAVER_WAIT_TIMEOUTS), Backoff()
+    stats = {}
+    threads = [
+        threading.Thread(target=crawl_worker, name=f"crawl-worker-{worker_id}",
+                         args=(worker_id, tasks, writer, known, make_pacer(worker_rate, global_limiter, model, backoff), headless, stats))
+        for worker_id in range(1, workers + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    # 모든 작업이 끝나거나 살아 있는 워커가 없으면 (드라이버 실행 실패 등) 멈춥니다
+    while tasks.queue.unfinished_tasks and any(thread.is_alive() for thread in threads):
+        time.sleep(1)
+    for _ in threads:
+        tasks.queue.put(None)
+    for thread in threads:
+        thread.join()
+    return stats
 
 # --- 메인 실행 로직 ---
 if __name__ == "__main__":
-    # ★★★ [수정] setup_driver()가 반환하는 driver 객체를 변수에 할당합니다. ★★★
-    driver = setup_driver()
+    parser = argparse.ArgumentParser(description="네이버 지도 음식점 크롤러")
+    parser.add_argument("--workers", type=int, default=1, help="동시에 띄울 헤드리스 드라이버 수 (1 이면 브라우저 창 하나로 순서대로)")
+    parser.add_argument("--areas", nargs="+", default=GYEONGSAN_AREAS, help="크롤링할 읍/면/동 (기본: GYEONGSAN_AREAS)")
+    parser.add_argument("--global-rate", type=float, default=GLOBAL_REQUESTS_PER_SEC, help="모든 드라이버를 합친 초당 요청 수")
+    parser.add_argument("--worker-rate", type=float, default=WORKER_REQUESTS_PER_SEC, help="드라이버 하나의 초당 요청 수")
+    parser.add_argument("--show-browser", action="store_true", help="병렬 모드에서도 브라우저 창을 띄웁니다")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="이만큼 모이면 한 트랜잭션으로 저장")
+    parser.add_argument("--batch-seconds", type=float, default=BATCH_SECONDS, help="첫 행 이후 이만큼(초) 지나면 저장")
+    parser.add_argument("--refresh-older-than", type=float, default=None, metavar="DAYS",
+                        help="이미 저장된 가게도 마지막 저장이 DAYS 일보다 오래됐으면 다시 열어 리뷰 수/평점 갱신 (기본: 건너뜀)")
+    parser.add_argument("--fresh", action="store_true", help="체크포인트를 무시하고 첫 지역부터 다시 시작")
+    args = parser.parse_args()
+
     print("크롤링을 시작합니다...")
-    for area in GYEONGSAN_AREAS:
-        area_results = crawl_places(driver, area)
-        time.sleep(3) # 다음 지역 검색 전 IP 차단 방지를 위한 휴식
-    
-    driver.quit()
+    known = KnownPlaces.load(args.refresh_older_than)
+    print(f"이미 저장된 가게 {len(known)}곳을 불러왔습니다.")
+    refresh = args.refresh_older_than is not None
+    if args.workers > 1:
+        # 병렬 모드는 페이지가 순서 없이 끝나므로 체크포인트 없이 이미 저장된 가게 건너뛰기만 씁니다
+        writer = make_place_writer(args.batch_rows, args.batch_seconds, refresh)
+        started = time.time()
+        stats = crawl_parallel(args.areas, args.workers, writer, known, args.global_rate, args.worker_rate,
+                               headless=not args.show_browser)
+        writer.close()
+        for worker_id, worker_stats in sorted(stats.items()):
+            print(f"[워커 {worker_id}] 페이지 {worker_stats['pages']}개, 수집 가게 {worker_stats['collected']}개, 실패 {worker_stats['failed']}건")
+            print(worker_stats["pacer"].format_report())
+        print(f"병렬 크롤링 완료 ({time.time() - started:.0f}초)")
+    else:
+        checkpoint = CrawlCheckpoint()
+        writer = make_place_writer(args.batch_rows, args.batch_seconds, refresh, on_flushed=checkpoint.save)
+        resume = None if args.fresh else checkpoint.load()
+        start_index, start_page, start_item = 0, 1, 0
+        if resume and resume[0] in args.areas:
+            start_index, start_page, start_item = args.areas.index(resume[0]), *resume[1:]
+            print(f"체크포인트에서 이어서 시작: '{resume[0]}' {start_page}페이지 {start_item + 1}번째 가게")
+        # ★★★ [수정] setup_driver()가 반환하는 driver 객체를 변수에 할당합니다. ★★★
+        driver = setup_driver()
+        # 지역 사이 고정 휴식 대신 요청 간격 제한과 차단 감지 backoff 가 요청 속도를 맞춥니다
+        pacer = make_pacer(args.worker_rate)
+        try:
+            for index in range(start_index, len(args.areas)):
+                area = args.areas[index]
+                if index == start_index:
+                    area_results = crawl_places(driver, area, writer, pacer, known, checkpoint, start_page, start_item)
+                else:
+                    area_results = crawl_places(driver, area, writer, pacer, known, checkpoint)
+                if index + 1 < len(args.areas):
+                    checkpoint.mark(args.areas[index + 1], 1, 0, writer)
+        finally:
+            # 멈춘 경우에도 모아 둔 가게를 저장하고 그 위치를 체크포인트에 남깁니다
+            driver.quit()
+            writer.close()
+        checkpoint.clear()
+        print(pacer.format_report())
+    print(writer.format_report())
+
+    # 새로 수집한 리뷰 수로 랭킹 점수 정규화(CDF) 표를 다시 만듭니다 (언급 수는 추천 백엔드의 finally.db 기준)
+    if DB_ENABLED and SCORE_TABLES_ENABLED:
+        try:
+            metadata = build_score_tables(engine.url.database, os.path.join(BACKEND_DIR, "finally.db"),
+                                          os.path.join(BACKEND_DIR, "score_tables.json"))
+            print(f"점수 정규화 표 갱신 완료: 리뷰 표 {metadata['review_groups']}개, 리뷰 표본 {metadata['review_samples']}개.")
+        except Exception as e:
+            print(f"점수 정규화 표 갱신 중 오류: {e}")
 
   
     
\ No newline at end of file
@@ -2,10 +2,11 @@
 
 # 파일 경로 관련 모듈 임포트
 import os
+import sys
 
 # SQLAlchemy 관련 모듈 임포트
 from sqlalchemy import Float, UniqueConstraint # <--- UniqueConstraint 임포트 확인
-from sqlalchemy import create_engine, Column, Integer, String, Text
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -17,6 +18,25 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # 데이터베이스 파일 경로를 완성합니다. 프로젝트 루트 폴더에 'db.sqlite3' 파일이 생성됩니다.
 DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'restarant.db')}"
 
+# --- 추천 백엔드 공용 모듈 (좌표 R*Tree, 정규화 컬럼) ---
+BACKEND_DIR = os.path.join(BASE_DIR, "..", "..", "recommend_backend")
+sys.path.append(BACKEND_DIR)
+try:
+    from place_spatial import ensure_spatial_index
+    SPATIAL_ENABLED = True
+except ImportError:
+    print("좌표 인덱스 모듈 임포트 실패. R*Tree 생성 비활성화.")
+    SPATIAL_ENABLED = False
+    ensure_spatial_index = None
+try:
+    from normalization import normalized_columns
+    from place_columns import ensure_normalized_columns
+    NORMALIZATION_ENABLED = True
+except ImportError:
+    print("정규화 모듈 임포트 실패. 정규화 컬럼 저장 비활성화.")
+    NORMALIZATION_ENABLED = False
+    normalized_columns, ensure_normalized_columns = None, None
+
 # --- SQLAlchemy ORM 기본 설정 ---
 # SQLAlchemy에서 파이썬 클래스가 데이터베이스 테이블과 매핑될 것임을 선언하는 기본 클래스입니다.
 Base = declarative_base()
@@ -38,6 +58,15 @@ class mapinformation(Base):
     address2 = Column(String,index=True)
     reviewnum = Column(String)
     rating = Column(String)
+    # 네이버 상세 페이지의 가게 좌표 (WGS84)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # normalization.py 규칙(별칭 사전 포함)으로 저장 시점에 계산한 값 (추천 백엔드의 같음 비교용)
+    normalized_name = Column(Text, index=True)
+    core_name = Column(Text, index=True)
+    road_tokens = Column(Text, index=True)
+    # 마지막으로 상세 페이지에서 읽어 저장한 시각 (ISO 문자열). crawler.py --refresh-older-than 의 기준이며 이전 가게는 NULL
+    updated_at = Column(String(32), index=True)
 
    
     __table_args__ = (
@@ -54,10 +83,35 @@ class mapinformation(Base):
 # 데이터베이스 연결 엔진 생성
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 
+# WAL 저널 모드: 크롤러가 쓰는 동안에도 추천 백엔드의 읽기가 막히지 않도록 합니다.
+@event.listens_for(engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
 # Base에 정의된 모든 모델(클래스)에 해당하는 테이블들을 데이터베이스에 생성합니다.
 # db.sqlite3 파일을 삭제한 상태이므로, 이 명령이 instagram_posts 테이블을 새로 생성합니다.
 Base.metadata.create_all(engine)
 
+# 예전 DB 에는 updated_at 컬럼이 없으므로 추가합니다 (create_all 은 기존 테이블을 바꾸지 않음)
+if "updated_at" not in {column["name"] for column in inspect(engine).get_columns("mapinformation")}:
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE mapinformation ADD COLUMN updated_at VARCHAR(32)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_mapinformation_updated_at ON mapinformation (updated_at)"))
+
+# 기존 DB 에는 좌표/정규화 컬럼을 추가하고, 좌표 R*Tree 와 동기화 트리거를 만듭니다.
+if SPATIAL_ENABLED or NORMALIZATION_ENABLED:
+    raw_connection = engine.raw_connection()
+    try:
+        if SPATIAL_ENABLED:
+            ensure_spatial_index(raw_connection)
+        if NORMALIZATION_ENABLED:
+            ensure_normalized_columns(raw_connection)
+    finally:
+        raw_connection.close()
+
 # 테이블 생성이 완료되었음을 알리는 메시지 출력
 print(f"데이터베이스 '{DATABASE_URL}' 및 테이블 '{mapinformation.__tablename__}' 생성이 완료되었습니다.")
 
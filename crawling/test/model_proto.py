@@ -1,7 +1,7 @@
 # model_proto.py
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Text # DateTime 임포트 제거
+from sqlalchemy import create_engine, event, inspect, text, Column, ForeignKey, Integer, String, Text # DateTime 임포트 제거
 from sqlalchemy.orm import declarative_base # SQLAlchemy 1.4+
 from sqlalchemy.orm import sessionmaker
 # from sqlalchemy.sql import func # server_default=func.now() 사용 안 하므로 임포트 제거
@@ -16,6 +16,15 @@ if DATABASE_URL.startswith("sqlite"):
 
 engine = create_engine(DATABASE_URL, **engine_args)
 
+# SQLite 는 WAL 저널 모드로 열어 크롤링 중에도 추천 백엔드의 읽기가 막히지 않도록 합니다.
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -29,17 +38,31 @@ class InstagramPost(Base):
     instagram_post_url = Column(String(512), unique=True, index=True, nullable=False)
     caption_text = Column(Text, nullable=True)
     hashtags_representation = Column(Text, nullable=True) # 예: '["#태그1", "#태그2"]'
-    # crawled_at 필드 제거됨
+    # 수집 시각 (ISO 문자열, 예: '2024-05-01T12:30:00'). 트렌딩(최근 7/30/90일 언급 수) 집계 기준이며 이전 게시물은 NULL
+    crawled_at = Column(String(32), nullable=True, index=True)
 
     def __repr__(self):
-        # crawled_at이 없으므로 __repr__에서도 해당 부분 제거
         return (f"<InstagramPost(id={self.id}, "
+                f"crawled_at='{self.crawled_at}', "
                 f"url='{self.instagram_post_url}', "
                 f"caption='{(self.caption_text or '')[:30]}...', "
                 f"hashtags='{(self.hashtags_representation or '')[:30]}...')>")
 
 
-# --- 3. 데이터베이스 테이블 생성 함수 ---
+# --- 3. 게시물 해시태그 모델 정의 ---
+# 게시물마다 정규화한 해시태그를 한 행씩 저장합니다 (recommend_backend/post_hashtags.py 와 같은 스키마).
+# 추천 백엔드는 hashtags_representation 을 LIKE 로 훑는 대신 tag_normalized 인덱스로 태그를 찾습니다.
+class PostHashtag(Base):
+    __tablename__ = "post_hashtags"
+
+    post_id = Column(Integer, ForeignKey("instagram_posts.id"), primary_key=True)
+    tag_normalized = Column(String(255), primary_key=True, index=True) # 예: '경산맛집' (#, 공백 제거, 소문자)
+
+    def __repr__(self):
+        return f"<PostHashtag(post_id={self.post_id}, tag='{self.tag_normalized}')>"
+
+
+# --- 4. 데이터베이스 테이블 생성 함수 ---
 def create_db_tables():
     """
     SQLAlchemy 모델 정의에 따라 데이터베이스에 테이블을 생성합니다.
@@ -48,12 +71,19 @@ def create_db_tables():
     try:
         print(f"데이터베이스({DATABASE_URL})에 테이블 생성을 시도합니다...")
         Base.metadata.create_all(bind=engine)
+        # 예전 DB 에는 crawled_at 컬럼이 없으므로 추가합니다 (create_all 은 기존 테이블을 바꾸지 않음)
+        columns = {column["name"] for column in inspect(engine).get_columns("instagram_posts")}
+        if "crawled_at" not in columns:
+            with engine.begin() as connection:
+                connection.execute(text("ALTER TABLE instagram_posts ADD COLUMN crawled_at VARCHAR(32)"))
+                connection.execute(text("CREATE INDEX IF NOT EXISTS ix_instagram_posts_crawled_at ON instagram_posts (crawled_at)"))
+            print("instagram_posts 에 crawled_at 컬럼을 추가했습니다.")
         print("테이블 생성 또는 확인 완료.")
     except Exception as e:
         print(f"데이터베이스 테이블 생성 중 심각한 오류 발생: {e}")
 
 
-# --- 4. 이 파일을 직접 실행했을 때 테이블 생성 테스트 ---
+# --- 5. 이 파일을 직접 실행했을 때 테이블 생성 테스트 ---
 if __name__ == "__main__":
     print("model_proto.py가 직접 실행되었습니다.")
     print(f"데이터베이스 URL: {DATABASE_URL}")
@@ -0,0 +1,262 @@
+import statistics
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# --- 크롤러 공용 대기(pacing) 엔진 ---
+# crawler.py / prototype.py 의 고정 time.sleep 대신 구체적인 DOM 조건(요소 등장, scrollHeight 변화,
+# 상세 iframe 교체, 목록 내용 변화)이 맞을 때까지만 기다립니다.
+# 대기 종류(kind)별로 실제로 걸린 시간을 모아 제한 시간을 최근 p95 x TIMEOUT_MULTIPLIER 로 맞추므로
+# 페이지가 빠를 때는 바로 넘어가고, 느려지면(시간 초과가 나면) 제한 시간이 늘어납니다.
+# 차단(캡차, 로그인 챌린지 등)이나 평소보다 크게 느려진 응답이 보이면 같은 Backoff 를 쓰는 모든 드라이버가
+# 지수적으로 늘어나는 시간만큼 쉬었다가 진행합니다.
+# Pacer.report() 는 전체 시간을 조건 대기 / 요청 간격 / backoff / 실제 작업으로 나눠 보여 줍니다.
+
+DEFAULT_TIMEOUT = 10.0     # 기본 제한 시간이 없는 대기 종류
+SAMPLE_WINDOW = 50         # 종류별로 기억하는 최근 소요 시간 수
+MIN_SAMPLES = 5            # 이보다 적게 측정한 종류는 기본 제한 시간 사용
+TIMEOUT_MULTIPLIER = 3.0
+MIN_TIMEOUT = 3.0          # 시간 초과면 건너뛰는 대기의 최소 제한 시간
+MIN_SOFT_TIMEOUT = 1.0     # '변화 없음'이 정상인 대기(soft)의 최소 제한 시간
+MAX_TIMEOUT = 30.0
+SLOWDOWN_FACTOR = 4.0      # 중앙값의 이 배수보다 오래 걸리면 느려진 것으로 봅니다
+POLL_INTERVAL = 0.1
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 300.0
+RELAX_AFTER = 20           # 정상 대기가 이만큼 이어지면 backoff 단계를 하나 내립니다
+
+
+# --- DOM 조건 (WebDriverWait.until 에 넘기는 함수, 맞으면 참인 값을 돌려줌) ---
+def scroll_height_changed(element, last_height):
+    """element 의 scrollHeight 가 last_height 와 달라지면 새 높이"""
+    def condition(driver):
+        height = driver.execute_script("return arguments[0].scrollHeight", element)
+        return height if height != last_height else False
+    return condition
+
+
+def page_height_grew(last_height):
+    """문서 전체 높이(document.body.scrollHeight)가 last_height 보다 커지면 새 높이"""
+    def condition(driver):
+        height = driver.execute_script("return document.body.scrollHeight")
+        return height if height > last_height else False
+    return condition
+
+
+def text_changed(locator, previous_text):
+    """locator 의 첫 요소가 있고 글자가 previous_text 와 달라지면 그 요소 (목록이 다른 페이지로 바뀜)"""
+    def condition(driver):
+        elements = driver.find_elements(*locator)
+        return elements[0] if elements and elements[0].text != previous_text else False
+    return condition
+
+
+def attribute_changed(locator, name, previous_value):
+    """locator 의 요소가 있고 name 속성이 previous_value 와 달라지면 그 요소 (상세 iframe 이 새 가게로 바뀜)"""
+    def condition(driver):
+        elements = driver.find_elements(*locator)
+        return elements[0] if elements and elements[0].get_attribute(name) != previous_value else False
+    return condition
+
+
+class RateLimiter:
+    """초당 rate 번을 넘지 않도록 호출 간격을 벌립니다 (여러 스레드가 같이 써도 안전, 0 이면 제한 없음)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_time)
+            self._next_time = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+    def sent(self):
+        """실제로 요청을 보낸 시각부터 다시 간격을 잽니다 (다른 제한 때문에 늦게 보낸 경우)"""
+        if not self.interval:
+            return
+        with self._lock:
+            self._next_time = max(self._next_time, time.monotonic() + self.interval)
+
+
+class LatencyModel:
+    """대기 종류별 최근 소요 시간과 그로부터 정한 제한 시간 (여러 드라이버가 같이 씀)"""
+
+    def __init__(self, defaults=None):
+        self.defaults = dict(defaults or {})
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, kind, seconds):
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=SAMPLE_WINDOW)).append(seconds)
+
+    def _sorted(self, kind):
+        with self._lock:
+            return sorted(self._samples.get(kind, ()))
+
+    def typical(self, kind):
+        """최근 소요 시간 중앙값 (측정이 MIN_SAMPLES 보다 적으면 None)"""
+        samples = self._sorted(kind)
+        return statistics.median(samples) if len(samples) >= MIN_SAMPLES else None
+
+    def timeout(self, kind, minimum=MIN_TIMEOUT):
+        samples = self._sorted(kind)
+        if len(samples) < MIN_SAMPLES:
+            return self.defaults.get(kind, DEFAULT_TIMEOUT)
+        p95 = samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+        return min(max(p95 * TIMEOUT_MULTIPLIER, minimum), MAX_TIMEOUT)
+
+    def summary(self):
+        with self._lock:
+            kinds = sorted(self._samples)
+        return {
+            kind: {"count": len(self._sorted(kind)), "p50": round(statistics.median(self._sorted(kind)), 2),
+                   "timeout": round(self.timeout(kind), 2)}
+            for kind in kinds
+        }
+
+
+class Backoff:
+    """차단/느려짐이 보이면 같은 Backoff 를 쓰는 모든 드라이버가 함께 쉬는 시간.
+
+    연속으로 감지되면 BACKOFF_BASE 부터 두 배씩 늘고(최대 BACKOFF_MAX), 정상 대기가 이어지면 줄어듭니다.
+    """
+
+    def __init__(self, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+        self.base = base
+        self.maximum = maximum
+        self.level = 0
+        self.events = {}
+        self._until = 0.0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def trigger(self, reason):
+        """쉬는 시간을 한 단계 늘리고 그 길이(초)를 돌려줍니다"""
+        with self._lock:
+            delay = min(self.base * (2 ** self.level), self.maximum)
+            self.level += 1
+            self._successes = 0
+            self._until = max(self._until, time.monotonic() + delay)
+            self.events[reason] = self.events.get(reason, 0) + 1
+        return delay
+
+    def succeeded(self):
+        with self._lock:
+            self._successes += 1
+            if self.level and self._successes >= RELAX_AFTER:
+                self.level -= 1
+                self._successes = 0
+
+    def remaining(self):
+        with self._lock:
+            return max(self._until - time.monotonic(), 0.0)
+
+
+class Pacer:
+    """드라이버 하나의 대기를 맡습니다: 요청 간격 제한, 조건 대기, backoff, 시간 집계.
+
+    model/backoff 는 여러 드라이버가 같이 써서 측정과 쉬는 시간을 공유하고,
+    limiters 는 요청(페이지 이동, 클릭) 전에 지킬 RateLimiter 들입니다 (드라이버별 + 전체).
+    block_check(driver) 는 차단 화면이면 참을 돌려주는 함수입니다.
+    """
+
+    def __init__(self, model=None, backoff=None, limiters=(), block_check=None):
+        self.model = model or LatencyModel()
+        self.backoff = backoff or Backoff()
+        self.limiters = limiters
+        self.block_check = block_check
+        self.started = time.monotonic()
+        self.seconds = {"waiting": 0.0, "throttled": 0.0, "backoff": 0.0}
+        self.timeouts = 0
+
+    def wait(self):
+        """요청을 보내기 직전에 부릅니다: backoff 중이면 쉬고, 요청 간격 제한을 지킵니다"""
+        remaining = self.backoff.remaining()
+        if remaining > 0:
+            time.sleep(remaining)
+            self.seconds["backoff"] += remaining
+        started = time.monotonic()
+        for limiter in self.limiters:
+            limiter.wait()
+        for limiter in self.limiters:
+            limiter.sent()
+        self.seconds["throttled"] += time.monotonic() - started
+
+    def until(self, driver, kind, condition, timeout=None, soft=False):
+        """condition(driver) 이 참이 될 때까지 기다려 그 값을 돌려줍니다.
+
+        제한 시간은 kind 별로 학습한 값이고, 넘으면 TimeoutException 입니다.
+        soft 는 '변화 없음'이 정상 결과인 대기(스크롤 끝 감지 등)로, 시간 초과면 None 을 돌려주고 측정에 넣지 않습니다.
+        """
+        limit = timeout if timeout is not None else self.model.timeout(kind, MIN_SOFT_TIMEOUT if soft else MIN_TIMEOUT)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(driver, limit, poll_frequency=POLL_INTERVAL,
+                                   ignored_exceptions=(StaleElementReferenceException,)).until(condition)
+        except TimeoutException:
+            self.seconds["waiting"] += time.monotonic() - started
+            if soft:
+                return None
+            self.timeouts += 1
+            self.model.observe(kind, limit)  # 다음에는 더 오래 기다리도록
+            self._slow_down(driver, kind, "timeout")
+            raise
+        elapsed = time.monotonic() - started
+        self.seconds["waiting"] += elapsed
+        typical = self.model.typical(kind)
+        self.model.observe(kind, elapsed)
+        if typical is not None and elapsed > max(typical * SLOWDOWN_FACTOR, MIN_TIMEOUT):
+            self._slow_down(driver, kind, "slow")
+        else:
+            self.backoff.succeeded()
+        return result
+
+    def is_blocked(self, driver):
+        if self.block_check is None:
+            return False
+        try:
+            return bool(self.block_check(driver))
+        except Exception:
+            return False
+
+    def _slow_down(self, driver, kind, reason):
+        if self.is_blocked(driver):
+            reason = "block"
+        delay = self.backoff.trigger(reason)
+        label = {"block": "차단 화면 감지", "timeout": "시간 초과", "slow": "응답 느려짐"}[reason]
+        print(f"   [pacing] '{kind}' {label}: 다음 요청 전에 {delay:.0f}초 쉽니다.")
+
+    def report(self):
+        wall = time.monotonic() - self.started
+        idle = sum(self.seconds.values())
+        return {
+            "wall": round(wall, 1),
+            **{key: round(value, 1) for key, value in self.seconds.items()},
+            "working": round(max(wall - idle, 0.0), 1),
+            "timeouts": self.timeouts,
+            "backoff_events": dict(self.backoff.events),
+            "kinds": self.model.summary(),
+        }
+
+    def format_report(self):
+        report = self.report()
+        wall = report["wall"] or 1.0
+        lines = [
+            f"전체 {report['wall']:.0f}초 = 작업 {report['working']:.0f}초 ({report['working'] / wall:.0%}) "
+            f"+ 조건 대기 {report['waiting']:.0f}초 + 요청 간격 {report['throttled']:.0f}초 + backoff {report['backoff']:.0f}초 "
+            f"(시간 초과 {report['timeouts']}건)"
+        ]
+        for kind, summary in report["kinds"].items():
+            lines.append(f"  - {kind}: {summary['count']}회, 중앙값 {summary['p50']}초, 현재 제한 {summary['timeout']}초")
+        return "\n".join(lines)
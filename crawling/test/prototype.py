@@ -4,22 +4,58 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
 from selenium.webdriver.chrome.service import Service
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
+from batch_writer import BatchWriter, dialect_insert
+from pacing import LatencyModel, Pacer, RateLimiter, page_height_grew
 
-import time
 import urllib.parse
+from datetime import datetime
 import json
+import os
 import re
+import sqlite3
+import sys
 
 # --- 데이터베이스 관련 모듈 임포트 ---
 try:
-    from model_proto import InstagramPost, SessionLocal, create_db_tables
+    from model_proto import InstagramPost, PostHashtag, SessionLocal, create_db_tables, engine
     print("데이터베이스 모델, 세션, 테이블 생성 함수 임포트 성공.")
     DB_ENABLED = True
 except ImportError:
     print("DB 관련 모듈 임포트 실패. DB 저장 기능 비활성화.")
     DB_ENABLED = False
-    InstagramPost, SessionLocal, create_db_tables = None, None, None
+    InstagramPost, PostHashtag, SessionLocal, create_db_tables, engine = None, None, None, None, None
+
+# --- 게시물-식당 연결 작업 임포트 (recommend_backend/link_mentions.py) ---
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "recommend_backend")
+RESTAURANT_DB_PATH = os.path.join(BACKEND_DIR, "restarant.db")
+try:
+    sys.path.append(BACKEND_DIR)
+    from link_mentions import link_new_posts
+    LINKER_ENABLED = True
+except ImportError:
+    print("게시물-식당 연결 모듈 임포트 실패. 연결 작업 비활성화.")
+    LINKER_ENABLED = False
+    link_new_posts = None
+
+# --- 해시태그 정규화 테이블 임포트 (recommend_backend/post_hashtags.py) ---
+try:
+    from post_hashtags import backfill_hashtags, parse_hashtags
+    HASHTAGS_ENABLED = True
+except ImportError:
+    print("해시태그 정규화 모듈 임포트 실패. post_hashtags 저장 비활성화.")
+    HASHTAGS_ENABLED = False
+    backfill_hashtags, parse_hashtags = None, None
+
+# --- 랭킹 점수 정규화 표 갱신 임포트 (recommend_backend/score_tables.py) ---
+SCORE_TABLES_PATH = os.path.join(BACKEND_DIR, "score_tables.json")
+try:
+    from score_tables import build_score_tables
+    SCORE_TABLES_ENABLED = True
+except ImportError:
+    print("점수 정규화 표 모듈 임포트 실패. 정규화 표 갱신 비활성화.")
+    SCORE_TABLES_ENABLED = False
+    build_score_tables = None
 
 # --- 설정 ---
 CHROMEDRIVER_PATH = 'C:/Users/a/Desktop/programming language/chromedriver-win64/chromedriver.exe'
@@ -37,7 +73,29 @@ ELEMENT_WAIT_TIMEOUT = 15
 INITIAL_PAGE_LOAD_TIME = 8
 MANUAL_VERIFICATION_WAIT_TIME = 60
 
+# --- 대기 설정 (pacing.py) ---
+# 고정 sleep 대신 DOM 조건(게시물 링크 등장, 문서 높이 증가, 팝업 닫힘)을 기다립니다.
+# 아래 시간은 측정이 모이기 전의 첫 제한 시간이고, 이후에는 최근 소요 시간으로 다시 정합니다.
+# 챌린지/일시 제한 화면이나 크게 느려진 응답이 보이면 다음 요청 전에 점점 길게 쉽니다.
+INSTAGRAM_REQUESTS_PER_SEC = 0.5  # 페이지 이동/스크롤(추가 게시물 요청) 간격
+INSTAGRAM_WAIT_TIMEOUTS = {
+    "tag_page": INITIAL_PAGE_LOAD_TIME + ELEMENT_WAIT_TIMEOUT,  # 해시태그 페이지의 첫 게시물 링크
+    "post_links": ELEMENT_WAIT_TIMEOUT,
+    "scroll": SCROLL_PAUSE_TIME,  # 스크롤 후 문서 높이 증가 (없으면 더 불러올 게시물 없음)
+    "popup_close": 2,
+}
+
 # --- 유틸리티 함수 ---
+def instagram_blocked(driver):
+    """인스타그램이 챌린지/일시 제한 화면을 띄웠는지 (pacing 의 차단 감지용, 시간 초과/느려짐 때만 부름)"""
+    if any(path in driver.current_url for path in ("/challenge/", "/accounts/suspended/")):
+        return True
+    return bool(driver.find_elements(
+        By.XPATH, "//*[contains(text(),'Please wait a few minutes') or contains(text(),'잠시 후 다시 시도')]"))
+
+PACER = Pacer(LatencyModel(INSTAGRAM_WAIT_TIMEOUTS), limiters=(RateLimiter(INSTAGRAM_REQUESTS_PER_SEC),),
+              block_check=instagram_blocked)
+
 def handle_popups(driver): # 이전 버전으로 복원된 함수
     """로그인 후 나타날 수 있는 팝업들을 처리합니다."""
     print("로그인 후 팝업 처리 시도...")
@@ -54,7 +112,7 @@ def handle_popups(driver): # 이전 버전으로 복원된 함수
             )
             print(f"'{popup['name']}' 팝업 버튼 클릭.")
             button.click()
-            time.sleep(2)
+            PACER.until(driver, "popup_close", EC.staleness_of(button), soft=True)  # 팝업이 닫힐 때까지
             return True  # 팝업 처리 후 함수 종료
         except TimeoutException:
             print(f"'{popup['name']}' 팝업 없음 또는 시간 초과.")
@@ -105,10 +163,11 @@ def scroll_down_for_more_posts(driver, num_scrolls=SCROLL_ATTEMPTS_PER_CYCLE):
     last_height = driver.execute_script("return document.body.scrollHeight")
     new_content_loaded = False
     for i in range(num_scrolls):
+        PACER.wait()
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(SCROLL_PAUSE_TIME)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height > last_height:
+        # 새 게시물이 붙어 문서가 길어질 때까지 기다립니다. 제한 시간 안에 그대로면 더 불러올 게시물 없음
+        new_height = PACER.until(driver, "scroll", page_height_grew(last_height), soft=True)
+        if new_height is not None:
             print(f"  스크롤 {i+1}: 새 콘텐츠 로드됨.")
             last_height = new_height
             new_content_loaded = True
@@ -154,17 +213,26 @@ def parse_alt_text_for_content(alt_text_string, post_url=None):
     }
 
 def extract_and_save_posts_from_grid(driver, target_hash, num_posts_to_collect):
+    # 게시물은 모았다가 한 트랜잭션으로 저장합니다 (instagram_post_url 중복은 건너뜀)
+    writer = BatchWriter(engine, InstagramPost.__table__, ("instagram_post_url",),
+                         on_inserted=insert_post_hashtags if HASHTAGS_ENABLED else None) if DB_ENABLED and engine else None
+    try:
+        return collect_posts_from_grid(driver, target_hash, num_posts_to_collect, writer)
+    finally:
+        # 중간에 끝나거나(return, 예외) 멈춰도 모아 둔 게시물을 저장합니다
+        if writer: writer.close(); print(writer.format_report())
+
+def collect_posts_from_grid(driver, target_hash, num_posts_to_collect, writer):
     # (이전 답변의 간소화된 버전과 거의 동일, 핵심 로직 유지)
+    PACER.wait()
     driver.get(f"https://www.instagram.com/explore/tags/{urllib.parse.quote(target_hash)}/")
     print(f"해시태그 '{target_hash}' 페이지 접속 완료.")
-    time.sleep(INITIAL_PAGE_LOAD_TIME)
 
     collected_count = 0
     processed_urls = set()
     collected_data=[]
     new_posts_in_iteration = 0
     no_new_posts_streak = 0
-    db = SessionLocal() if DB_ENABLED and SessionLocal else None
     
 
     
@@ -175,8 +243,8 @@ def extract_and_save_posts_from_grid(driver, target_hash, num_posts_to_collect):
 
     POST_LINK_SELECTOR = 'a[href*="/p/"], a[href*="/reel/"]' # 게시물 또는 릴스 링크
     try:
-     WebDriverWait(driver, ELEMENT_WAIT_TIMEOUT).until(
-         EC.presence_of_all_elements_located((By.CSS_SELECTOR, POST_LINK_SELECTOR))
+     PACER.until(
+         driver, "tag_page", EC.presence_of_all_elements_located((By.CSS_SELECTOR, POST_LINK_SELECTOR))
      )
      print("페이지 내 게시물 링크 후보 감지됨.")
     except TimeoutException:
@@ -190,8 +258,8 @@ def extract_and_save_posts_from_grid(driver, target_hash, num_posts_to_collect):
         ordered_unique_link_elements = []
         
         try:
-            WebDriverWait(driver, ELEMENT_WAIT_TIMEOUT).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, POST_LINK_SELECTOR))
+            PACER.until(
+                driver, "post_links", EC.presence_of_all_elements_located((By.CSS_SELECTOR, POST_LINK_SELECTOR))
             )
             thumbnail_links = driver.find_elements(By.CSS_SELECTOR, POST_LINK_SELECTOR) # 썸네일 링크를 찾음
             print(f"현재 DOM에서 {len(thumbnail_links)}개의 썸네일 링크 발견.")
@@ -266,25 +334,17 @@ def extract_and_save_posts_from_grid(driver, target_hash, num_posts_to_collect):
 
                 if parsed_data:
                     print(f"  추출: {parsed_data['url'][:50]}... (캡션: {(parsed_data['caption'] or '')[:20]}...)")
-                    if db:
-                        try:
-                            hashtags_json = json.dumps(parsed_data["hashtags"], ensure_ascii=False) if parsed_data["hashtags"] else None
-                            new_post = InstagramPost(
-                                instagram_post_url=parsed_data["url"],
-                                caption_text=parsed_data["caption"],
-                                hashtags_representation=hashtags_json
-                            )
-                            db.add(new_post)
-                            db.commit()
-                            print(f"DB 저장 성공.")
-                            
-                            new_posts_in_iteration += 1
-                        except IntegrityError:
-                            db.rollback()
-                            print(f"    이미 DB에 존재하거나 저장 실패 (IntegrityError): {parsed_data['url']}")
-                        except Exception as e_db_save:
-                            db.rollback()
-                            print(f"    DB 저장 중 기타 오류: {e_db_save}")
+                    if writer:
+                        hashtags_json = json.dumps(parsed_data["hashtags"], ensure_ascii=False) if parsed_data["hashtags"] else None
+                        writer.add(dict(
+                            instagram_post_url=parsed_data["url"],
+                            caption_text=parsed_data["caption"],
+                            hashtags_representation=hashtags_json,
+                            crawled_at=datetime.now().isoformat(timespec="seconds")
+                        ))
+                        print(f"저장 대기열에 추가.")
+                        
+                        new_posts_in_iteration += 1
                     elif not DB_ENABLED:
                         
                         new_posts_in_iteration += 1
@@ -301,6 +361,7 @@ def extract_and_save_posts_from_grid(driver, target_hash, num_posts_to_collect):
                 no_new_posts_streak = 0
             
             
+        if writer: writer.flush_if_due()
         scroll_down_for_more_posts(driver, SCROLL_ATTEMPTS_PER_CYCLE) # 스크롤 시도
        
 
@@ -310,9 +371,56 @@ def extract_and_save_posts_from_grid(driver, target_hash, num_posts_to_collect):
                 break
             
 
-    if db: db.close(); print("DB 세션 종료.")
     print(f"--- 그리드 뷰 게시물 추출 완료 (총 {collected_count}개 수집) ---")
 
+def insert_post_hashtags(connection, last_id):
+    """일괄 저장으로 새로 들어간 게시물(id > last_id)의 정규화 해시태그를 같은 트랜잭션에 넣습니다"""
+    posts = connection.execute(
+        select(InstagramPost.id, InstagramPost.hashtags_representation).where(InstagramPost.id > last_id)
+    ).all()
+    rows = [{"post_id": post_id, "tag_normalized": tag}
+            for post_id, representation in posts for tag in sorted(parse_hashtags(representation))]
+    if rows:
+        connection.execute(dialect_insert(connection, PostHashtag.__table__).on_conflict_do_nothing(), rows)
+
+def backfill_post_hashtags():
+    """post_hashtags 가 없던 시절에 저장한 게시물의 해시태그를 채웁니다 (이미 있는 행은 건너뜀)."""
+    if engine.url.get_backend_name() != "sqlite":
+        print("SQLite DB가 아니어서 해시태그 테이블 채우기를 건너뜁니다.")
+        return
+    try:
+        conn = sqlite3.connect(engine.url.database)
+        try:
+            added = backfill_hashtags(conn)
+        finally:
+            conn.close()
+        if added:
+            print(f"기존 게시물 해시태그 {added}개를 post_hashtags 에 채웠습니다.")
+    except Exception as e:
+        print(f"해시태그 테이블 채우기 중 오류: {e}")
+
+def link_posts_to_places():
+    """새로 저장한 게시물을 식당과 연결합니다 (post_place_mentions 증분 갱신)."""
+    if engine.url.get_backend_name() != "sqlite":
+        print("SQLite DB가 아니어서 게시물-식당 연결을 건너뜁니다.")
+        return
+    try:
+        stats = link_new_posts(engine.url.database, RESTAURANT_DB_PATH)
+        print(f"게시물-식당 연결 완료: 게시물 {stats['posts']}개, 연결 {stats['links']}개 추가.")
+    except Exception as e:
+        print(f"게시물-식당 연결 중 오류: {e}")
+
+def refresh_score_tables():
+    """크롤링한 언급 수로 랭킹 점수 정규화(CDF) 표를 다시 만듭니다."""
+    if engine.url.get_backend_name() != "sqlite":
+        print("SQLite DB가 아니어서 점수 정규화 표 갱신을 건너뜁니다.")
+        return
+    try:
+        metadata = build_score_tables(RESTAURANT_DB_PATH, engine.url.database, SCORE_TABLES_PATH)
+        print(f"점수 정규화 표 갱신 완료: 리뷰 표 {metadata['review_groups']}개, 언급 표본 {metadata['mention_samples']}개.")
+    except Exception as e:
+        print(f"점수 정규화 표 갱신 중 오류: {e}")
+
 # --- 메인 실행 ---
 if __name__ == "__main__":
     driver = None
@@ -321,6 +429,8 @@ if __name__ == "__main__":
     if DB_ENABLED and create_db_tables:
         try: create_db_tables(); print("DB 테이블 확인/생성 완료.")
         except Exception as e: DB_ENABLED = False; print(f"DB 테이블 생성 오류: {e}. DB 비활성화.")
+    if DB_ENABLED and HASHTAGS_ENABLED:
+        backfill_post_hashtags()
 
     try:
         options = webdriver.ChromeOptions()
@@ -334,6 +444,10 @@ if __name__ == "__main__":
         if login_instagram(driver, INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD):
             print("로그인 성공.")
             extract_and_save_posts_from_grid(driver, TARGET_HASHTAG, NUM_CONTENTS_TO_EXTRACT)
+            if DB_ENABLED and LINKER_ENABLED:
+                link_posts_to_places()
+            if DB_ENABLED and SCORE_TABLES_ENABLED:
+                refresh_score_tables()
         else:
             print("로그인 실패. 크롤링 중단.")
 
@@ -341,4 +455,5 @@ if __name__ == "__main__":
     except Exception as e_main: print(f"메인 스크립트 오류: {e_main}")
     finally:
         if driver: driver.quit(); print("WebDriver 종료.")
+        print(PACER.format_report())
         print("--- 크롤링 프로세스 종료 ---")
\ No newline at end of file
@@ -0,0 +1,34 @@
+import importlib
+import os
+import shutil
+import sys
+
+import pytest
+
+# 크롤러 모듈은 패키지가 아니라 crawling/test 폴더에서 바로 import 하므로 경로에 추가합니다
+CRAWLER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(os.path.dirname(CRAWLER_DIR))
+if CRAWLER_DIR not in sys.path:
+    sys.path.insert(0, CRAWLER_DIR)
+
+
+@pytest.fixture(scope="module")
+def crawler(tmp_path_factory):
+    """임시 폴더에 복사한 crawler.py 모듈.
+
+    model.py 는 import 할 때 자기 옆의 restarant.db 를 만들고 컬럼을 추가하므로, crawler.py 와 model.py 를
+    같은 폴더 구조(crawling/test, recommend_backend)로 복사해 임시 DB 에서 돌립니다.
+    """
+    root = tmp_path_factory.mktemp("crawler")
+    work = root / "crawling" / "test"
+    work.mkdir(parents=True)
+    for name in ("crawler.py", "model.py"):
+        shutil.copy(os.path.join(CRAWLER_DIR, name), work / name)
+    os.symlink(os.path.join(REPO_DIR, "recommend_backend"), root / "recommend_backend")
+    sys.path.insert(0, str(work))
+    try:
+        yield importlib.import_module("crawler")
+    finally:
+        sys.path.remove(str(work))
+        for name in ("crawler", "model"):
+            sys.modules.pop(name, None)
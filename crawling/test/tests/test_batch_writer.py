@@ -0,0 +1,174 @@
+import pytest
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, UniqueConstraint, create_engine, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+import batch_writer
+from batch_writer import BatchWriter
+
+metadata = MetaData()
+places = Table(
+    "places", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("address2", String),
+    Column("latitude", Float),
+    Column("reviewnum", String),
+    UniqueConstraint("name", "address2", name="_name_address_uc"),
+)
+
+
+@pytest.fixture
+def engine():
+    # 메모리 DB 는 연결마다 따로 생기므로 한 연결을 계속 씁니다
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(batch_writer, "RETRY_DELAY", 0)
+
+
+def make_writer(engine, **kwargs):
+    kwargs.setdefault("fill_columns", ("latitude",))
+    kwargs.setdefault("max_rows", 3)
+    kwargs.setdefault("max_seconds", 60)
+    return BatchWriter(engine, places, ("name", "address2"), **kwargs)
+
+
+def stored(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(places.c.name, places.c.address2, places.c.latitude, places.c.reviewnum).order_by(places.c.id)
+        ).all()
+
+
+def row(name, address="경북 경산시 하양읍 하양로 18", latitude=None, reviewnum="10"):
+    return {"name": name, "address2": address, "latitude": latitude, "reviewnum": reviewnum}
+
+
+def test_flushes_when_batch_is_full(engine):
+    flushed = []
+    writer = make_writer(engine, on_flushed=lambda: flushed.append(writer.stats["batches"]))
+    writer.add(row("가"))
+    writer.add(row("나"))
+    assert writer.pending == 2 and stored(engine) == [] and flushed == []
+    writer.add(row("다"))
+    assert writer.pending == 0
+    assert [r[0] for r in stored(engine)] == ["가", "나", "다"]
+    assert flushed == [1]
+    assert writer.stats["inserted"] == 3
+
+
+def test_flush_if_due_after_max_seconds(engine, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(batch_writer.time, "monotonic", lambda: now[0])
+    writer = make_writer(engine, max_seconds=30)
+    writer.add(row("가"))
+    writer.flush_if_due()
+    assert writer.pending == 1
+    now[0] += 30
+    writer.flush_if_due()
+    assert writer.pending == 0 and len(stored(engine)) == 1
+
+
+def test_conflict_fills_only_empty_columns(engine):
+    writer = make_writer(engine)
+    writer.add(row("가"))
+    writer.add(row("나", latitude=35.1))
+    writer.flush()
+    writer.add(row("가", latitude=35.9, reviewnum="99"))  # 좌표만 채움
+    writer.add(row("나", latitude=36.0))                   # 이미 좌표가 있으면 건너뜀
+    writer.flush()
+    assert stored(engine) == [("가", "경북 경산시 하양읍 하양로 18", 35.9, "10"),
+                              ("나", "경북 경산시 하양읍 하양로 18", 35.1, "10")]
+    assert (writer.stats["inserted"], writer.stats["filled"], writer.stats["skipped"]) == (2, 1, 1)
+
+
+def test_conflict_overwrites_update_columns(engine):
+    writer = make_writer(engine, update_columns=("reviewnum",))
+    writer.add(row("가", reviewnum="10"))
+    writer.flush()
+    writer.add(row("가", reviewnum="12"))
+    writer.flush()
+    assert stored(engine)[0][3] == "12"
+    assert writer.stats["filled"] == 1
+
+
+def test_null_key_rows_do_not_duplicate(engine):
+    # 주소를 못 읽은 가게 (address2 NULL) 는 ON CONFLICT 가 걸리지 않으므로 IS NULL 로 기존 행을 찾습니다
+    writer = make_writer(engine)
+    writer.add(row("가", address=None))
+    writer.flush()
+    writer.add(row("가", address=None))                # 채울 값이 없으면 건너뜀
+    writer.add(row("가", address=None, latitude=35.9))  # 비어 있던 좌표는 채움
+    writer.add(row("나", address=None))                # 이름이 다르면 새 행
+    writer.flush()
+    assert stored(engine) == [("가", None, 35.9, "10"), ("나", None, None, "10")]
+    assert (writer.stats["inserted"], writer.stats["filled"], writer.stats["skipped"]) == (2, 1, 1)
+
+
+def test_on_inserted_sees_new_ids_in_same_transaction(engine):
+    seen = []
+
+    def on_inserted(connection, last_id):
+        seen.append(connection.execute(text("SELECT name FROM places WHERE id > :id ORDER BY id"), {"id": last_id}).scalars().all())
+
+    writer = make_writer(engine, on_inserted=on_inserted)
+    writer.add(row("가"))
+    writer.flush()
+    writer.add(row("가"))
+    writer.add(row("나"))
+    writer.flush()
+    assert seen == [["가"], ["나"]]
+
+
+def fail_writes(writer, monkeypatch, times):
+    """_write 를 times 번 실패시킵니다 (WAL 에서 잠깐 database is locked)"""
+    original = writer._write
+    calls = {"count": 0}
+
+    def flaky(rows):
+        calls["count"] += 1
+        if calls["count"] <= times:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return original(rows)
+
+    monkeypatch.setattr(writer, "_write", flaky)
+    return calls
+
+
+def test_retries_transient_failure(engine, monkeypatch):
+    writer = make_writer(engine)
+    calls = fail_writes(writer, monkeypatch, batch_writer.FLUSH_ATTEMPTS - 1)
+    writer.add(row("가"))
+    writer.flush()
+    assert calls["count"] == batch_writer.FLUSH_ATTEMPTS
+    assert writer.healthy and writer.pending == 0
+    assert writer.stats["failed"] == batch_writer.FLUSH_ATTEMPTS - 1 and writer.stats["batches"] == 1
+    assert len(stored(engine)) == 1
+
+
+def test_failed_batch_is_kept_and_written_later(engine, monkeypatch):
+    flushed = []
+    writer = make_writer(engine, on_flushed=lambda: flushed.append(True))
+    fail_writes(writer, monkeypatch, batch_writer.FLUSH_ATTEMPTS)
+    writer.add(row("가"))
+    writer.add(row("나"))
+    writer.flush()
+    assert not writer.healthy and writer.pending == 2 and flushed == []
+    writer.add(row("다"))  # 되돌린 행 뒤에 붙고, 다음 저장에서 같이 나감
+    assert writer.healthy and writer.pending == 0 and flushed == [True]
+    assert [r[0] for r in stored(engine)] == ["가", "나", "다"]
+
+
+def test_close_raises_when_rows_remain(engine, monkeypatch):
+    writer = make_writer(engine)
+    fail_writes(writer, monkeypatch, batch_writer.FLUSH_ATTEMPTS)
+    writer.add(row("가"))
+    with pytest.raises(RuntimeError):
+        writer.close()
+    assert writer.pending == 1 and stored(engine) == []
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import select, text
+
+import batch_writer
+
+AREA = "테스트동"
+
+
+@pytest.fixture
+def writer_and_checkpoint(crawler, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_writer, "RETRY_DELAY", 0)
+    with crawler.engine.begin() as connection:
+        connection.execute(text("DELETE FROM mapinformation"))
+    checkpoint = crawler.CrawlCheckpoint(str(tmp_path / "crawl_checkpoint.json"))
+    writer = crawler.make_place_writer(max_rows=2, max_seconds=600, on_flushed=checkpoint.save)
+    return writer, checkpoint
+
+
+def place(crawler, name):
+    return dict(area=AREA, name=name, category="한식", address2=f"경북 경산시 {name}로 1", rating="4.5",
+                reviewnum="10", latitude=35.8, longitude=128.7, updated_at="2026-10-01T12:00:00")
+
+
+def saved_names(crawler):
+    with crawler.engine.connect() as connection:
+        return connection.execute(
+            select(crawler.mapinformation.name).where(crawler.mapinformation.area == AREA).order_by(crawler.mapinformation.id)
+        ).scalars().all()
+
+
+def test_checkpoint_waits_for_flush(crawler, writer_and_checkpoint):
+    writer, checkpoint = writer_and_checkpoint
+    # crawl_page_items 처럼 항목을 보기 전에 mark(다음 항목 번호) 하고 가게를 저장기에 넣습니다
+    checkpoint.mark(AREA, 1, 0, writer)
+    assert checkpoint.load() == (AREA, 1, 0)
+    writer.add(place(crawler, "가"))
+    checkpoint.mark(AREA, 1, 1, writer)
+    assert checkpoint.load() == (AREA, 1, 0)  # '가' 가 아직 DB 에 없음
+    writer.add(place(crawler, "나"))         # 배치가 차서 저장 → on_flushed 로 위치를 남김
+    assert saved_names(crawler) == ["가", "나"]
+    assert checkpoint.load() == (AREA, 1, 1)
+    checkpoint.mark(AREA, 1, 2, writer)
+    assert checkpoint.load() == (AREA, 1, 2)
+
+
+def test_checkpoint_stays_put_while_flush_fails(crawler, writer_and_checkpoint, monkeypatch):
+    writer, checkpoint = writer_and_checkpoint
+    checkpoint.mark(AREA, 3, 0, writer)
+    original = writer._write
+
+    def locked(rows):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(writer, "_write", locked)
+    writer.add(place(crawler, "가"))
+    checkpoint.mark(AREA, 3, 1, writer)
+    writer.add(place(crawler, "나"))  # 저장 실패, 행은 버퍼에 남음
+    assert not writer.healthy and writer.pending == 2
+    checkpoint.mark(AREA, 3, 2, writer)
+    assert checkpoint.load() == (AREA, 3, 0)  # 멈추면 '가' 부터 다시
+    assert saved_names(crawler) == []
+
+    monkeypatch.setattr(writer, "_write", original)
+    writer.close()
+    assert saved_names(crawler) == ["가", "나"]
+    assert checkpoint.load() == (AREA, 3, 2)
+    checkpoint.clear()
+    assert checkpoint.load() is None
+
+
+def test_known_places_skip_by_occurrence(crawler):
+    known = crawler.KnownPlaces()
+    known.remember("봉자막창", AREA, "경북 경산시 문화로 10", "2026-10-01T12:00:00")
+    known.remember("봉자막창", AREA, "경북 경산시 성암로 3", "2026-10-01T12:00:00")
+    # 한 페이지에 같은 이름이 세 번 나오면 저장된 두 지점까지만 건너뜀
+    assert [known.should_skip("봉자막창", AREA, occurrence) for occurrence in range(3)] == [True, True, False]
+    assert not known.should_skip("봉자막창", "다른동", 0)
+
+    stale = crawler.KnownPlaces(refresh_before="2026-10-10T00:00:00")
+    stale.remember("봉자막창", AREA, "경북 경산시 문화로 10", "2026-10-01T12:00:00")
+    assert not stale.should_skip("봉자막창", AREA, 0)
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+
+# --- 요청 합치기(singleflight)와 동시 처리 제한 ---
+# 같은 지역을 여러 사용자가 동시에 열면 KakaoMap.js 가 거의 같은 /recommend 요청을 한꺼번에 보냅니다.
+# 장소 집합 + 가중치 프리셋이 같은 요청은 먼저 온 요청 하나만 계산하고 나머지는 그 결과를 기다립니다.
+# 동시에 계산하는 요청 수는 제한하고, 자리를 기다리는 시간이 예산을 넘으면 바로 503 으로 돌려보냅니다.
+
+
+class AdmissionRejected(Exception):
+    """대기 시간 예산 안에 처리 자리를 얻지 못했을 때"""
+
+
+def request_key(places, ranking_preference):
+    """장소 순서와 무관한 (장소 집합, 가중치 프리셋) 해시"""
+    canonical = sorted(
+        json.dumps(place.model_dump(), sort_keys=True, ensure_ascii=False) for place in places
+    )
+    payload = json.dumps([ranking_preference, canonical], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """같은 키로 진행 중인 작업이 있으면 새로 시작하지 않고 그 결과를 함께 기다립니다"""
+
+    def __init__(self):
+        self._in_flight = {}
+        self.coalesced = 0
+
+    async def do(self, key, factory):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # 기다리던 요청 하나가 끊겨도 공유 작업은 취소되지 않도록 shield 합니다
+        return await asyncio.shield(task)
+
+
+class AdmissionLimiter:
+    """최대 max_concurrent 개까지 동시에 처리하고, queue_timeout 초 넘게 기다리면 거절합니다"""
+
+    def __init__(self, max_concurrent, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            yield
+            return
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.queue_timeout}초 안에 처리 자리를 얻지 못했습니다") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
@@ -0,0 +1,70 @@
+from place_spatial import RTREE_TABLE
+from post_hashtags import HASHTAG_TABLE, normalize_hashtag
+
+# --- 요청 단위 일괄(set-based) SQL 매칭 ---
+# 장소마다 SQL 을 따로 보내는 대신, 요청에 들어온 장소 전체를 VALUES CTE 한 개로 올려 두고
+# 전략마다 그 CTE 와 조인해 한 문장으로 모든 장소를 처리합니다.
+# 읽기 전용 연결(query_only)에서도 쓸 수 있도록 임시 테이블 대신 CTE 를 쓰며,
+# 요청당 SQL 왕복 횟수는 장소 수와 관계없이 일정합니다.
+#   - 좌표 근처 식당: 장소별 경계 상자 CTE x R*Tree 조인 (fetch_nearby_rows)
+#   - 인스타 언급 수: 장소별 캡션 패턴/해시태그 CTE x instagram_posts / post_hashtags 조인 ("batch" 엔진)
+
+
+def values_cte(name, columns, rows):
+    """`name(col, ...) AS (VALUES (?, ...), ...)` 와 파라미터 (rows 가 비어 있으면 빈 CTE)"""
+    if not rows:
+        nulls = ", ".join(f"NULL AS {column}" for column in columns)
+        return f"{name} AS (SELECT {nulls} WHERE 0)", []
+    row_marks = "(" + ", ".join("?" * len(columns)) + ")"
+    params = [value for row in rows for value in row]
+    return f"{name}({', '.join(columns)}) AS (VALUES {', '.join([row_marks] * len(rows))})", params
+
+
+def build_nearby_batch_query(boxes):
+    """{장소 키: bounding_box() 결과} 의 상자 안 식당 id 를 한 번에 찾는 쿼리.
+
+    결과 행은 (장소 키, mapinformation.id) 이고, 장소 키 순서대로 나옵니다.
+    """
+    cte, params = values_cte("boxes", ("place", "max_lat", "min_lat", "max_lng", "min_lng"),
+                             [(key, *box) for key, box in boxes.items()])
+    query = (
+        f"WITH {cte} "
+        f"SELECT b.place, r.id FROM boxes b JOIN {RTREE_TABLE} r "
+        "ON r.min_lat <= b.max_lat AND r.max_lat >= b.min_lat AND r.min_lng <= b.max_lng AND r.max_lng >= b.min_lng "
+        "ORDER BY b.place, r.id"
+    )
+    return query, params
+
+
+def build_batch_mention_query(place_keywords, hashtag_table=True):
+    """{장소 키: (키워드 집합, 해시태그 검색 여부)} 의 장소별 중복 제거 게시물 수를 세는 쿼리.
+
+    like 엔진과 같은 규칙입니다: 캡션은 `LIKE %키워드%`, 해시태그는 post_hashtags 가 있으면
+    정규화 태그 같음 비교, 없으면 `hashtags_representation LIKE %#키워드%`.
+    결과 행은 (장소 키, 언급 수) 이고 언급이 없는 장소는 나오지 않습니다.
+    """
+    caption_rows, hashtag_rows = [], []
+    for key, (keywords, search_hashtags) in place_keywords.items():
+        for keyword in sorted(keywords):
+            caption_rows.append((key, f"%{keyword}%"))
+            if search_hashtags:
+                tag = normalize_hashtag(keyword) if hashtag_table else f"%#{keyword}%"
+                if tag:
+                    hashtag_rows.append((key, tag))
+
+    caption_cte, caption_params = values_cte("caption_terms", ("place", "pattern"), caption_rows)
+    hashtag_cte, hashtag_params = values_cte("hashtag_terms", ("place", "tag"), hashtag_rows)
+    if hashtag_table:
+        hashtag_select = (f"SELECT t.place, h.post_id FROM hashtag_terms t "
+                          f"JOIN {HASHTAG_TABLE} h ON h.tag_normalized = t.tag")
+    else:
+        hashtag_select = ("SELECT t.place, p.id FROM hashtag_terms t "
+                          "JOIN instagram_posts p ON p.hashtags_representation LIKE t.tag")
+    query = (
+        f"WITH {caption_cte}, {hashtag_cte} "
+        "SELECT place, COUNT(DISTINCT post_id) FROM ("
+        "SELECT t.place, p.id AS post_id FROM caption_terms t JOIN instagram_posts p ON p.caption_text LIKE t.pattern "
+        f"UNION ALL {hashtag_select}"
+        ") GROUP BY place"
+    )
+    return query, caption_params + hashtag_params
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from bench_serialization import BACKEND_PATH, lean_path, load_backend, sample_payload
+
+# --- 추천 백엔드 벤치마크 모음 ---
+# 저장소에 들어 있는 restarant.db / finally.db 복사본으로 매칭·랭킹 경로를 측정합니다.
+#   micro: 리뷰 매칭 전략별(exact, 1~4, 매칭 실패) resolve_place 호출 시간, 인스타 언급 엔진별 조회 시간,
+#          점수 계산 + 응답 직렬화 시간
+#   e2e  : /recommend 요청 1건 (장소 15/45/200개, 캐시 비운 cold / 같은 요청 반복 warm)
+#   load : 동시 클라이언트 N개가 서로 다른 요청을 보내는 부하 (처리량, p50/p95/p99, 503 비율)
+# 장소 데이터는 test_data.json 모양의 카카오 장소를 restarant.db 식당 이름/주소로 시드 고정 생성합니다.
+# 결과는 JSON 으로 저장하고(--save-baseline), 기준선과 비교해 threshold 이상 느려지면 종료 코드 1 을 돌려줍니다.
+#
+# 사용법:
+#   python bench_recommend.py --save-baseline bench_baseline.json
+#   python bench_recommend.py --compare bench_baseline.json --threshold 0.2
+#   MATSPOT_MENTION_ENGINE=automaton python bench_recommend.py --suite e2e --compare bench_baseline.json
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REVIEW_DB = os.path.join(BACKEND_DIR, "restarant.db")
+DEFAULT_INSTA_DB = os.path.join(BACKEND_DIR, "..", "crawling", "test", "finally.db")
+DEFAULT_TEST_DATA = os.path.join(BACKEND_DIR, "..", "test_data.json")
+
+SUITES = ("micro", "e2e", "load")
+E2E_SIZES = (15, 45, 200)
+MICRO_SAMPLE_SIZE = 600
+DEFAULT_THRESHOLD = 0.15
+
+CATEGORIES = ("음식점 > 한식", "음식점 > 일식", "음식점 > 중식", "음식점 > 양식", "음식점 > 카페")
+BRANCH_WORDS = ("본점", "2호점", "역점", "직영점")
+
+
+# --- 카카오 장소 모양의 합성 데이터 ---
+class PayloadFactory:
+    """restarant.db 식당과 test_data.json 장소로 /recommend 요청 본문을 만듭니다 (시드 고정)"""
+
+    def __init__(self, review_db, test_data_path, seed=2024):
+        conn = sqlite3.connect(f"file:{review_db}?mode=ro", uri=True)
+        try:
+            self.rows = conn.execute(
+                "SELECT name, address2 FROM mapinformation WHERE name IS NOT NULL AND address2 IS NOT NULL ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+        with open(test_data_path, encoding="utf-8") as f:
+            self.templates = json.load(f)["mapRestaurants"]
+        self.random = random.Random(seed)
+        self.next_id = 1
+
+    def place(self):
+        """절반은 DB 이름 그대로, 나머지는 지점명/공백 변형이나 DB 에 없는 이름"""
+        template = self.random.choice(self.templates)
+        roll = self.random.random()
+        name, address = self.random.choice(self.rows)
+        if roll < 0.5:
+            place_name = name
+        elif roll < 0.7:
+            place_name = f"{name} {self.random.choice(BRANCH_WORDS)}"
+        elif roll < 0.85:
+            place_name = name.replace(" ", "")
+        else:
+            place_name = f"{template['place_name']} {self.random.randint(1, 999)}호"
+        road_address = " ".join(address.split()[:5])
+        place_id = str(10_000_000 + self.next_id)
+        self.next_id += 1
+        return {
+            "id": place_id, "place_name": place_name, "category_name": self.random.choice(CATEGORIES),
+            "phone": f"053-{self.random.randint(100, 999)}-{self.random.randint(1000, 9999)}",
+            "address_name": template["address_name"], "road_address_name": road_address,
+            "x": f"{float(template['x']) + self.random.uniform(-0.01, 0.01):.6f}",
+            "y": f"{float(template['y']) + self.random.uniform(-0.01, 0.01):.6f}",
+            "place_url": f"http://place.map.kakao.com/{place_id}",
+            "distance": str(self.random.randint(10, 2000)),
+        }
+
+    def payload(self, count, ranking_preference="balanced"):
+        return {"places": [self.place() for _ in range(count)], "ranking_preference": ranking_preference}
+
+
+# --- 측정 도우미 ---
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def metric(value, unit, better="lower"):
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def median_us_per_call(func, inputs, rounds):
+    """inputs 전체를 rounds 번 돌려 호출당 시간(µs)의 중앙값"""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for args in inputs:
+            func(*args)
+        samples.append((time.perf_counter() - started) / len(inputs) * 1e6)
+    return statistics.median(samples)
+
+
+def clear_caches(backend):
+    backend.review_cache.clear()
+    backend.mention_cache.clear()
+
+
+# --- micro ---
+async def run_micro(backend, factory, rounds):
+    results = {}
+    index = await backend.current_place_index()
+    places = [backend.Place(**factory.place()) for _ in range(MICRO_SAMPLE_SIZE)]
+
+    # 장소마다 어떤 전략으로 매칭되는지 먼저 나눈 뒤, 전략별로 resolve_place 호출 시간을 잽니다
+    by_strategy = {}
+    for place in places:
+        cleaned_address = backend.clean_road_address(place.road_address_name)
+        _, strategy = backend.resolve_place(index, place.place_name, cleaned_address)
+        by_strategy.setdefault(str(strategy) if strategy else "none", []).append((index, place.place_name, cleaned_address))
+    for strategy, inputs in sorted(by_strategy.items()):
+        results[f"micro.review_strategy.{strategy}"] = metric(median_us_per_call(backend.resolve_place, inputs, rounds), "us")
+        results[f"micro.review_strategy.{strategy}.share"] = metric(len(inputs) / len(places), "ratio", better="info")
+
+    # 인스타 언급 엔진별 45개 장소 조회 (캐시 비움)
+    engines = ["like", "batch", "automaton"]
+    conn = sqlite3.connect(f"file:{backend.INSTA_DB_PATH}?mode=ro", uri=True)
+    try:
+        if conn.execute(backend.FTS_EXISTS_QUERY).fetchone():
+            engines.append("fts")
+        if conn.execute(backend.LINK_EXISTS_QUERY).fetchone():
+            engines.append("linked")
+    finally:
+        conn.close()
+    batch = places[:45]
+    for engine in engines:
+        fetch = backend.MENTION_ENGINES[engine]
+        await fetch(batch)  # 게시물 사본 등 지연 로딩은 측정에서 뺍니다
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await fetch(batch)
+            samples.append((time.perf_counter() - started) * 1e3)
+        results[f"micro.mention_engine.{engine}.45"] = metric(statistics.median(samples), "ms")
+
+    # 점수 계산 + 응답 직렬화
+    for size in (45, 200):
+        payload, review_map, insta_map = sample_payload(size)
+        results[f"micro.score_serialize.{size}"] = metric(
+            median_us_per_call(lean_path, [(backend, payload, review_map, insta_map)] * 20, rounds), "us"
+        )
+    return results
+
+
+# --- e2e / load ---
+async def post_recommend(client, payload):
+    started = time.perf_counter()
+    response = await client.post("/recommend", json=payload)
+    return response.status_code, (time.perf_counter() - started) * 1e3
+
+
+async def run_e2e(backend, client, factory, rounds):
+    results = {}
+    for size in E2E_SIZES:
+        payloads = [factory.payload(size) for _ in range(rounds)]
+        cold = []
+        for payload in payloads:
+            clear_caches(backend)
+            status, elapsed = await post_recommend(client, payload)
+            if status != 200:
+                raise RuntimeError(f"/recommend 응답 코드 {status}")
+            cold.append(elapsed)
+        # 마지막 cold 요청의 결과만 캐시에 남아 있으므로 그 요청으로 warm 을 잽니다 (한 번 더 보내 확실히 데움)
+        await post_recommend(client, payloads[-1])
+        warm = [(await post_recommend(client, payloads[-1]))[1] for _ in range(rounds)]
+        results[f"e2e.recommend.{size}.cold.p50"] = metric(statistics.median(cold), "ms")
+        results[f"e2e.recommend.{size}.cold.p95"] = metric(percentile(cold, 0.95), "ms")
+        results[f"e2e.recommend.{size}.warm.p50"] = metric(statistics.median(warm), "ms")
+    return results
+
+
+async def run_load(backend, client, factory, concurrency, duration, distinct_payloads):
+    """concurrency 개 클라이언트가 duration 초 동안 서로 다른 45개 장소 요청을 번갈아 보냅니다"""
+    clear_caches(backend)
+    payloads = [factory.payload(45) for _ in range(distinct_payloads)]
+    latencies, statuses = [], []
+    stop_at = time.perf_counter() + duration
+
+    async def worker(offset):
+        i = offset
+        while time.perf_counter() < stop_at:
+            status, elapsed = await post_recommend(client, payloads[i % len(payloads)])
+            statuses.append(status)
+            if status == 200:
+                latencies.append(elapsed)
+            i += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    results = {
+        "load.throughput_rps": metric(len(latencies) / elapsed, "rps", better="higher"),
+        "load.rejected_ratio": metric(statuses.count(503) / max(len(statuses), 1), "ratio"),
+    }
+    if latencies:
+        results["load.latency.p50"] = metric(percentile(latencies, 0.5), "ms")
+        results["load.latency.p95"] = metric(percentile(latencies, 0.95), "ms")
+        results["load.latency.p99"] = metric(percentile(latencies, 0.99), "ms")
+    return results
+
+
+async def run_suites(backend, args):
+    import httpx
+
+    factory = PayloadFactory(args.review_db, args.test_data)
+    results = {}
+    async with backend.lifespan(backend.app):
+        await backend.current_place_index()
+        if "micro" in args.suite:
+            results.update(await run_micro(backend, factory, args.rounds))
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if "e2e" in args.suite:
+                results.update(await run_e2e(backend, client, factory, args.rounds))
+            if "load" in args.suite:
+                results.update(await run_load(backend, client, factory, args.concurrency, args.duration, args.distinct_payloads))
+    return results
+
+
+# --- 기준선 비교 ---
+def compare(results, baseline, threshold):
+    """(이름, 기준값, 현재값, 변화율, 회귀 여부) 목록. 변화율은 '나빠진 정도' 기준으로 양수가 느려짐"""
+    rows = []
+    for name, current in sorted(results["metrics"].items()):
+        previous = baseline["metrics"].get(name)
+        if previous is None or current["better"] == "info" or not previous["value"]:
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        if current["better"] == "higher":
+            change = -change
+        rows.append((name, previous["value"], current["value"], change, change > threshold))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="추천 백엔드 매칭/랭킹 벤치마크")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--review-db", default=DEFAULT_REVIEW_DB)
+    parser.add_argument("--insta-db", default=DEFAULT_INSTA_DB)
+    parser.add_argument("--test-data", default=DEFAULT_TEST_DATA)
+    parser.add_argument("--rounds", type=int, default=7, help="micro/e2e 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="load 측정 시간(초)")
+    parser.add_argument("--distinct-payloads", type=int, default=40)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--save-baseline", help="결과를 기준선 JSON 으로 저장")
+    parser.add_argument("--compare", help="비교할 기준선 JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="회귀로 볼 악화 비율 (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.review_db = os.path.abspath(args.review_db)
+    args.insta_db = os.path.abspath(args.insta_db)
+    args.test_data = os.path.abspath(args.test_data)
+
+    # 원본 DB 를 건드리지 않도록 임시 작업 디렉터리에 복사해 백엔드를 띄웁니다 (백엔드는 현재 디렉터리의 DB 를 엶)
+    workdir = tempfile.mkdtemp(prefix="matspot-bench-")
+    original_dir = os.getcwd()
+    try:
+        shutil.copy(args.review_db, os.path.join(workdir, "restarant.db"))
+        shutil.copy(args.insta_db, os.path.join(workdir, "finally.db"))
+        os.chdir(workdir)
+        sys.path.insert(0, BACKEND_DIR)
+        with redirect_stdout(io.StringIO()):
+            backend = load_backend()
+        backend.logger.disabled = True
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        metrics = asyncio.run(run_suites(backend, args))
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "backend": os.path.basename(BACKEND_PATH),
+            "suites": args.suite,
+            "rounds": args.rounds,
+            "settings": {key: value for key, value in sorted(os.environ.items()) if key.startswith("MATSPOT_")},
+        },
+        "metrics": metrics,
+    }
+    for name, value in sorted(metrics.items()):
+        print(f"{name:45s} {value['value']:12.3f} {value['unit']}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"💾 결과 저장: {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        regressions = [row for row in rows if row[4]]
+        print(f"\n기준선 비교 ({args.compare}, 허용 악화 {args.threshold:.0%})")
+        for name, previous, current, change, regressed in rows:
+            print(f"{'❌' if regressed else '✅'} {name:45s} {previous:12.3f} → {current:12.3f} ({change:+.1%})")
+        if regressions:
+            print(f"⚠️ 성능 회귀 {len(regressions)}건")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
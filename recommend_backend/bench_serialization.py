@@ -0,0 +1,104 @@
+import importlib.util
+import json
+import os
+import sys
+import time
+
+# --- /recommend 응답 직렬화 벤치마크 ---
+# DB 조회 없이 (검증 → 점수 계산 → 응답 JSON) 구간만 비교합니다.
+#   legacy: RecommendRequest 검증 → SearchRequest 재검증 → model_dump/RankedPlace 생성
+#           → response_model 재검증 → jsonable 변환 → json.dumps (이전 경로)
+#   lean  : RecommendRequest 검증 한 번 → 배열로 점수 계산 → dict 를 바로 인코딩 (현재 경로)
+# 사용법: python bench_serialization.py [장소 수 ...]   (기본 45 200)
+
+BACKEND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test 3.py")
+REPEAT_SECONDS = 1.0
+
+
+def load_backend():
+    spec = importlib.util.spec_from_file_location("matspot_backend", BACKEND_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def sample_payload(count):
+    places = [
+        {
+            "id": str(1000 + i), "place_name": f"테스트식당 {i}호점", "category_name": "음식점 > 한식",
+            "phone": "053-000-0000" if i % 3 else None, "address_name": f"대구 북구 산격동 {i}",
+            "road_address_name": f"대구 북구 대학로 {i}", "x": f"128.6{i:04d}", "y": f"35.8{i:04d}",
+            "place_url": f"http://place.map.kakao.com/{1000 + i}", "distance": str(37 * i % 2000) if i % 7 else "",
+        }
+        for i in range(count)
+    ]
+    review_map = {place["id"]: (i * 13) % 97 for i, place in enumerate(places)}
+    insta_map = {place["id"]: (i * 29) % 41 for i, place in enumerate(places)}
+    return {"places": places, "ranking_preference": "balanced"}, review_map, insta_map
+
+
+def legacy_score_places(backend, search_results, ranking_preference, review_map, insta_map):
+    """이전 score_places (RankedPlace 객체 목록)"""
+    weights = backend.WEIGHT_PRESETS.get(ranking_preference, backend.WEIGHT_PRESETS['balanced'])
+    enriched_places = []
+    for place in search_results:
+        enriched_data = place.model_dump()
+        enriched_data['review_count'] = review_map.get(place.id, 0)
+        enriched_data['instagram_mentions'] = insta_map.get(place.id, 0)
+        enriched_data['distance'] = int(place.distance) if place.distance and place.distance.isdigit() else 99999
+        enriched_places.append(enriched_data)
+    max_dist = max(p['distance'] for p in enriched_places) or 1
+    max_revs = max(p['review_count'] for p in enriched_places) or 1
+    max_ment = max(p['instagram_mentions'] for p in enriched_places) or 1
+    scored_places = []
+    for p in enriched_places:
+        norm_revs = (p['review_count'] / max_revs) if max_revs > 0 else 0
+        norm_ment = (p['instagram_mentions'] / max_ment) if max_ment > 0 else 0
+        norm_dist = (1 - (p['distance'] / max_dist)) if max_dist > 0 else 0
+        score = norm_dist * weights['distance'] + norm_revs * weights['reviews'] + norm_ment * weights['mentions']
+        p['distance'] = str(p['distance'])
+        scored_places.append(backend.RankedPlace(**p, score=score))
+    return sorted(scored_places, key=lambda p: p.score, reverse=True)[:45]
+
+
+def legacy_path(backend, payload, review_map, insta_map):
+    request = backend.RecommendRequest.model_validate(payload)
+    search_request = backend.SearchRequest(searchResults=request.places, rankingPreference=request.ranking_preference)
+    ranked = legacy_score_places(backend, search_request.searchResults, search_request.rankingPreference, review_map, insta_map)
+    # FastAPI 가 response_model 로 하던 일: 다시 검증하고 JSON 호환 값으로 바꾼 뒤 json.dumps
+    response = backend.RecommendResponse.model_validate({"recommended_places": ranked}, from_attributes=True)
+    content = response.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def lean_path(backend, payload, review_map, insta_map):
+    request = backend.RecommendRequest.model_validate(payload)
+    ranked = backend.score_places(request.places, request.ranking_preference, review_map, insta_map)
+    return backend.encode_json({"recommended_places": ranked})
+
+
+def per_call_us(func, *args):
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < REPEAT_SECONDS:
+        func(*args)
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+if __name__ == "__main__":
+    backend = load_backend()
+    backend.logger.disabled = True
+    sizes = [int(arg) for arg in sys.argv[1:]] or [45, 200]
+    print(f"인코더: {'orjson' if backend.ORJSON_ENABLED else 'json'}")
+    for size in sizes:
+        payload, review_map, insta_map = sample_payload(size)
+        legacy_bytes = legacy_path(backend, payload, review_map, insta_map)
+        lean_bytes = lean_path(backend, payload, review_map, insta_map)
+        same = json.loads(legacy_bytes) == json.loads(lean_bytes)
+        legacy_us = per_call_us(legacy_path, backend, payload, review_map, insta_map)
+        lean_us = per_call_us(lean_path, backend, payload, review_map, insta_map)
+        print(
+            f"장소 {size:4d}개: legacy {legacy_us:8.1f}µs, lean {lean_us:8.1f}µs "
+            f"({legacy_us / lean_us:.1f}배, 응답 동일: {same})"
+        )
@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+# --- 읽기 전용 SQLite 연결 풀 ---
+# 요청마다 aiosqlite.connect 로 연결을 새로 열고 닫는 대신,
+# 서버 수명(lifespan) 동안 DB 별로 읽기 전용 연결 몇 개를 열어 두고 돌려 씁니다.
+# 연결마다 aiosqlite 작업 스레드가 따로 있으므로 동시 요청이 한 스레드에 줄 서지 않습니다.
+
+MMAP_SIZE = 256 * 1024 * 1024  # 256MB
+CACHE_SIZE_KB = 16 * 1024      # 16MB (PRAGMA cache_size 는 음수면 KB 단위)
+CACHED_STATEMENTS = 256        # 연결별 준비된 SQL 문 캐시 크기
+
+
+class ReadOnlyPool:
+    """mode=ro + query_only 로 연 aiosqlite 연결 풀"""
+
+    def __init__(self, db_path, size=4):
+        self.db_path = db_path
+        self.size = size
+        self._idle = asyncio.Queue()
+        self._connections = []
+        self._open_lock = asyncio.Lock()
+
+    @property
+    def is_open(self):
+        return bool(self._connections)
+
+    async def _connect(self):
+        conn = await aiosqlite.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, cached_statements=CACHED_STATEMENTS
+        )
+        await conn.execute("PRAGMA query_only = ON")
+        await conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        await conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        return conn
+
+    async def open(self):
+        async with self._open_lock:
+            if self.is_open:
+                return
+            connections = []
+            try:
+                for _ in range(self.size):
+                    connections.append(await self._connect())
+            except Exception:
+                for conn in connections:
+                    await conn.close()
+                raise
+            self._connections = connections
+            for conn in connections:
+                self._idle.put_nowait(conn)
+
+    async def close(self):
+        async with self._open_lock:
+            for conn in self._connections:
+                await conn.close()
+            self._connections = []
+            self._idle = asyncio.Queue()
+
+    @asynccontextmanager
+    async def connection(self):
+        """풀에서 연결을 빌려 쓰고 돌려줍니다 (시작 시 열지 못했으면 여기서 다시 시도)"""
+        if not self.is_open:
+            await self.open()
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
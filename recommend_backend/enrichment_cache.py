@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+
+from place_index import file_signature
+
+# --- 장소별 보강 데이터 캐시 ---
+# 카카오가 같은 장소를 반복해서 돌려주므로 (장소 id, 이름, 도로명 주소) 별로
+# 리뷰 수/언급 수 조회 결과를 저장합니다. 매칭 실패(미스, 값 None)도 따로 TTL 을 두고 저장해
+# "모든 전략 실패" 장소가 매번 4단계 전략을 다시 타지 않게 합니다.
+# 리뷰 0개, 언급 0회처럼 찾았지만 0 인 값은 미스가 아니라 정상 결과로 저장합니다.
+# 원본 SQLite 파일이 바뀌면 전체를 비웁니다.
+
+
+def place_cache_key(place):
+    return (place.id, place.place_name, place.road_address_name)
+
+
+class EnrichmentCache:
+    """TTL + LRU 캐시. 값이 None 이면 미스(negative)로 보고 negative_ttl 을 적용합니다 (0 은 정상 값)"""
+
+    def __init__(self, name, sources, max_entries=5000, ttl=600.0, negative_ttl=120.0):
+        self.name = name
+        self.sources = list(sources)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # key -> (만료 시각, 값)
+        self._signature = None
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def validate(self):
+        """원본 DB 파일이 바뀌었으면 캐시를 비웁니다 (요청마다 한 번 호출)"""
+        signature = tuple(file_signature(path) for path in self.sources)
+        if signature != self._signature:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._signature = signature
+
+    def lookup(self, key):
+        """(찾음 여부, 값). 만료된 항목은 지우고 찾지 못한 것으로 봅니다"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                if value is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return True, value
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def peek(self, key):
+        """lookup 과 같지만 통계와 LRU 순서를 바꾸지 않습니다 (마감 시간 초과 시 이미 있는 값만 꺼낼 때)"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def store(self, key, value):
+        if not self.enabled:
+            return
+        ttl = self.negative_ttl if value is None else self.ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+from match_artifact import MatchArtifact
+from normalization import clean_road_address
+from place_index import load_place_index, resolve_place
+
+# --- 장소 매칭 품질 / 지연 시간 평가 ---
+# 카카오 장소 → mapinformation.id 정답 쌍(골든 세트)으로 매칭 엔진마다
+#   precision(매칭한 것 중 정답 비율), recall(정답이 있는 장소 중 맞게 찾은 비율),
+#   wrong-match rate(다른 식당으로 잘못 매칭한 비율)와 장소당 지연 시간을 함께 보고합니다.
+# 4단계 전략 엔진(chain)은 어떤 전략으로 매칭했는지에 따라 나눈 수치도 함께 냅니다.
+# 더 빠른 엔진으로 바꾸기 전에 --compare 로 기준 결과보다 품질이 떨어지지 않았는지 확인합니다.
+#
+# 사용법:
+#   python eval_matcher.py                                   # 골든 세트 두 개로 모든 엔진 평가
+#   python eval_matcher.py --engine chain exact --output eval.json
+#   python eval_matcher.py --artifact match_index.bin        # 아티팩트 엔진 포함
+#   python eval_matcher.py --compare eval.json --tolerance 0.005
+#   python eval_matcher.py --golden golden_places_manual.json  # 손으로 정답을 붙인 세트만
+#   python eval_matcher.py --generate 500                    # restarant.db 로 골든 세트 다시 만들기
+#
+# 골든 세트는 두 개이고 따로 보고합니다.
+#   golden_places.json: restarant.db 식당 이름/주소를 규칙대로 변형해 만든 세트 (--generate 로 다시 만듦)
+#   golden_places_manual.json: 카카오 표기대로 손으로 적고 사람이 정답을 붙인 세트
+#     (지점명 변형, 영문/한글 브랜드, 주소 형식 차이, 같은 건물의 다른 가게, DB 에 없는 같은 브랜드 지점)
+#     --generate 로 덮어쓰지 않으며, 항목을 추가할 때는 note 에 정답 판단 근거를 적습니다.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_GOLDEN_PATH = os.path.join(BACKEND_DIR, "golden_places.json")
+MANUAL_GOLDEN_PATH = os.path.join(BACKEND_DIR, "golden_places_manual.json")
+DEFAULT_REVIEW_DB = os.path.join(BACKEND_DIR, "restarant.db")
+DEFAULT_TOLERANCE = 0.005
+NGRAM_THRESHOLD = 0.6
+
+_BUILDING_NUMBER_PATTERN = re.compile(r'^\d+(-\d+)?$')
+
+
+# --- 매칭 엔진 ---
+# 엔진은 (PlaceIndex, MatchArtifact 또는 None, 카카오 장소 dict) 를 받아 (mapinformation.id 또는 None, 전략 이름) 을 돌려줍니다.
+def match_chain(index, artifact, place):
+    """백엔드의 기본 매칭 (정규화 컬럼 같음 비교 → 전략 1~4)"""
+    row, strategy = resolve_place(index, place["place_name"], clean_road_address(place["road_address_name"]))
+    return (index.ids[row], str(strategy)) if row is not None else (None, None)
+
+
+def match_exact(index, artifact, place):
+    """정규화 이름/핵심 이름 + 도로명 키 같음 비교만"""
+    row = index.exact(place["place_name"], clean_road_address(place["road_address_name"]))
+    return (index.ids[row], "exact") if row is not None else (None, None)
+
+
+def match_artifact(index, artifact, place):
+    """chain 과 같은 매칭을 아티팩트(mmap) 위에서 (메모리 인덱스와 결과가 같아야 합니다)"""
+    return match_chain(artifact, None, place)
+
+
+def match_ngram(index, artifact, place):
+    """주소 없이 전체 이름 n-gram 유사도 1위 (유사도 NGRAM_THRESHOLD 이상)"""
+    best = index.name_matcher.best(place["place_name"], threshold=NGRAM_THRESHOLD)
+    return (index.ids[best[0]], "ngram") if best is not None else (None, None)
+
+
+ENGINES = {
+    "chain": match_chain,
+    "exact": match_exact,
+    "artifact": match_artifact,
+    "ngram": match_ngram,
+}
+
+
+# --- 골든 세트 ---
+def kakao_road_address(address):
+    """mapinformation 주소를 카카오 road_address_name 모양으로 (건물번호까지만, 층/상세 주소 제거)"""
+    tokens = address.split()
+    for i, token in enumerate(tokens):
+        if _BUILDING_NUMBER_PATTERN.match(token):
+            return " ".join(tokens[:i + 1])
+    return " ".join(tokens)
+
+
+def generate_golden_set(review_db, size, seed=17):
+    """restarant.db 식당으로 카카오식 이름/주소 변형과 정답 id 를 만듭니다.
+
+    변형: same(이름 그대로), branch(지점명 붙임), no_space(공백 제거), reordered(단어 순서 바꿈),
+    negative(같은 도로명 주소의 없는 식당 → 정답 없음)
+    """
+    index = load_place_index(review_db)
+    rng = random.Random(seed)
+    entries = []
+    positions = [pos for pos in range(len(index)) if index.names[pos] and index.addresses[pos]]
+    variants = ("same", "same", "branch", "no_space", "reordered", "negative")
+    while len(entries) < size:
+        pos = rng.choice(positions)
+        name, address = index.names[pos], index.addresses[pos]
+        variant = rng.choice(variants)
+        words = name.split()
+        if variant == "branch":
+            region = address.split()[1].rstrip("시군구") if len(address.split()) > 1 else "본"
+            name = f"{name} {region}점"
+        elif variant == "no_space":
+            if len(words) < 2:
+                continue
+            name = "".join(words)
+        elif variant == "reordered":
+            if len(words) < 2:
+                continue
+            name = " ".join(words[1:] + words[:1])
+        elif variant == "negative":
+            name = f"{rng.choice(('행복', '옛날', '원조', '명품', '황금'))}{rng.choice(('국밥', '분식', '반점', '식당', '곱창'))} {rng.randint(1, 99)}호"
+            if index.name_contains(name):
+                continue
+        expected = [] if variant == "negative" else [index.ids[pos]]
+        entries.append({
+            "variant": variant,
+            "place": {
+                "id": str(20_000_000 + len(entries)), "place_name": name,
+                "road_address_name": kakao_road_address(address), "address_name": address,
+            },
+            "expected_ids": expected,
+        })
+    return {
+        "description": "restarant.db 식당을 카카오 장소 모양으로 변형한 정답 쌍 (expected_ids 가 비어 있으면 DB 에 없는 식당)",
+        "seed": seed,
+        "entries": entries,
+    }
+
+
+# --- 평가 ---
+def evaluate(engine, index, artifact, entries):
+    outcomes = []
+    for entry in entries:
+        started = time.perf_counter()
+        place_id, strategy = engine(index, artifact, entry["place"])
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        expected = entry["expected_ids"]
+        if place_id is None:
+            outcome = "missed" if expected else "correct_reject"
+        else:
+            outcome = "correct" if place_id in expected else "wrong"
+        outcomes.append((entry["variant"], strategy, outcome, elapsed_us, bool(expected)))
+    return summarize(outcomes)
+
+
+def summarize(outcomes):
+    def rates(group):
+        correct = sum(1 for o in group if o[2] == "correct")
+        wrong = sum(1 for o in group if o[2] == "wrong")
+        positives = sum(1 for o in group if o[4])
+        latencies = sorted(o[3] for o in group)
+        return {
+            "places": len(group),
+            "precision": round(correct / (correct + wrong), 4) if correct + wrong else None,
+            "recall": round(correct / positives, 4) if positives else None,
+            "wrong_match_rate": round(wrong / len(group), 4) if group else None,
+            "latency_us_p50": round(statistics.median(latencies), 2) if latencies else None,
+            "latency_us_p95": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 2) if latencies else None,
+        }
+
+    result = rates(outcomes)
+    result["by_strategy"] = {
+        strategy: rates([o for o in outcomes if (o[1] or "none") == strategy])
+        for strategy in sorted({o[1] or "none" for o in outcomes})
+    }
+    result["by_variant"] = {
+        variant: rates([o for o in outcomes if o[0] == variant]) for variant in sorted({o[0] for o in outcomes})
+    }
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """기준 결과보다 precision/recall 이 tolerance 넘게 떨어지거나 wrong-match rate 가 오른 (골든 세트, 엔진) 목록"""
+    regressions = []
+    for golden_set, part in results["golden_sets"].items():
+        previous_part = baseline["golden_sets"].get(golden_set)
+        if previous_part is None:
+            continue
+        for engine, current in part["engines"].items():
+            previous = previous_part["engines"].get(engine)
+            if previous is None:
+                continue
+            for key, sign in (("precision", 1), ("recall", 1), ("wrong_match_rate", -1)):
+                if current[key] is None or previous[key] is None:
+                    continue
+                if (previous[key] - current[key]) * sign > tolerance:
+                    regressions.append((golden_set, engine, key, previous[key], current[key]))
+    return regressions
+
+
+def format_rate(value):
+    return "   -  " if value is None else f"{value:6.1%}"
+
+
+def print_report(golden_set, results):
+    print(f"골든 세트 {golden_set} ({results['places']}개 장소)")
+    print(f"{'엔진':18s} {'precision':>9s} {'recall':>8s} {'wrong':>8s} {'p50(µs)':>9s} {'p95(µs)':>9s}")
+    for engine, summary in results["engines"].items():
+        print(f"{engine:18s} {format_rate(summary['precision']):>9s} {format_rate(summary['recall']):>8s} "
+              f"{format_rate(summary['wrong_match_rate']):>8s} {summary['latency_us_p50']:9.1f} {summary['latency_us_p95']:9.1f}")
+        for strategy, part in summary["by_strategy"].items():
+            print(f"  └ {strategy:14s} {format_rate(part['precision']):>9s} {'':8s} "
+                  f"{format_rate(part['wrong_match_rate']):>8s} {part['latency_us_p50']:9.1f} {part['latency_us_p95']:9.1f}  ({part['places']}개)")
+    if any(len(summary["by_variant"]) > 1 for summary in results["engines"].values()):
+        print("변형별 recall / wrong")
+        for engine, summary in results["engines"].items():
+            cells = [f"{variant} {format_rate(part['recall']).strip()}/{format_rate(part['wrong_match_rate']).strip()}"
+                     for variant, part in summary["by_variant"].items()]
+            print(f"  {engine:16s} " + ", ".join(cells))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="장소 매칭 품질/지연 시간 평가")
+    parser.add_argument("--golden", nargs="+", default=[DEFAULT_GOLDEN_PATH, MANUAL_GOLDEN_PATH],
+                        help="골든 세트 JSON (여러 개면 세트마다 따로 보고, 기본: 생성 세트 + 수작업 세트)")
+    parser.add_argument("--review-db", default=DEFAULT_REVIEW_DB)
+    parser.add_argument("--engine", nargs="+", choices=sorted(ENGINES), help="평가할 엔진 (기본: 전부, artifact 는 --artifact 가 있을 때만)")
+    parser.add_argument("--artifact", help="artifact 엔진에 쓸 match_artifact.py 빌드 결과")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="허용하는 precision/recall 하락 폭")
+    parser.add_argument("--generate", type=int, metavar="N", help="생성 골든 세트를 N 개로 다시 만들어 --golden 첫 번째 경로에 저장")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.generate:
+        golden_path = args.golden[0]
+        if os.path.abspath(golden_path) == MANUAL_GOLDEN_PATH:
+            print("❌ 수작업 골든 세트는 --generate 로 덮어쓰지 않습니다")
+            return 2
+        golden = generate_golden_set(args.review_db, args.generate)
+        with open(golden_path, "w", encoding="utf-8") as f:
+            json.dump(golden, f, ensure_ascii=False, indent=1)
+        print(f"💾 골든 세트 {len(golden['entries'])}개 저장: {golden_path}")
+        return 0
+
+    index = load_place_index(args.review_db)
+    golden_sets = {}
+    for golden_path in args.golden:
+        with open(golden_path, encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+        missing = {place_id for entry in entries for place_id in entry["expected_ids"]} - set(index.positions)
+        if missing:
+            print(f"⚠️ {os.path.basename(golden_path)} 의 정답 id {len(missing)}개가 DB 에 없습니다 (DB 가 바뀌었으면 정답을 다시 확인하세요)")
+        golden_sets[os.path.basename(golden_path)] = entries
+    artifact = MatchArtifact(args.artifact) if args.artifact else None
+
+    engines = args.engine or [name for name in ENGINES if name != "artifact" or artifact is not None]
+    if "artifact" in engines and artifact is None:
+        print("❌ artifact 엔진은 --artifact 가 필요합니다")
+        return 2
+
+    results = {"golden_sets": {}}
+    for golden_set, entries in golden_sets.items():
+        part = {"places": len(entries), "engines": {}}
+        for name in engines:
+            part["engines"][name] = evaluate(ENGINES[name], index, artifact, entries)
+        results["golden_sets"][golden_set] = part
+        print_report(golden_set, part)
+        print()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for golden_set, engine, key, previous, current in regressions:
+            print(f"❌ {golden_set} {engine} {key}: {previous:.2%} → {current:.2%}")
+        if regressions:
+            print(f"⚠️ 매칭 품질 회귀 {len(regressions)}건")
+            return 1
+        print("✅ 기준 결과 대비 매칭 품질 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import sqlite3
+import sys
+
+from post_hashtags import HASHTAG_TABLE, normalize_hashtag
+
+# --- instagram_posts FTS5 트라이그램 인덱스 ---
+# instagram_posts 의 캡션/해시태그를 트라이그램으로 색인하는 외부 콘텐츠(shadow) 테이블입니다.
+# 트리거로 원본 테이블과 동기화되므로 크롤러(prototype.py)는 기존처럼 INSERT 만 하면 됩니다.
+# 트라이그램 검색은 3글자 이상만 색인을 타므로, 2글자 캡션 키워드와
+# LIKE 와일드카드(%, _)가 들어간 키워드는 같은 쿼리 안에서 LIKE 로 처리합니다.
+# 해시태그는 post_hashtags 가 있으면 다른 엔진과 같이 정규화 태그 같음 비교로 찾습니다.
+
+FTS_TABLE = "instagram_posts_fts"
+
+FTS_EXISTS_QUERY = f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{FTS_TABLE}'"
+
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        caption_text, hashtags_representation,
+        content='instagram_posts', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS instagram_posts_fts_ai AFTER INSERT ON instagram_posts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, caption_text, hashtags_representation)
+        VALUES (new.id, new.caption_text, new.hashtags_representation);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS instagram_posts_fts_ad AFTER DELETE ON instagram_posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, caption_text, hashtags_representation)
+        VALUES ('delete', old.id, old.caption_text, old.hashtags_representation);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS instagram_posts_fts_au AFTER UPDATE ON instagram_posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, caption_text, hashtags_representation)
+        VALUES ('delete', old.id, old.caption_text, old.hashtags_representation);
+        INSERT INTO {FTS_TABLE}(rowid, caption_text, hashtags_representation)
+        VALUES (new.id, new.caption_text, new.hashtags_representation);
+    END""",
+]
+
+
+def ensure_fts_index(conn):
+    """FTS 테이블과 동기화 트리거를 만들고, 처음 만든 경우 기존 게시물을 색인합니다"""
+    created = conn.execute(FTS_EXISTS_QUERY).fetchone() is None
+    for statement in FTS_SCHEMA:
+        conn.execute(statement)
+    if created:
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    conn.commit()
+    return created
+
+
+def _phrase(text):
+    """FTS5 MATCH 구문용 큰따옴표 문자열"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _needs_like(text):
+    return len(text) < 3 or '%' in text or '_' in text
+
+
+def build_mention_count_query(keywords, search_hashtags, hashtag_table=True):
+    """키워드 집합에 대해 중복 제거된 게시물 수를 세는 단일 쿼리와 파라미터를 만듭니다.
+
+    like 엔진과 같은 규칙입니다: 캡션은 `%키워드%`, 해시태그는 post_hashtags 가 있으면
+    정규화 태그 같음 비교, 없으면 `%#키워드%` (FTS 로 찾음).
+    """
+    match_terms = []
+    like_terms = []
+    like_params = []
+    tags = sorted({normalize_hashtag(keyword) for keyword in keywords} - {None}) if search_hashtags and hashtag_table else []
+    for keyword in sorted(keywords):
+        if _needs_like(keyword):
+            like_terms.append("caption_text LIKE ?")
+            like_params.append(f"%{keyword}%")
+        else:
+            match_terms.append(f"caption_text : {_phrase(keyword)}")
+        if search_hashtags and not hashtag_table:
+            hashtag = f"#{keyword}"
+            if _needs_like(hashtag):
+                like_terms.append("hashtags_representation LIKE ?")
+                like_params.append(f"%{hashtag}%")
+            else:
+                match_terms.append(f"hashtags_representation : {_phrase(hashtag)}")
+
+    selects = []
+    params = []
+    if match_terms:
+        selects.append(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?")
+        params.append(" OR ".join(match_terms))
+    if like_terms:
+        selects.append(f"SELECT id FROM instagram_posts WHERE {' OR '.join(like_terms)}")
+        params.extend(like_params)
+    if tags:
+        selects.append(f"SELECT post_id FROM {HASHTAG_TABLE} WHERE tag_normalized IN ({', '.join('?' * len(tags))})")
+        params.extend(tags)
+    if not selects:
+        return "SELECT 0", ()
+    return f"SELECT COUNT(*) FROM ({' UNION '.join(selects)})", tuple(params)
+
+
+# --- 직접 실행 시 FTS 인덱스 생성 ---
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "finally.db"
+    conn = sqlite3.connect(db_path)
+    try:
+        if ensure_fts_index(conn):
+            print(f"'{db_path}' 에 FTS 인덱스를 새로 만들고 기존 게시물을 색인했습니다.")
+        else:
+            print(f"'{db_path}' 의 FTS 인덱스와 트리거가 이미 있습니다.")
+    finally:
+        conn.close()
@@ -0,0 +1,170 @@
+import argparse
+import sqlite3
+
+from mention_automaton import PostSnapshot, collect_mentions
+from normalization import build_insta_keywords
+from trending import clear_trending, day_number, ensure_trending_tables, record_mentions, today_number
+
+# --- 게시물-식당 연결(엔티티 링킹) 배치 작업 ---
+# instagram_posts 의 각 게시물을 mapinformation 의 모든 식당과 미리 대조해
+# finally.db 의 post_place_mentions(post_id, place_id) 에 저장합니다.
+# 서빙에서는 substring 검색 대신 place_id 로 GROUP BY 집계만 하면 됩니다.
+# mention_link_state 에 처리한 게시물/식당 id 의 최댓값(high-water mark)을 남겨
+# 중간에 멈춰도 이어서 실행할 수 있고, 새 게시물과 새 식당만 추가로 연결합니다.
+# 게시물에 crawled_at 이 있으면 새 연결마다 식당별 7/30/90일 언급 수(trending.py)도 같은 트랜잭션에서 올립니다.
+# 연결 규칙(collect_mentions)이 바뀌면 LINK_RULE_VERSION 을 올립니다. 저장된 버전과 다르면 처음부터 다시 연결합니다.
+
+LINK_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS post_place_mentions (
+        post_id INTEGER NOT NULL,
+        place_id INTEGER NOT NULL,
+        PRIMARY KEY (post_id, place_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_post_place_mentions_place_id ON post_place_mentions (place_id)",
+    """CREATE TABLE IF NOT EXISTS mention_link_state (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )""",
+]
+
+LINK_EXISTS_QUERY = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_place_mentions'"
+
+CHUNK_SIZE = 500
+LINK_RULE_VERSION = 2  # 2: 해시태그를 정규화 태그 같음 비교로 연결 (1: '#키워드' 접두사)
+
+
+def ensure_link_tables(conn):
+    for statement in LINK_SCHEMA:
+        conn.execute(statement)
+    ensure_trending_tables(conn)
+    conn.commit()
+
+
+def has_post_timestamps(conn):
+    return "crawled_at" in {row[1] for row in conn.execute("PRAGMA table_info(instagram_posts)")}
+
+
+def _get_state(conn, name):
+    row = conn.execute("SELECT value FROM mention_link_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def _set_state(conn, name, value):
+    conn.execute(
+        "INSERT INTO mention_link_state (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (name, value),
+    )
+
+
+def load_catalog_keywords(catalog_db_path, after_place_id=0):
+    """mapinformation 식당별 검색 키워드 (fetch_insta_mentions_from_db 와 같은 변형 규칙)"""
+    conn = sqlite3.connect(f"file:{catalog_db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT id, name, address2 FROM mapinformation WHERE id > ? ORDER BY id", (after_place_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    place_keywords = {}
+    for place_id, name, address in rows:
+        if not name or not name.split():
+            continue
+        keywords, search_hashtags = build_insta_keywords(name, address)
+        if keywords:
+            place_keywords[place_id] = (keywords, search_hashtags)
+    return place_keywords
+
+
+def _link_chunk(conn, rows, place_keywords, today=None):
+    """게시물 묶음을 식당 키워드와 대조해 연결 행을 추가하고 추가한 개수를 돌려줍니다.
+
+    today(날짜 번호)를 주면 게시물의 crawled_at 날짜로 트렌딩 카운터도 올립니다.
+    """
+    found_posts = collect_mentions(PostSnapshot(rows), place_keywords)
+    links = [(post_id, place_id) for place_id, post_ids in found_posts.items() for post_id in post_ids]
+    before = conn.total_changes
+    conn.executemany("INSERT OR IGNORE INTO post_place_mentions (post_id, place_id) VALUES (?, ?)", links)
+    added = conn.total_changes - before
+    if today is not None and links:
+        post_days = {
+            post_id: day_number(crawled_at) for post_id, crawled_at in conn.execute(
+                "SELECT id, crawled_at FROM instagram_posts WHERE id BETWEEN ? AND ?", (rows[0][0], rows[-1][0])
+            )
+        }
+        record_mentions(conn, [(place_id, post_days.get(post_id)) for post_id, place_id in links], today)
+    return added
+
+
+def _iter_post_chunks(conn, after_post_id, until_post_id=None):
+    last_id = after_post_id
+    while True:
+        query = "SELECT id, caption_text, hashtags_representation FROM instagram_posts WHERE id > ?"
+        params = [last_id]
+        if until_post_id is not None:
+            query += " AND id <= ?"
+            params.append(until_post_id)
+        rows = conn.execute(query + " ORDER BY id LIMIT ?", (*params, CHUNK_SIZE)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def link_new_posts(insta_db_path, catalog_db_path, rebuild=False):
+    """아직 연결하지 않은 게시물과 식당을 연결합니다. {'posts', 'places', 'links'} 통계를 돌려줍니다"""
+    conn = sqlite3.connect(insta_db_path)
+    try:
+        # 크롤러와 같이 WAL 모드로 써서 백엔드의 읽기를 막지 않습니다
+        conn.execute("PRAGMA journal_mode=WAL")
+        ensure_link_tables(conn)
+        has_links = conn.execute("SELECT 1 FROM post_place_mentions LIMIT 1").fetchone() is not None
+        if rebuild or (has_links and _get_state(conn, "rule_version") != LINK_RULE_VERSION):
+            conn.execute("DELETE FROM post_place_mentions")
+            conn.execute("DELETE FROM mention_link_state")
+            clear_trending(conn)
+        _set_state(conn, "rule_version", LINK_RULE_VERSION)
+        conn.commit()
+        today = today_number() if has_post_timestamps(conn) else None
+
+        last_post_id = _get_state(conn, "last_post_id")
+        last_place_id = _get_state(conn, "last_place_id")
+        place_keywords = load_catalog_keywords(catalog_db_path)
+        stats = {"posts": 0, "places": 0, "links": 0}
+        if not place_keywords:
+            return stats
+        max_place_id = max(place_keywords)
+
+        # 1) 새로 추가된 식당 x 이미 처리한 게시물
+        if max_place_id > last_place_id:
+            new_places = {pid: kw for pid, kw in place_keywords.items() if pid > last_place_id}
+            stats["places"] = len(new_places)
+            if last_post_id:
+                for rows in _iter_post_chunks(conn, 0, last_post_id):
+                    stats["links"] += _link_chunk(conn, rows, new_places, today)
+            _set_state(conn, "last_place_id", max_place_id)
+            conn.commit()
+
+        # 2) 새 게시물 x 전체 식당 (묶음마다 커밋해 중간에 멈춰도 이어서 실행)
+        for rows in _iter_post_chunks(conn, last_post_id):
+            stats["links"] += _link_chunk(conn, rows, place_keywords, today)
+            stats["posts"] += len(rows)
+            _set_state(conn, "last_post_id", rows[-1][0])
+            conn.commit()
+
+        return stats
+    finally:
+        conn.close()
+
+
+# --- 직접 실행 시 연결 작업 수행 ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="instagram_posts 와 mapinformation 을 미리 연결합니다.")
+    parser.add_argument("--insta-db", default="finally.db")
+    parser.add_argument("--catalog-db", default="restarant.db")
+    parser.add_argument("--rebuild", action="store_true", help="연결 테이블을 비우고 처음부터 다시 만듭니다")
+    args = parser.parse_args()
+
+    result = link_new_posts(args.insta_db, args.catalog_db, rebuild=args.rebuild)
+    print(f"게시물 {result['posts']}개, 식당 {result['places']}개 처리, 연결 {result['links']}개 추가.")
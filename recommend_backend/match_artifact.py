@@ -0,0 +1,726 @@
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+from name_matcher import NameMatcher
+from normalization import extract_core_name, normalize_place_name, road_tokens
+from observability import logger
+from place_index import PlaceIndex, _SubstringIndex, file_signature, fold_ascii, load_place_index
+from post_hashtags import parse_hashtags
+
+# --- 미리 빌드한 매칭 인덱스 아티팩트 (mmap) ---
+# restarant.db / finally.db 에서 매칭용 조회 테이블을 오프라인으로 만들어 바이너리 파일 하나에 저장합니다.
+# PlaceIndex 가 메모리에 만드는 표를 그대로 직렬화하므로, 서버는 메모리 인덱스를 만들지 않고
+# resolve_place 의 모든 전략(exact, LIKE 1~3, n-gram 유사도 4)과 proximity 를 mmap 위에서 돌립니다.
+#   - place_*: 행 번호별 id, 이름, 주소, 리뷰 수, 좌표
+#   - name_road / core_road: "정규화 이름(또는 핵심 이름)\x1f도로명 키" -> 행 번호  ("exact")
+#   - name_grams / address_grams: 이름/주소(ASCII 소문자) 바이그램 -> 행 번호  (LIKE '%..%' 와 전략 4 의 주소 버킷)
+#   - ngrams: 이름 n-gram -> (IDF, 행 번호별 가중치),  ngram_vectors: 행 번호 -> (n-gram 번호, 가중치)
+#     가중치는 NameMatcher 처럼 행마다 L2 노름으로 나눈 값이라 메모리 매처와 같은 유사도가 나옵니다.
+#   - hashtags: 정규화 태그(post_hashtags.tag_normalized 와 같음) -> 게시물 id 목록  (automaton 엔진의 해시태그 조회)
+# 서버는 시작할 때 파일을 mmap 으로 열기만 하므로 수 ms 안에 준비되고, 페이지는 OS 캐시에서 공유됩니다.
+# 헤더에는 형식 버전, 본문 CRC32, 원본 DB 의 (크기, 수정 시각, SHA-256) 이 들어 있습니다.
+# 원본 DB 가 바뀌면 기존 아티팩트로 계속 서빙하면서 백그라운드 스레드에서 다시 빌드해 바꿔 끼웁니다.
+# 요청마다는 파일 서명(stat)만 비교하고, 서명이 바뀐 경우에만 SHA-256 확인을 스레드에서 돌립니다.
+
+MAGIC = b"MSPMATCH"
+FORMAT_VERSION = 3
+REBUILD_INTERVAL = 60.0  # 다시 빌드한 뒤(실패 포함) 다음 빌드까지 기다리는 시간(초)
+_HEADER = struct.Struct("<8sII")  # magic, 형식 버전, 메타데이터 길이
+_U64 = struct.Struct("<Q")
+_NO_REVIEWS = -1
+_HAS_WEIGHTS = 1  # 키 테이블: 값마다 실수 가중치
+_HAS_KEY_WEIGHTS = 2  # 키 테이블: 키마다 실수 하나
+
+
+def source_checksum(path):
+    """DB 파일(WAL 파일 포함)의 SHA-256"""
+    digest = hashlib.sha256()
+    for file_path in (path, path + "-wal"):
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _describe_source(path):
+    return {
+        "name": os.path.basename(path),
+        "signature": file_signature(path),
+        "sha256": source_checksum(path),
+    }
+
+
+def _review_value(raw):
+    # fetch_review_counts_from_db 와 같은 변환 (숫자가 아니면 0, NULL 은 매칭 없음)
+    if raw is None:
+        return _NO_REVIEWS
+    try:
+        return int(raw) if str(raw).isdigit() else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def _utf8_order(key):
+    return key.encode("utf-8")
+
+
+# --- 섹션 인코딩 ---
+def _pad(buffer):
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+def _encode_int_array(values):
+    return struct.pack(f"<{len(values)}q", *values)
+
+
+def _encode_float_array(values):
+    return struct.pack(f"<{len(values)}d", *values)
+
+
+def _encode_strings(values):
+    """문자열 목록 (None 은 null 표시) 을 (시작 위치, null 표시, UTF-8 바이트) 로 씁니다"""
+    offsets, nulls, data = [0], [], bytearray()
+    for value in values:
+        if value is not None:
+            data.extend(value.encode("utf-8"))
+        offsets.append(len(data))
+        nulls.append(1 if value is None else 0)
+    buffer = bytearray(_U64.pack(len(values)))
+    buffer.extend(_encode_int_array(offsets))
+    buffer.extend(_encode_int_array(nulls))
+    buffer.extend(data)
+    return bytes(buffer)
+
+
+def _encode_key_table(table, weights=None, key_weights=None):
+    """{문자열 키: [정수...]} 를 키의 UTF-8 바이트 순서로 정렬하고, 키의 CRC32 로 찾는 슬롯 표와 함께 씁니다.
+
+    weights({키: [실수...]}, 값과 같은 길이)나 key_weights({키: 실수})가 있으면 정수 뒤에 함께 씁니다.
+    """
+    keys_sorted = sorted(table, key=_utf8_order)
+    flags = (_HAS_WEIGHTS if weights is not None else 0) | (_HAS_KEY_WEIGHTS if key_weights is not None else 0)
+    key_offsets, value_offsets = [0], [0]
+    keys, values, value_weights = bytearray(), [], []
+    for key in keys_sorted:
+        keys.extend(key.encode("utf-8"))
+        key_offsets.append(len(keys))
+        values.extend(table[key])
+        value_offsets.append(len(values))
+        if weights is not None:
+            value_weights.extend(weights[key])
+    # 열린 주소법 슬롯 (키 수의 2배 이상인 2의 거듭제곱 크기, 빈 슬롯은 -1)
+    slot_count = 1 << max(1, (2 * len(keys_sorted)).bit_length())
+    slots = [-1] * slot_count
+    for i, key in enumerate(keys_sorted):
+        slot = zlib.crc32(key.encode("utf-8")) & (slot_count - 1)
+        while slots[slot] != -1:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = i
+    buffer = bytearray(_U64.pack(len(keys_sorted)))
+    buffer.extend(_U64.pack(flags))
+    buffer.extend(_U64.pack(slot_count))
+    buffer.extend(_encode_int_array(key_offsets))
+    buffer.extend(_encode_int_array(value_offsets))
+    buffer.extend(keys)
+    _pad(buffer)
+    buffer.extend(_encode_int_array(values))
+    if weights is not None:
+        buffer.extend(_encode_float_array(value_weights))
+    if key_weights is not None:
+        buffer.extend(_encode_float_array([key_weights[key] for key in keys_sorted]))
+    buffer.extend(_encode_int_array(slots))
+    return bytes(buffer)
+
+
+def _encode_weighted_rows(rows):
+    """행마다 [(정수, 실수)...] 를 (행 시작 위치, 정수, 실수) 배열로 씁니다"""
+    offsets, ids, weights = [0], [], []
+    for row in rows:
+        for key_id, weight in row:
+            ids.append(key_id)
+            weights.append(weight)
+        offsets.append(len(ids))
+    buffer = bytearray(_U64.pack(len(rows)))
+    buffer.extend(_encode_int_array(offsets))
+    buffer.extend(_encode_int_array(ids))
+    buffer.extend(_encode_float_array(weights))
+    return bytes(buffer)
+
+
+# --- mmap 위의 섹션 ---
+class _KeyTable:
+    """mmap 위의 정렬된 (키 -> 정수 목록[, 실수 목록]) 테이블"""
+
+    def __init__(self, view):
+        self.count, flags, slot_count = (_U64.unpack_from(view, offset)[0] for offset in (0, 8, 16))
+        offsets_size = (self.count + 1) * 8
+        self._key_offsets = view[24:24 + offsets_size].cast("q")
+        self._value_offsets = view[24 + offsets_size:24 + 2 * offsets_size].cast("q")
+        keys_start = 24 + 2 * offsets_size
+        keys_end = keys_start + self._key_offsets[self.count]
+        self._keys = view[keys_start:keys_end]
+        position = keys_end + (-keys_end % 8)
+        values_size = self._value_offsets[self.count] * 8
+        self._values = view[position:position + values_size].cast("q")
+        position += values_size
+        self._weights = self._key_weights = None
+        if flags & _HAS_WEIGHTS:
+            self._weights = view[position:position + values_size].cast("d")
+            position += values_size
+        if flags & _HAS_KEY_WEIGHTS:
+            self._key_weights = view[position:position + self.count * 8].cast("d")
+            position += self.count * 8
+        self._slots = view[position:position + slot_count * 8].cast("q")
+        self._mask = slot_count - 1
+
+    def __len__(self):
+        return self.count
+
+    def _key_bytes(self, i):
+        return self._keys[self._key_offsets[i]:self._key_offsets[i + 1]]
+
+    def find(self, key):
+        """키의 순번, 없으면 -1"""
+        encoded = key.encode("utf-8")
+        slot = zlib.crc32(encoded) & self._mask
+        while True:
+            i = self._slots[slot]
+            if i < 0:
+                return -1
+            if self._key_bytes(i) == encoded:
+                return i
+            slot = (slot + 1) & self._mask
+
+    def key_at(self, i):
+        return str(self._key_bytes(i), "utf-8")
+
+    def values_at(self, i):
+        return self._values[self._value_offsets[i]:self._value_offsets[i + 1]]
+
+    def weights_at(self, i):
+        return self._weights[self._value_offsets[i]:self._value_offsets[i + 1]]
+
+    def key_weight(self, i):
+        return self._key_weights[i]
+
+    def get(self, key):
+        i = self.find(key)
+        return self.values_at(i) if i >= 0 else None
+
+
+class _WeightedRows:
+    """mmap 위의 행별 (정수, 실수) 목록"""
+
+    def __init__(self, view):
+        self.count = _U64.unpack_from(view, 0)[0]
+        offsets_size = (self.count + 1) * 8
+        self._offsets = view[8:8 + offsets_size].cast("q")
+        total = self._offsets[self.count] * 8
+        ids_start = 8 + offsets_size
+        self._ids = view[ids_start:ids_start + total].cast("q")
+        self._weights = view[ids_start + total:ids_start + 2 * total].cast("d")
+
+    def __len__(self):
+        return self.count
+
+    def row(self, i):
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return zip(self._ids[start:end], self._weights[start:end])
+
+
+class _Strings:
+    """mmap 위의 문자열 목록 (행 번호 -> 문자열 또는 None)"""
+
+    def __init__(self, view):
+        self.count = _U64.unpack_from(view, 0)[0]
+        offsets_size = (self.count + 1) * 8
+        self._offsets = view[8:8 + offsets_size].cast("q")
+        self._nulls = view[8 + offsets_size:8 + offsets_size + self.count * 8].cast("q")
+        data_start = 8 + offsets_size + self.count * 8
+        self._data = view[data_start:data_start + self._offsets[self.count]]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if self._nulls[i]:
+            return None
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def non_null(self):
+        return frozenset(i for i, null in enumerate(self._nulls) if not null)
+
+
+class _Folded:
+    """_Strings 를 ASCII 소문자로 맞춰 읽는 목록 (_SubstringIndex.folded 자리)"""
+
+    def __init__(self, strings):
+        self._strings = strings
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __getitem__(self, i):
+        value = self._strings[i]
+        return fold_ascii(value) if value is not None else None
+
+
+class _Reviews:
+    """행 번호 -> 리뷰 수 (reviewnum 이 NULL 이면 None)"""
+
+    def __init__(self, values):
+        self._values = values
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, i):
+        value = self._values[i]
+        return None if value == _NO_REVIEWS else value
+
+
+class _Coordinates:
+    """행 번호 -> 좌표 (NaN 으로 저장한 NULL 은 None)"""
+
+    def __init__(self, values):
+        self._values = values
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, i):
+        value = self._values[i]
+        return None if math.isnan(value) else value
+
+
+class _Positions:
+    """id -> 행 번호 (id 오름차순 배열의 이진 탐색, PlaceIndex.positions 자리)"""
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, place_id):
+        return self.get(place_id) is not None
+
+    def get(self, place_id, default=None):
+        i = bisect.bisect_left(self._ids, place_id)
+        return i if i < len(self._ids) and self._ids[i] == place_id else default
+
+
+def _sorted_contains(values, value):
+    i = bisect.bisect_left(values, value)
+    return i < len(values) and values[i] == value
+
+
+class _ArtifactSubstringIndex(_SubstringIndex):
+    """_SubstringIndex 의 검색을 mmap 위의 바이그램 표로 합니다"""
+
+    def __init__(self, strings, grams):
+        self.folded = _Folded(strings)
+        self.non_null = strings.non_null()
+        self.postings = grams
+        self._hits = {}
+
+    def _intersect(self, postings):
+        # 포스팅은 행 번호 오름차순이므로, 가장 짧은 포스팅의 행만 나머지 포스팅에서 이진 탐색합니다
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = [pos for pos in candidates if _sorted_contains(posting, pos)]
+            if not candidates:
+                break
+        return set(candidates)
+
+
+class _Posting:
+    """n-gram 하나의 {행 번호: 가중치} (NameMatcher.postings 의 값 자리)"""
+
+    def __init__(self, positions, weights):
+        self._positions = positions
+        self._weights = weights
+
+    def __len__(self):
+        return len(self._positions)
+
+    def items(self):
+        return zip(self._positions, self._weights)
+
+
+class _NgramPostings:
+    def __init__(self, grams):
+        self._grams = grams
+
+    def get(self, gram, default=None):
+        i = self._grams.find(gram)
+        return _Posting(self._grams.values_at(i), self._grams.weights_at(i)) if i >= 0 else default
+
+
+class _NgramIdf:
+    def __init__(self, grams):
+        self._grams = grams
+
+    def get(self, gram, default=None):
+        i = self._grams.find(gram)
+        return self._grams.key_weight(i) if i >= 0 else default
+
+
+class _NgramVectors:
+    def __init__(self, grams, rows):
+        self._grams = grams
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, pos):
+        return {self._grams.key_at(gram_id): weight for gram_id, weight in self._rows.row(pos)}
+
+
+class _ArtifactNameMatcher(NameMatcher):
+    """NameMatcher 의 유사도 검색(top_k, best)을 mmap 위의 n-gram 표로 합니다"""
+
+    def __init__(self, grams, rows):
+        self.idf = _NgramIdf(grams)
+        self.postings = _NgramPostings(grams)
+        self.vectors = _NgramVectors(grams, rows)
+
+
+# --- 빌드 ---
+def _load_hashtag_rows(insta_db_path):
+    conn = sqlite3.connect(f"file:{insta_db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute(
+            "SELECT id, hashtags_representation FROM instagram_posts WHERE hashtags_representation IS NOT NULL ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _road_keys(table):
+    # PlaceIndex 의 (이름, 도로명 키) 튜플 키를 "이름\x1f도로명 키" 로 잇습니다.
+    # 이름은 normalize_place_name/extract_core_name 결과, 도로명 키는 도로명+건물번호를 공백으로 이은 것이라
+    # 어느 쪽에도 \x1f 가 없으므로 튜플과 이은 문자열이 일대일로 대응합니다.
+    return {f"{name}\x1f{tokens}": [pos] for (name, tokens), pos in table.items()}
+
+
+def _ngram_sections(matcher):
+    grams = sorted(matcher.idf, key=_utf8_order)
+    gram_ids = {gram: i for i, gram in enumerate(grams)}
+    postings = {gram: matcher.postings.get(gram, {}) for gram in grams}
+    table = _encode_key_table(
+        {gram: list(posting) for gram, posting in postings.items()},
+        weights={gram: list(posting.values()) for gram, posting in postings.items()},
+        key_weights=matcher.idf,
+    )
+    rows = _encode_weighted_rows([[(gram_ids[gram], weight) for gram, weight in vector.items()]
+                                  for vector in matcher.vectors])
+    return table, rows
+
+
+def build_artifact(review_db_path, insta_db_path, output_path):
+    """조회 테이블을 만들어 output_path 에 원자적으로 씁니다. 메타데이터를 돌려줍니다"""
+    started = time.perf_counter()
+    sources = {"review": _describe_source(review_db_path), "insta": _describe_source(insta_db_path)}
+
+    # 서버의 메모리 인덱스와 같은 결과를 내도록 PlaceIndex 가 만든 표를 그대로 씁니다
+    index = load_place_index(review_db_path)
+    name_road, core_road = _road_keys(index._by_name_road), _road_keys(index._by_core_road)
+    ngrams, ngram_vectors = _ngram_sections(index.name_matcher)
+
+    hashtags = {}
+    for post_id, representation in _load_hashtag_rows(insta_db_path):
+        for tag in parse_hashtags(representation):
+            hashtags.setdefault(tag, []).append(post_id)
+
+    def nan_if_none(values):
+        return [math.nan if value is None else value for value in values]
+
+    def sorted_postings(substring_index):
+        return {gram: sorted(positions) for gram, positions in substring_index.postings.items()}
+
+    sections = {
+        "place_ids": _encode_int_array(index.ids),
+        "place_names": _encode_strings(index.names),
+        "place_addresses": _encode_strings(index.addresses),
+        "place_reviews": _encode_int_array([_review_value(raw) for raw in index.reviews]),
+        "place_latitudes": _encode_float_array(nan_if_none(index.latitudes)),
+        "place_longitudes": _encode_float_array(nan_if_none(index.longitudes)),
+        "name_road": _encode_key_table(name_road),
+        "core_road": _encode_key_table(core_road),
+        "name_grams": _encode_key_table(sorted_postings(index._name_index)),
+        "address_grams": _encode_key_table(sorted_postings(index._address_index)),
+        "ngrams": ngrams,
+        "ngram_vectors": ngram_vectors,
+        "hashtags": _encode_key_table(hashtags),
+    }
+    payload = bytearray()
+    layout = {}
+    for name, data in sections.items():
+        layout[name] = [len(payload), len(data)]
+        payload.extend(data)
+        _pad(payload)
+
+    metadata = {
+        "format_version": FORMAT_VERSION,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sources": sources,
+        "counts": {"places": len(index), "name_road": len(name_road), "core_road": len(core_road),
+                   "name_grams": len(index._name_index.postings), "address_grams": len(index._address_index.postings),
+                   "ngrams": len(index.name_matcher.idf), "hashtags": len(hashtags)},
+        "sections": layout,
+        "payload_size": len(payload),
+        "payload_crc32": zlib.crc32(payload),
+    }
+    meta_bytes = bytearray(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+    meta_bytes.extend(b" " * (-(_HEADER.size + len(meta_bytes)) % 8))
+
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(payload)
+    os.replace(temp_path, output_path)
+    metadata["build_seconds"] = round(time.perf_counter() - started, 3)
+    return metadata
+
+
+# --- 읽기 ---
+class ArtifactError(Exception):
+    """아티팩트 파일이 없거나 형식/체크섬이 맞지 않을 때"""
+
+
+class MatchArtifact(PlaceIndex):
+    """mmap 으로 연 매칭 인덱스 아티팩트 (읽기 전용).
+
+    PlaceIndex 와 같은 속성과 조회(exact, first, candidates, similar_names, nearby_rows)를 mmap 위의 표로 제공하므로
+    resolve_place / resolve_place_nearby 에 PlaceIndex 대신 넘길 수 있습니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # 섹션들이 mmap 위의 memoryview 를 잡고 있으므로 파일은 객체가 사라질 때 함께 닫힙니다
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._open()
+
+    def _open(self):
+        view = memoryview(self._mmap)
+        if len(view) < _HEADER.size:
+            raise ArtifactError("파일이 너무 짧습니다")
+        magic, version, meta_len = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ArtifactError("매칭 인덱스 파일이 아닙니다")
+        if version != FORMAT_VERSION:
+            raise ArtifactError(f"형식 버전 {version} 은 지원하지 않습니다 (필요: {FORMAT_VERSION})")
+        self.metadata = json.loads(bytes(view[_HEADER.size:_HEADER.size + meta_len]))
+        payload_start = _HEADER.size + meta_len
+        payload = view[payload_start:payload_start + self.metadata["payload_size"]]
+        if len(payload) != self.metadata["payload_size"] or zlib.crc32(payload) != self.metadata["payload_crc32"]:
+            raise ArtifactError("본문 체크섬이 맞지 않습니다 (파일이 손상되었거나 쓰는 중입니다)")
+
+        def section(name):
+            offset, length = self.metadata["sections"][name]
+            return payload[offset:offset + length]
+
+        # PlaceIndex 와 같은 이름의 속성 (목록 대신 mmap 위의 읽기 전용 보기)
+        self.ids = section("place_ids").cast("q")
+        self.names = _Strings(section("place_names"))
+        self.addresses = _Strings(section("place_addresses"))
+        self.reviews = _Reviews(section("place_reviews").cast("q"))
+        self.latitudes = _Coordinates(section("place_latitudes").cast("d"))
+        self.longitudes = _Coordinates(section("place_longitudes").cast("d"))
+        self.positions = _Positions(self.ids)
+        self._name_road = _KeyTable(section("name_road"))
+        self._core_road = _KeyTable(section("core_road"))
+        self._name_index = _ArtifactSubstringIndex(self.names, _KeyTable(section("name_grams")))
+        self._address_index = _ArtifactSubstringIndex(self.addresses, _KeyTable(section("address_grams")))
+        self.name_matcher = _ArtifactNameMatcher(_KeyTable(section("ngrams")), _WeightedRows(section("ngram_vectors")))
+        self._similar_hits = {}
+        self._hashtags = _KeyTable(section("hashtags"))
+
+    def matches_source(self, role, path):
+        """원본 DB 가 빌드할 때와 같은지 (수정 시각/크기가 다르면 SHA-256 으로 다시 확인)"""
+        recorded = self.metadata["sources"][role]
+        if [list(part) if part else None for part in file_signature(path)] == recorded["signature"]:
+            return True
+        return source_checksum(path) == recorded["sha256"]
+
+    def exact(self, name, address):
+        """PlaceIndex.exact 와 같은 행 번호 (정규화 이름/핵심 이름 + 도로명 키가 같은 행)"""
+        tokens = road_tokens(address) if address else None
+        if not tokens:
+            return None
+        positions = self._name_road.get(f"{normalize_place_name(name)}\x1f{tokens}")
+        if positions is None:
+            positions = self._core_road.get(f"{extract_core_name(name)}\x1f{tokens}")
+        return positions[0] if positions is not None else None
+
+    def hashtag_posts(self, tag):
+        """정규화 태그가 tag 인 게시물 id 집합 (post_hashtags 의 tag_normalized = ? 와 같음)"""
+        return set(self._hashtags.get(tag) or ())
+
+
+class ArtifactHolder:
+    """아티팩트를 열어 두는 보관소.
+
+    원본 DB 가 바뀌어도 기존 아티팩트를 계속 돌려주고, 백그라운드 스레드에서 다시 빌드해 끝나면 바꿔 끼웁니다.
+    """
+
+    def __init__(self, path, sources, rebuild_interval=REBUILD_INTERVAL):
+        self.path = path
+        self.sources = sources  # {"review": db 경로, "insta": db 경로}
+        self.rebuild_interval = rebuild_interval
+        self._artifact = None
+        self._checked = {}  # 역할 -> (확인한 파일 서명, 일치 여부)
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread = None
+        self._last_rebuild = None  # 마지막으로 다시 빌드를 끝낸 시각 (time.monotonic)
+        self._closed = False
+
+    def load(self):
+        """아티팩트를 엽니다. 열었으면 True (원본 DB 와 다르면 그대로 쓰면서 다시 빌드를 시작합니다).
+
+        없거나 읽을 수 없으면 False 이고, 읽을 수 없는 파일(이전 형식 버전 등)은 백그라운드에서 다시 빌드합니다.
+        """
+        self._closed = False
+        if not os.path.exists(self.path):
+            logger.info(f"🗃️ 매칭 인덱스 아티팩트가 없습니다 ({self.path}), 메모리 인덱스를 사용합니다")
+            return False
+        started = time.perf_counter()
+        try:
+            artifact = MatchArtifact(self.path)
+        except (ArtifactError, OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ 매칭 인덱스 아티팩트를 열 수 없습니다 ({self.path}): {e}. "
+                           f"메모리 인덱스를 쓰면서 백그라운드에서 다시 빌드합니다")
+            self.start_rebuild()
+            return False
+        with self._lock:
+            self._artifact = artifact
+            self._checked = {}
+        logger.info(f"🗃️ 매칭 인덱스 아티팩트 로드 완료 ({len(artifact)}개 장소, "
+                    f"{(time.perf_counter() - started) * 1000:.1f}ms, {artifact.metadata['built_at']} 빌드)")
+        if not self._verify(tuple(self.sources)):
+            logger.warning("⚠️ 매칭 인덱스 아티팩트가 원본 DB 와 다릅니다. 기존 아티팩트를 쓰면서 백그라운드에서 다시 빌드합니다")
+        return True
+
+    def _cached(self, role):
+        """원본 DB 서명이 마지막으로 확인한 때와 같으면 그때 결과, 바뀌었거나 확인한 적이 없으면 None"""
+        checked = self._checked.get(role)
+        if checked is not None and checked[0] == file_signature(self.sources[role]):
+            return checked[1]
+        return None
+
+    def _verify(self, roles):
+        """roles 의 원본 DB 가 아티팩트와 일치하는지 확인하고, 다르면 다시 빌드를 시작합니다.
+
+        서명이 바뀐 DB 는 SHA-256 으로 다시 확인해 DB 크기만큼 읽으므로, 서버에서는 스레드에서 부릅니다.
+        """
+        with self._lock:
+            artifact = self._artifact
+            if artifact is None:
+                return False
+            for role in roles:
+                if self._cached(role) is None:
+                    path = self.sources[role]
+                    self._checked[role] = (file_signature(path), artifact.matches_source(role, path))
+            fresh = all(self._checked[role][1] for role in roles)
+        if not fresh:
+            self.start_rebuild()
+        return fresh
+
+    async def current(self, *roles):
+        """열어 둔 아티팩트, 없으면 None.
+
+        roles(기본: 전부)의 원본 DB 가 바뀌었으면 다시 빌드를 시작하고, 끝날 때까지는 기존 아티팩트를 돌려줍니다.
+        """
+        artifact = self._artifact
+        if artifact is None:
+            return None
+        roles = roles or tuple(self.sources)
+        cached = [self._cached(role) for role in roles]
+        if None in cached:
+            await asyncio.to_thread(self._verify, roles)
+        elif not all(cached):
+            self.start_rebuild()
+        return artifact
+
+    def start_rebuild(self):
+        """백그라운드 스레드에서 다시 빌드를 시작합니다.
+
+        이미 빌드 중이거나 마지막 빌드 후 rebuild_interval 이 지나지 않았으면 시작하지 않고 False 를 돌려줍니다.
+        """
+        with self._rebuild_lock:
+            if self._closed or (self._rebuild_thread is not None and self._rebuild_thread.is_alive()):
+                return False
+            if self._last_rebuild is not None and time.monotonic() - self._last_rebuild < self.rebuild_interval:
+                return False
+            self._rebuild_thread = threading.Thread(target=self.rebuild, name="match-artifact-rebuild", daemon=True)
+            self._rebuild_thread.start()
+            return True
+
+    def rebuild(self):
+        """원본 DB 로 아티팩트를 다시 빌드해 바꿔 끼웁니다. 성공하면 True"""
+        started = time.perf_counter()
+        logger.info(f"🗃️ 매칭 인덱스 아티팩트를 다시 빌드합니다 ({self.path})")
+        try:
+            build_artifact(self.sources["review"], self.sources["insta"], self.path)
+            artifact = MatchArtifact(self.path)
+        except Exception as e:
+            logger.error(f"❌ 매칭 인덱스 아티팩트 다시 빌드 실패: {e}")
+            return False
+        finally:
+            self._last_rebuild = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return False
+            self._artifact = artifact
+            self._checked = {}
+        logger.info(f"🗃️ 매칭 인덱스 아티팩트 다시 빌드 완료 ({len(artifact)}개 장소, "
+                    f"{time.perf_counter() - started:.1f}s)")
+        return True
+
+    def wait_for_rebuild(self, timeout=None):
+        """진행 중인 다시 빌드가 끝날 때까지 기다립니다"""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._artifact = None
+            self._checked = {}
+
+
+# --- 직접 실행 시 아티팩트 빌드 ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="매칭 인덱스 아티팩트를 빌드합니다.")
+    parser.add_argument("--review-db", default="restarant.db")
+    parser.add_argument("--insta-db", default="finally.db")
+    parser.add_argument("--output", default="match_index.bin")
+    args = parser.parse_args()
+
+    result = build_artifact(args.review_db, args.insta_db, args.output)
+    counts = result["counts"]
+    print(f"'{args.output}' 빌드 완료 ({result['build_seconds']}초, {os.path.getsize(args.output) // 1024}KB): "
+          f"장소 {counts['places']}개, 이름 키 {counts['name_road']}개, n-gram {counts['ngrams']}개, "
+          f"해시태그 {counts['hashtags']}개")
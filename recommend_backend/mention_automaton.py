@@ -0,0 +1,137 @@
+import sqlite3
+from collections import deque
+
+from place_index import like_regex, fold_ascii
+from post_hashtags import normalize_hashtag, parse_hashtags
+
+# --- 아호-코라식 기반 인스타 언급 수 계산 ---
+# 한 요청에 들어온 모든 장소의 캡션 키워드 변형으로 오토마톤을 하나 만들고,
+# 메모리에 올려 둔 instagram_posts 의 캡션을 한 번만 훑어서 장소별로 중복 없는 게시물 id 를 모읍니다.
+# 해시태그는 post_hashtags 와 같은 정규화 태그 표(태그 -> 게시물 id)에서 같은 태그만 찾습니다.
+# 그래서 post_hashtags 가 있는 DB 에서는 LIKE 엔진의 found_posts 와 같고,
+# 테이블이 없어 LIKE 엔진이 '%#키워드%' 로 돌아간 경우에는 더 긴 태그('#경산맛집')만 있는 게시물이 빠집니다.
+
+
+class AhoCorasick:
+    """여러 문자열 패턴을 한 번의 순회로 찾는 오토마톤"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                state = next_state
+            self._out[state].add(index)
+
+        # 실패 링크 계산 (BFS), 출력 집합은 실패 링크를 따라 합쳐 둡니다
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._out[next_state] |= self._out[self._fail[next_state]]
+
+    def find_all(self, text):
+        """text 안에 나타나는 패턴 번호 집합"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = set()
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class PostSnapshot:
+    """instagram_posts 의 메모리 사본 (캡션은 LIKE 와 같게 ASCII 대소문자를 접고, 해시태그는 정규화 태그 표로 둠)"""
+
+    def __init__(self, rows):
+        self.ids = [row[0] for row in rows]
+        self.captions = [fold_ascii(row[1]) if row[1] is not None else None for row in rows]
+        self.tag_posts = {}
+        for post_id, _, representation in rows:
+            for tag in parse_hashtags(representation):
+                self.tag_posts.setdefault(tag, set()).add(post_id)
+
+    def hashtag_posts(self, tag):
+        """정규화 태그가 tag 인 게시물 id 집합"""
+        return self.tag_posts.get(tag, set())
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_post_snapshot(db_path) -> PostSnapshot:
+    """finally.db 의 instagram_posts 를 읽어 메모리 사본을 만듭니다"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT id, caption_text, hashtags_representation FROM instagram_posts ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return PostSnapshot(rows)
+
+
+def collect_mentions(snapshot, place_keywords, hashtag_index=None):
+    """장소별 (키워드 집합, 해시태그 검색 여부)로 언급한 게시물 id 집합을 모읍니다.
+
+    place_keywords: {장소 키: (keywords, search_hashtags)}
+    hashtag_index: 매칭 인덱스 아티팩트(MatchArtifact). 주면 해시태그를 사본 대신 아티팩트의 태그 표에서 찾습니다.
+    """
+    tag_index = hashtag_index if hashtag_index is not None else snapshot
+    pattern_ids = {}
+    caption_owners = {}
+    wildcard_terms = []  # LIKE 와일드카드가 든 키워드는 정규식으로 따로 처리
+
+    found_posts = {key: set() for key in place_keywords}
+
+    for key, (keywords, search_hashtags) in place_keywords.items():
+        for keyword in keywords:
+            folded = fold_ascii(keyword)
+            if '%' in folded or '_' in folded:
+                wildcard_terms.append((like_regex(folded), key))
+            else:
+                index = pattern_ids.setdefault(folded, len(pattern_ids))
+                caption_owners.setdefault(index, set()).add(key)
+            if search_hashtags:
+                tag = normalize_hashtag(keyword)
+                if tag:
+                    found_posts[key] |= tag_index.hashtag_posts(tag)
+
+    automaton = AhoCorasick(pattern_ids) if pattern_ids else None
+
+    for post_id, caption in zip(snapshot.ids, snapshot.captions):
+        if caption is None:
+            continue
+        if automaton:
+            for index in automaton.find_all(caption):
+                for key in caption_owners.get(index, ()):
+                    found_posts[key].add(post_id)
+        for regex, key in wildcard_terms:
+            if regex.search(caption):
+                found_posts[key].add(post_id)
+
+    return found_posts
+
+
+def count_mentions(snapshot, place_keywords, hashtag_index=None):
+    """장소별 중복 제거된 언급 수"""
+    return {key: len(posts) for key, posts in collect_mentions(snapshot, place_keywords, hashtag_index).items()}
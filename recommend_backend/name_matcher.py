@@ -0,0 +1,93 @@
+import math
+import re
+from collections import Counter
+
+# --- 문자 n-gram TF-IDF 이름 유사도 매처 ---
+# 식당 이름마다 문자 바이그램/트라이그램 TF-IDF 벡터(L2 정규화)를 미리 만들어 두고
+# 질의 이름과의 코사인 유사도로 가장 비슷한 이름 top-k 를 찾습니다.
+# 앞 글자가 달라도(카카오 "OO 하양역점" vs 네이버 "하양 OO") 공통 n-gram 으로 찾을 수 있고,
+# 후보를 도로명 주소 버킷(행 번호 집합)으로 좁혀서 한 번에 수백 개 이하만 계산합니다.
+
+NGRAM_SIZES = (2, 3)
+DEFAULT_THRESHOLD = 0.3
+
+_SPACE_PATTERN = re.compile(r'\s+')
+
+
+def _ngram_counts(text):
+    """공백을 지운 소문자 문자열의 문자 n-gram 빈도 (한 글자 이름은 그 글자 자체)"""
+    text = _SPACE_PATTERN.sub('', text.lower())
+    if len(text) < min(NGRAM_SIZES):
+        return Counter([text]) if text else Counter()
+    grams = Counter()
+    for size in NGRAM_SIZES:
+        for i in range(len(text) - size + 1):
+            grams[text[i:i + size]] += 1
+    return grams
+
+
+class NameMatcher:
+    """이름 목록에 대한 n-gram TF-IDF 유사도 검색기 (행 번호는 names 의 순서)"""
+
+    def __init__(self, names):
+        counts = [_ngram_counts(name) if name else Counter() for name in names]
+        document_frequency = Counter()
+        for grams in counts:
+            document_frequency.update(grams.keys())
+
+        total = len(counts)
+        self.idf = {gram: math.log((1 + total) / (1 + df)) + 1.0 for gram, df in document_frequency.items()}
+        self.vectors = [self._weigh(grams) for grams in counts]
+        self.postings = {}  # n-gram -> {행 번호: 가중치}
+        for pos, vector in enumerate(self.vectors):
+            for gram, weight in vector.items():
+                self.postings.setdefault(gram, {})[pos] = weight
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def _weigh(self, grams):
+        vector = {
+            gram: (1.0 + math.log(count)) * self.idf.get(gram, 0.0)
+            for gram, count in grams.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            return {}
+        return {gram: weight / norm for gram, weight in vector.items() if weight}
+
+    def top_k(self, name, within=None, k=5, threshold=DEFAULT_THRESHOLD):
+        """name 과 유사도가 threshold 이상인 (행 번호, 유사도) 를 높은 순으로 최대 k 개 돌려줍니다.
+
+        within 에 행 번호 집합(예: 같은 도로명 주소 버킷)을 주면 그 안에서만 찾습니다.
+        유사도가 같으면 행 번호가 작은 쪽이 먼저입니다.
+        """
+        query = self._weigh(_ngram_counts(name or ''))
+        if not query or (within is not None and not within):
+            return []
+
+        scores = {}
+        if within is not None and len(within) * len(query) < sum(len(self.postings.get(gram, ())) for gram in query):
+            # 버킷이 작으면 버킷 안의 벡터와 직접 내적
+            for pos in within:
+                vector = self.vectors[pos]
+                score = sum(weight * vector.get(gram, 0.0) for gram, weight in query.items())
+                if score:
+                    scores[pos] = score
+        else:
+            # 역색인을 따라 질의와 n-gram 을 공유하는 이름만 누적
+            for gram, weight in query.items():
+                for pos, doc_weight in self.postings.get(gram, {}).items():
+                    if within is None or pos in within:
+                        scores[pos] = scores.get(pos, 0.0) + weight * doc_weight
+
+        ranked = sorted(
+            ((pos, score) for pos, score in scores.items() if score >= threshold),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:k]
+
+    def best(self, name, within=None, threshold=DEFAULT_THRESHOLD):
+        """가장 유사한 (행 번호, 유사도), 없으면 None"""
+        matches = self.top_k(name, within, k=1, threshold=threshold)
+        return matches[0] if matches else None
@@ -0,0 +1,121 @@
+import json
+import os
+import re
+
+# --- 장소명/주소 정규화 공통 함수 ---
+# 리뷰 DB 매칭과 인덱스 구축, 크롤러의 정규화 컬럼 저장에서 같은 규칙을 쓰도록 한 곳에 모아 둡니다.
+# 지점명 별칭(영대점 -> 영남대점 등)과 지점/지역 접미사는 place_aliases.json 에서 읽습니다.
+
+ALIAS_FILE = os.environ.get(
+    "MATSPOT_ALIAS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "place_aliases.json")
+)
+
+
+def load_alias_dictionary(path=ALIAS_FILE):
+    """별칭 사전 파일을 읽습니다 (name_aliases: [[원래, 바꿀]], branch_suffixes, region_words)"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        "name_aliases": [tuple(pair) for pair in data.get("name_aliases", [])],
+        "branch_suffixes": list(data.get("branch_suffixes", [])),
+        "region_words": list(data.get("region_words", [])),
+    }
+
+
+def _alternation(words):
+    # 긴 단어부터 시도해야 "영남대점" 이 "본점" 같은 짧은 접미사보다 먼저 잡힙니다
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+ALIASES = load_alias_dictionary()
+NAME_ALIASES = ALIASES["name_aliases"]
+
+FLOOR_SUFFIX_PATTERN = re.compile(r'\s+[A-Za-z0-9가-힣]+층$')
+BRANCH_SUFFIX_PATTERN = re.compile(rf'\s*({_alternation(ALIASES["branch_suffixes"])})\s*$')
+REGION_PATTERN = re.compile(rf'\s*(?:{_alternation(ALIASES["region_words"])})\s*')
+ROAD_PATTERN = re.compile(r'([가-힣]+(?:로|길)\d*[가-힣]*)')
+NUMBER_PATTERN = re.compile(r'(\d+(?:-\d+)?)')
+
+
+def normalize_place_name(name):
+    """장소명을 정규화합니다"""
+    # 별칭 사전의 변형을 순서대로 처리
+    normalized = name
+    for alias, canonical in NAME_ALIASES:
+        normalized = normalized.replace(alias, canonical)
+    return normalized
+
+
+def extract_core_name(name):
+    """핵심 매장명만 추출합니다 (지점명 제거)"""
+    # 지점명 패턴들 제거
+    core = BRANCH_SUFFIX_PATTERN.sub('', name)
+    core = REGION_PATTERN.sub('', core)  # 경산 제거
+    return core.strip()
+
+
+def extract_address_keywords(address):
+    """주소에서 핵심 키워드들을 추출합니다"""
+    if not address:
+        return []
+    # 주요 도로명, 건물명 등 추출
+    keywords = []
+    # 도로명 추출 (예: "청운로", "대학로59길")
+    keywords.extend(ROAD_PATTERN.findall(address))
+    # 건물번호 추출 (예: "12-6", "280")
+    keywords.extend(NUMBER_PATTERN.findall(address))
+    return keywords
+
+
+def road_tokens(address):
+    """정규화 컬럼/동일성 비교용 도로명 키 (층 정보를 뗀 주소의 도로명+건물번호, 공백 구분)"""
+    return ' '.join(extract_address_keywords(clean_road_address(address)))
+
+
+def normalized_columns(name, address):
+    """크롤러가 저장하는 정규화 컬럼 값 (normalized_name, core_name, road_tokens)"""
+    return {
+        "normalized_name": normalize_place_name(name) if name else None,
+        "core_name": extract_core_name(name) if name else None,
+        "road_tokens": road_tokens(address) if address else None,
+    }
+
+
+def clean_road_address(address):
+    """도로명 주소 끝의 층 정보(예: '2층')를 제거합니다"""
+    if address:
+        address = FLOOR_SUFFIX_PATTERN.sub('', address).strip()
+    return address
+
+
+def build_insta_keywords(place_name, road_address_name):
+    """인스타그램 언급 검색에 쓸 키워드 집합과 해시태그 검색 여부를 돌려줍니다"""
+    main_name = place_name.split()[0]
+    unique_keywords = set()
+
+    # 이름 길이에 따른 검색 전략
+    if len(main_name) < 2:
+        # 한 글자 이름은 주소로 검색
+        cleaned_address = clean_road_address(road_address_name)
+        if cleaned_address:
+            unique_keywords.add(cleaned_address)
+    else:
+        # 원본 이름들 추가
+        unique_keywords.add(place_name)
+        unique_keywords.add(place_name.replace(" ", ""))
+        unique_keywords.add(main_name)
+
+        # 정규화된 이름들 추가 (영대점 -> 영남대점 등)
+        normalized_name = normalize_place_name(place_name)
+        if normalized_name != place_name:
+            unique_keywords.add(normalized_name)
+            unique_keywords.add(normalized_name.replace(" ", ""))
+
+        # 핵심 이름 추가 (지점명 제거)
+        core_name = extract_core_name(place_name)
+        if core_name and core_name != place_name:
+            unique_keywords.add(core_name)
+
+    unique_keywords = {kw for kw in unique_keywords if kw and len(kw) >= 2}
+    # 해시태그는 이름으로 검색하는 경우에만 확인
+    return unique_keywords, len(main_name) >= 2
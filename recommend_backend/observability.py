@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# --- 메트릭(Prometheus 텍스트 형식)과 샘플링된 구조화 로그 ---
+# 외부 라이브러리 없이 /metrics 에서 읽을 수 있는 카운터와 히스토그램을 제공합니다.
+# 장소별 상세 로그는 DEBUG 레벨이면서 샘플링된 요청에서만 JSON 한 줄로 남깁니다.
+
+logger = logging.getLogger("matspot.recommend")
+
+TRACE_SAMPLE_RATE = float(os.environ.get("MATSPOT_TRACE_SAMPLE_RATE", "0.01"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """렌더링할 때 callback 으로 값을 읽는 게이지 ({라벨 튜플: 값} 을 돌려줌)"""
+
+    def __init__(self, name, help_text, labelnames, callback):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._callback = callback
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self._callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}  # 라벨 -> [버킷별 개수, 합계, 개수]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render_metrics():
+    """등록된 모든 메트릭을 Prometheus 텍스트 형식으로 돌려줍니다"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- 추천 백엔드 메트릭 ---
+STAGE_LATENCY = Histogram(
+    "matspot_stage_duration_seconds",
+    "Latency of recommend pipeline stages (request, review_lookup, instagram_lookup, scoring).",
+    ("stage",),
+)
+STRATEGY_MATCHES = Counter(
+    "matspot_review_match_total",
+    "Places resolved by each review matching strategy (1-4) or none.",
+    ("strategy",),
+)
+DB_QUERIES = Counter("matspot_db_queries_total", "SQL statements executed on the request path.", ("db",))
+DB_QUERIES_PER_REQUEST = Histogram(
+    "matspot_db_queries_per_request", "SQL statements executed per recommend request.", buckets=COUNT_BUCKETS
+)
+DEADLINE_PARTIAL = Counter(
+    "matspot_deadline_partial_total",
+    "Enrichment stages still running when the request deadline expired.",
+    ("stage",),
+)
+
+
+# --- 요청 단위 상태 (DB 쿼리 수, 로그 샘플링 여부) ---
+class _RequestScope:
+    __slots__ = ("db_queries", "sampled")
+
+    def __init__(self, sampled):
+        self.db_queries = 0
+        self.sampled = sampled
+
+
+_request_scope = ContextVar("matspot_request_scope", default=None)
+
+
+@contextmanager
+def request_scope():
+    """한 추천 요청의 지연 시간, DB 쿼리 수, 로그 샘플링 여부를 묶습니다"""
+    scope = _RequestScope(sampled=random.random() < TRACE_SAMPLE_RATE)
+    token = _request_scope.set(scope)
+    try:
+        with STAGE_LATENCY.time("request"):
+            yield scope
+    finally:
+        DB_QUERIES_PER_REQUEST.observe(scope.db_queries)
+        _request_scope.reset(token)
+
+
+async def observe_stage(stage, awaitable):
+    """awaitable 의 실행 시간을 단계별 지연 시간 히스토그램에 기록합니다"""
+    with STAGE_LATENCY.time(stage):
+        return await awaitable
+
+
+def count_db_query(db, amount=1):
+    DB_QUERIES.inc(db, amount=amount)
+    scope = _request_scope.get()
+    if scope is not None:
+        scope.db_queries += amount
+
+
+def trace(event, **fields):
+    """장소별 상세 로그. DEBUG 레벨이고 샘플링된 요청일 때만 JSON 한 줄로 남깁니다"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    scope = _request_scope.get()
+    if scope is not None and not scope.sampled:
+        return
+    logger.debug(json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
@@ -0,0 +1,58 @@
+import sqlite3
+import sys
+
+from normalization import normalized_columns
+
+# --- mapinformation 정규화 컬럼 ---
+# 크롤러가 행을 저장할 때 normalization.py 규칙(별칭 사전 포함)으로 계산한
+# normalized_name, core_name, road_tokens 를 함께 저장하고 인덱스를 둡니다.
+# 추천 백엔드는 요청마다 정규식을 돌리는 대신 이 값들을 같음(=) 비교로 찾습니다.
+# 기존 DB 는 이 스크립트로 컬럼을 추가하고 비어 있는 행을 채웁니다.
+
+NORMALIZED_COLUMNS = ("normalized_name", "core_name", "road_tokens")
+
+NORMALIZED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_mapinformation_normalized_name ON mapinformation (normalized_name)",
+    "CREATE INDEX IF NOT EXISTS ix_mapinformation_core_name ON mapinformation (core_name)",
+    "CREATE INDEX IF NOT EXISTS ix_mapinformation_road_tokens ON mapinformation (road_tokens)",
+]
+
+
+def has_normalized_columns(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(mapinformation)")}
+    return all(column in columns for column in NORMALIZED_COLUMNS)
+
+
+def ensure_normalized_columns(conn, refresh=False):
+    """정규화 컬럼과 인덱스를 만들고 값이 없는 행(refresh 면 모든 행)을 채웁니다. 채운 행 수를 돌려줍니다"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(mapinformation)")}
+    for column in NORMALIZED_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE mapinformation ADD COLUMN {column} TEXT")
+    for statement in NORMALIZED_INDEXES:
+        conn.execute(statement)
+
+    query = "SELECT id, name, address2 FROM mapinformation"
+    if not refresh:
+        query += " WHERE normalized_name IS NULL AND name IS NOT NULL"
+    rows = conn.execute(query).fetchall()
+    conn.executemany(
+        "UPDATE mapinformation SET normalized_name = :normalized_name, core_name = :core_name, "
+        "road_tokens = :road_tokens WHERE id = :id",
+        [{"id": place_id, **normalized_columns(name, address)} for place_id, name, address in rows],
+    )
+    conn.commit()
+    return len(rows)
+
+
+# --- 직접 실행 시 정규화 컬럼 생성/채우기 ---
+# 별칭 사전(place_aliases.json)을 고친 뒤에는 --refresh 로 모든 행을 다시 계산합니다.
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--refresh"]
+    db_path = args[0] if args else "restarant.db"
+    conn = sqlite3.connect(db_path)
+    try:
+        updated = ensure_normalized_columns(conn, refresh="--refresh" in sys.argv)
+        print(f"'{db_path}' 의 정규화 컬럼을 확인했습니다. {updated}개 행을 채웠습니다.")
+    finally:
+        conn.close()
@@ -0,0 +1,323 @@
+import asyncio
+import os
+import re
+import sqlite3
+import string
+import threading
+from typing import Optional
+
+from name_matcher import DEFAULT_THRESHOLD, NameMatcher
+from normalization import extract_address_keywords, extract_core_name, normalize_place_name, normalized_columns, road_tokens
+from place_columns import NORMALIZED_COLUMNS, has_normalized_columns
+from observability import logger, trace
+from place_spatial import distance_m, has_coordinate_columns
+
+# --- mapinformation 메모리 인덱스 ---
+# 요청마다 mapinformation 을 LIKE '%..%' 로 풀 스캔하던 것을
+# 서버 시작 시 한 번 읽어 둔 인덱스의 딕셔너리/집합 연산으로 대체합니다.
+# SQLite LIKE 와 같은 결과를 내도록 ASCII 대소문자만 무시하고,
+# LIMIT 1 결과는 id 가 가장 작은 행(테이블 스캔 순서)을 돌려줍니다.
+
+_ASCII_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_HIT_CACHE_LIMIT = 50000
+
+
+def fold_ascii(text):
+    """SQLite LIKE 처럼 ASCII 대소문자만 소문자로 맞춥니다"""
+    return text.translate(_ASCII_FOLD)
+
+
+def file_signature(path):
+    """DB 파일(WAL 파일 포함)의 변경 여부를 판단하기 위한 서명을 돌려줍니다"""
+    signature = []
+    for file_path in (path, path + "-wal"):
+        try:
+            stat = os.stat(file_path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def like_regex(pattern):
+    """LIKE 와일드카드(%, _)가 들어간 검색어를 정규식으로 바꿉니다"""
+    parts = []
+    for ch in pattern:
+        if ch == '%':
+            parts.append('.*')
+        elif ch == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+class _SubstringIndex:
+    """한 컬럼에 대해 `컬럼 LIKE '%검색어%'` 를 바이그램 역색인으로 계산합니다"""
+
+    def __init__(self, values):
+        self.folded = [fold_ascii(v) if v is not None else None for v in values]
+        self.non_null = frozenset(i for i, v in enumerate(self.folded) if v is not None)
+        self.postings = {}
+        for pos, text in enumerate(self.folded):
+            if text is None:
+                continue
+            for gram in _bigrams(text):
+                self.postings.setdefault(gram, set()).add(pos)
+        self._hits = {}
+
+    def contains(self, text):
+        """검색어를 포함하는 행 번호 집합 (검색어별 결과는 캐시됩니다)"""
+        hits = self._hits.get(text)
+        if hits is None:
+            if len(self._hits) >= _HIT_CACHE_LIMIT:
+                self._hits.clear()
+            hits = self._hits[text] = self._search(fold_ascii(text))
+        return hits
+
+    def _search(self, needle):
+        if '%' in needle or '_' in needle:
+            regex = like_regex(needle)
+            return frozenset(pos for pos in self.non_null if regex.search(self.folded[pos]))
+        if len(needle) < 2:
+            if not needle:
+                return self.non_null
+            return frozenset(pos for pos in self.non_null if needle in self.folded[pos])
+        postings = []
+        for gram in _bigrams(needle):
+            posting = self.postings.get(gram)
+            if not posting:
+                return frozenset()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = self._intersect(postings)
+        return frozenset(pos for pos in candidates if needle in self.folded[pos])
+
+    def _intersect(self, postings):
+        """짧은 순으로 정렬한 포스팅들의 교집합"""
+        return set(postings[0]).intersection(*postings[1:])
+
+
+class PlaceIndex:
+    """mapinformation 전체를 담은 읽기 전용 인덱스.
+
+    행 번호(pos)는 id 오름차순이므로 가장 작은 행 번호가 SQLite 의 LIMIT 1 결과와 같습니다.
+    이름 검색어(정규화 이름, 핵심 이름)와 주소 검색어(도로명 토큰, 건물번호)별
+    결과 집합은 각 컬럼 인덱스에 캐시되어 같은 키는 딕셔너리 조회로 끝납니다.
+    """
+
+    def __init__(self, rows):
+        self.ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.addresses = [row[2] for row in rows]
+        self.reviews = [row[3] for row in rows]
+        # 좌표 컬럼이 없는 DB 라면 모두 None
+        self.latitudes = [_column(row, 4) for row in rows]
+        self.longitudes = [_column(row, 5) for row in rows]
+        self.positions = {place_id: pos for pos, place_id in enumerate(self.ids)}
+
+        # 정규화 컬럼 (크롤러가 저장한 값, 없으면 여기서 계산) 의 같음 비교용 딕셔너리
+        self._by_name_road = {}
+        self._by_core_road = {}
+        for pos, row in enumerate(rows):
+            values = (_column(row, 6), _column(row, 7), _column(row, 8))
+            if values[0] is None:
+                computed = normalized_columns(self.names[pos], self.addresses[pos])
+                values = tuple(computed[column] for column in NORMALIZED_COLUMNS)
+            normalized_name, core_name, tokens = values
+            if not tokens:
+                continue
+            if normalized_name:
+                self._by_name_road.setdefault((normalized_name, tokens), pos)
+            if core_name:
+                self._by_core_road.setdefault((core_name, tokens), pos)
+        self._name_index = _SubstringIndex(self.names)
+        self._address_index = _SubstringIndex(self.addresses)
+        self.name_matcher = NameMatcher(self.names)
+        self._similar_hits = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def name_contains(self, text):
+        return self._name_index.contains(text)
+
+    def address_contains(self, text):
+        if text is None:
+            return frozenset()
+        return self._address_index.contains(text)
+
+    def first(self, name_text, address_text) -> Optional[int]:
+        """`name LIKE %이름% AND address2 LIKE %주소% LIMIT 1` 에 해당하는 행 번호"""
+        names = self.name_contains(name_text)
+        if not names:
+            return None
+        matches = names & self.address_contains(address_text)
+        return min(matches) if matches else None
+
+    def candidates(self, address_text, name_text):
+        """`address2 LIKE %주소% AND name LIKE %이름%` 의 모든 행 번호 (id 순)"""
+        return sorted(self.address_contains(address_text) & self.name_contains(name_text))
+
+    def similar_names(self, name, address_text=None, k=5, threshold=DEFAULT_THRESHOLD):
+        """`address2 LIKE %주소%` 버킷 안에서 이름이 비슷한 (행 번호, 유사도) top-k"""
+        key = (name, address_text, k, threshold)
+        hits = self._similar_hits.get(key)
+        if hits is None:
+            if len(self._similar_hits) >= _HIT_CACHE_LIMIT:
+                self._similar_hits.clear()
+            within = self.address_contains(address_text) if address_text is not None else None
+            hits = self._similar_hits[key] = self.name_matcher.top_k(name, within, k=k, threshold=threshold)
+        return hits
+
+
+    def exact(self, name, address):
+        """정규화 이름(또는 핵심 이름)과 도로명 키가 모두 같은 행 번호, 없으면 None"""
+        tokens = road_tokens(address) if address else None
+        if not tokens:
+            return None
+        row = self._by_name_road.get((normalize_place_name(name), tokens))
+        if row is None:
+            row = self._by_core_road.get((extract_core_name(name), tokens))
+        return row
+
+    def nearby_rows(self, place_ids, latitude, longitude, radius_m):
+        """R*Tree 로 찾은 id 중 실제로 radius_m 안에 있는 행 번호 집합"""
+        rows = set()
+        for place_id in place_ids:
+            pos = self.positions.get(place_id)
+            if pos is None or self.latitudes[pos] is None or self.longitudes[pos] is None:
+                continue
+            if distance_m(latitude, longitude, self.latitudes[pos], self.longitudes[pos]) <= radius_m:
+                rows.add(pos)
+        return frozenset(rows)
+
+
+def _column(row, index):
+    return row[index] if len(row) > index else None
+
+
+def resolve_place_nearby(index, original_name, nearby):
+    """좌표 근처 식당(nearby 행 번호) 중 이름이 가장 비슷한 곳을 고릅니다.
+
+    (행 번호, "proximity") 를 돌려주고, 후보가 없거나 유사도가 낮으면 (None, None) 입니다.
+    """
+    if not nearby:
+        return None, None
+    core_name = extract_core_name(original_name)
+    matches = index.name_matcher.top_k(core_name or original_name, nearby, k=1)
+    if not matches:
+        return None, None
+    row, similarity = matches[0]
+    trace("review_strategy", strategy="proximity", candidates=len(nearby), matched=index.names[row], similarity=round(similarity, 2))
+    return row, "proximity"
+
+
+def resolve_place(index, original_name, cleaned_address):
+    """카카오 장소를 4단계 전략으로 mapinformation 행에 매칭합니다.
+
+    (행 번호, 성공한 전략 번호 1~4 또는 "exact") 를 돌려주고, 모두 실패하면 (None, None) 입니다.
+    """
+    # 정규화 컬럼 같음 비교: 정규화 이름(또는 핵심 이름)과 도로명 키가 같으면 바로 매칭
+    row = index.exact(original_name, cleaned_address)
+    if row is not None:
+        return row, "exact"
+
+    strategy = None
+    # 전략 1: 원본 이름 + 주소로 검색
+    row = index.first(original_name, cleaned_address)
+    if row is not None:
+        strategy = 1
+    
+    # 전략 2: 정규화된 이름 + 주소로 검색
+    if row is None:
+        normalized_name = normalize_place_name(original_name)
+        if normalized_name != original_name:
+            row = index.first(normalized_name, cleaned_address)
+            if row is not None:
+                strategy = 2
+    
+    # 전략 3: 핵심 이름만 + 주소 키워드 매칭
+    if row is None:
+        core_name = extract_core_name(original_name)
+        address_keywords = extract_address_keywords(cleaned_address)
+        
+        if core_name and address_keywords:
+            # 주소 키워드 중 가장 구체적인 것으로 매칭
+            for keyword in address_keywords:
+                if len(keyword) >= 2:  # 너무 짧은 키워드는 제외
+                    row = index.first(core_name, keyword)
+                    if row is not None:
+                        strategy = 3
+                        trace("review_strategy", strategy=3, core_name=core_name, keyword=keyword)
+                        break
+    
+    # 전략 4: 주소 기준 우선 매칭 (이름은 n-gram 유사도)
+    if row is None and cleaned_address:
+        address_keywords = extract_address_keywords(cleaned_address)
+        core_name = extract_core_name(original_name)
+        
+        # 가장 긴 주소 키워드(도로명) 버킷 안에서 이름 n-gram 유사도가 가장 높은 곳을 선택
+        if address_keywords:
+            main_keyword = max(address_keywords, key=len)
+            if len(main_keyword) >= 3:
+                matches = index.similar_names(core_name or original_name, main_keyword, k=1)
+                if matches:
+                    row, similarity = matches[0]
+                    strategy = 4
+                    trace("review_strategy", strategy=4, keyword=main_keyword, matched=index.names[row], similarity=round(similarity, 2))
+
+    return row, strategy
+
+
+def load_place_index(db_path) -> PlaceIndex:
+    """restarant.db 의 mapinformation 을 읽어 인덱스를 만듭니다"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        columns = ["id", "name", "address2", "reviewnum"]
+        columns += ["latitude", "longitude"] if has_coordinate_columns(conn) else ["NULL", "NULL"]
+        columns += list(NORMALIZED_COLUMNS) if has_normalized_columns(conn) else ["NULL"] * len(NORMALIZED_COLUMNS)
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM mapinformation ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    return PlaceIndex(rows)
+
+
+class SnapshotHolder:
+    """DB 파일이 바뀌면 loader 로 메모리 스냅샷을 다시 만들어 주는 보관소"""
+
+    def __init__(self, db_path, loader, label):
+        self.db_path = db_path
+        self._loader = loader
+        self._label = label
+        self._snapshot = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return self._snapshot is None or self._signature != file_signature(self.db_path)
+
+    def refresh(self):
+        with self._lock:
+            signature = file_signature(self.db_path)
+            if self._snapshot is None or signature != self._signature:
+                self._snapshot = self._loader(self.db_path)
+                self._signature = signature
+                logger.info(f"🗂️ {self._label} 로드 완료 ({len(self._snapshot)}개)")
+            return self._snapshot
+
+    async def current(self):
+        if self.is_stale():
+            return await asyncio.to_thread(self.refresh)
+        return self._snapshot
+
+
+class PlaceIndexHolder(SnapshotHolder):
+    """restarant.db 가 바뀌면 장소 인덱스를 다시 읽어 들이는 보관소"""
+
+    def __init__(self, db_path):
+        super().__init__(db_path, load_place_index, "장소 인덱스")
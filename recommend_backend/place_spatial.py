@@ -0,0 +1,91 @@
+import math
+import sqlite3
+import sys
+
+# --- mapinformation 좌표 R*Tree 공간 인덱스 ---
+# 네이버 크롤러(crawler.py)가 저장한 위도/경도로 R*Tree 를 만들어 두고,
+# 카카오 장소 좌표(x=경도, y=위도) 주변 수십 미터 안의 식당만 후보로 꺼냅니다.
+# 트리거로 원본 테이블과 동기화되므로 크롤러는 기존처럼 INSERT 만 하면 됩니다.
+
+RTREE_TABLE = "mapinformation_rtree"
+
+RTREE_EXISTS_QUERY = f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{RTREE_TABLE}'"
+
+COORDINATE_COLUMNS = ("latitude", "longitude")
+
+RTREE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    f"""CREATE TRIGGER IF NOT EXISTS mapinformation_rtree_ai AFTER INSERT ON mapinformation
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS mapinformation_rtree_ad AFTER DELETE ON mapinformation BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS mapinformation_rtree_au AFTER UPDATE OF latitude, longitude ON mapinformation BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        INSERT INTO {RTREE_TABLE}
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END""",
+]
+
+NEARBY_QUERY = (
+    f"SELECT id FROM {RTREE_TABLE} "
+    "WHERE min_lat <= ? AND max_lat >= ? AND min_lng <= ? AND max_lng >= ?"
+)
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def has_coordinate_columns(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(mapinformation)")}
+    return all(column in columns for column in COORDINATE_COLUMNS)
+
+
+def ensure_spatial_index(conn):
+    """위도/경도 컬럼, R*Tree, 동기화 트리거를 만들고, 처음 만든 경우 기존 좌표를 색인합니다"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(mapinformation)")}
+    for column in COORDINATE_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE mapinformation ADD COLUMN {column} FLOAT")
+    created = conn.execute(RTREE_EXISTS_QUERY).fetchone() is None
+    for statement in RTREE_SCHEMA:
+        conn.execute(statement)
+    if created:
+        conn.execute(
+            f"INSERT INTO {RTREE_TABLE} SELECT id, latitude, latitude, longitude, longitude "
+            "FROM mapinformation WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        )
+    conn.commit()
+    return created
+
+
+def bounding_box(latitude, longitude, radius_m):
+    """NEARBY_QUERY 파라미터 (반경 radius_m 을 감싸는 위도/경도 사각형)"""
+    lat_delta = radius_m / METERS_PER_DEGREE_LAT
+    lng_delta = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    return (latitude + lat_delta, latitude - lat_delta, longitude + lng_delta, longitude - lng_delta)
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """두 좌표 사이의 거리(미터, 하버사인)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+# --- 직접 실행 시 좌표 컬럼과 R*Tree 생성 ---
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "restarant.db"
+    conn = sqlite3.connect(db_path)
+    try:
+        if ensure_spatial_index(conn):
+            print(f"'{db_path}' 에 좌표 R*Tree 를 새로 만들고 기존 좌표를 색인했습니다.")
+        else:
+            print(f"'{db_path}' 의 좌표 R*Tree 와 트리거가 이미 있습니다.")
+    finally:
+        conn.close()
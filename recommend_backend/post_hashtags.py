@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import sys
+import unicodedata
+
+# --- 게시물 해시태그 정규화 테이블 ---
+# instagram_posts.hashtags_representation 은 '["#태그1", "#태그2"]' 모양의 JSON 문자열이라
+# LIKE '%#키워드%' 로 찾으면 전체 테이블을 훑고, '#경산' 이 '#경산맛집' 에도 걸리는 접두사 매칭이 생깁니다.
+# post_hashtags 는 게시물마다 정규화한 태그를 한 행씩 두고 tag_normalized 에 인덱스를 걸어
+# 태그 하나를 인덱스 탐색(tag_normalized = ?)으로 찾습니다.
+# prototype.py 가 게시물을 저장할 때 함께 넣고, 기존 게시물은 아래 backfill_hashtags 로 채웁니다.
+
+HASHTAG_TABLE = "post_hashtags"
+
+HASHTAG_EXISTS_QUERY = f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{HASHTAG_TABLE}'"
+HASHTAG_POSTS_QUERY = f"SELECT post_id FROM {HASHTAG_TABLE} WHERE tag_normalized = ?"
+
+# model_proto.PostHashtag 와 같은 스키마 (어느 쪽이 먼저 만들어도 같은 테이블)
+HASHTAG_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS {HASHTAG_TABLE} (
+        post_id INTEGER NOT NULL,
+        tag_normalized VARCHAR(255) NOT NULL,
+        PRIMARY KEY (post_id, tag_normalized),
+        FOREIGN KEY (post_id) REFERENCES instagram_posts (id)
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{HASHTAG_TABLE}_tag_normalized ON {HASHTAG_TABLE} (tag_normalized)",
+]
+
+
+def normalize_hashtag(tag):
+    """'#경산맛집 ' / '경산맛집' → '경산맛집' (앞의 #, 공백 제거, NFC, 소문자), 빈 태그면 None"""
+    if not tag:
+        return None
+    normalized = unicodedata.normalize("NFC", tag).strip().lstrip("#").strip().lower()
+    return normalized or None
+
+
+def parse_hashtags(representation):
+    """hashtags_representation(JSON 목록 문자열)의 정규화 태그 집합. 형식이 다르면 '#' 로 나눠 읽습니다"""
+    if not representation:
+        return set()
+    try:
+        tags = json.loads(representation)
+    except ValueError:
+        tags = None
+    if not isinstance(tags, list):
+        tags = str(representation).split("#")
+    return {tag for tag in (normalize_hashtag(str(item)) for item in tags) if tag}
+
+
+def ensure_hashtag_table(conn):
+    for statement in HASHTAG_SCHEMA:
+        conn.execute(statement)
+
+
+def backfill_hashtags(conn, after_post_id=0):
+    """post_id 가 after_post_id 보다 큰 게시물의 태그를 채웁니다 (이미 있는 행은 건너뜀). 추가한 행 수를 돌려줍니다"""
+    ensure_hashtag_table(conn)
+    rows = conn.execute(
+        "SELECT id, hashtags_representation FROM instagram_posts "
+        "WHERE id > ? AND hashtags_representation IS NOT NULL ORDER BY id",
+        (after_post_id,),
+    ).fetchall()
+    before = conn.total_changes
+    conn.executemany(
+        f"INSERT OR IGNORE INTO {HASHTAG_TABLE} (post_id, tag_normalized) VALUES (?, ?)",
+        [(post_id, tag) for post_id, representation in rows for tag in sorted(parse_hashtags(representation))],
+    )
+    added = conn.total_changes - before
+    conn.commit()
+    return added
+
+
+# --- 직접 실행 시 해시태그 테이블 생성/채우기 (finally.db, instagram_crawler_data.db 등 여러 개 가능) ---
+if __name__ == "__main__":
+    db_paths = sys.argv[1:] or ["finally.db"]
+    for db_path in db_paths:
+        conn = sqlite3.connect(db_path)
+        try:
+            added = backfill_hashtags(conn)
+            total = conn.execute(f"SELECT COUNT(*) FROM {HASHTAG_TABLE}").fetchone()[0]
+            print(f"'{db_path}' 의 {HASHTAG_TABLE} 에 {added}개 행을 추가했습니다. (전체 {total}개)")
+        finally:
+            conn.close()
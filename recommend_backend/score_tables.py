@@ -0,0 +1,187 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import Counter
+from functools import lru_cache
+
+from link_mentions import load_catalog_keywords
+from mention_automaton import count_mentions, load_post_snapshot
+
+# --- 랭킹 점수 전역 정규화 표 ---
+# 요청 안의 최댓값으로 나누는 대신, 전체 식당 분포에서의 백분위(CDF)로 리뷰 수/언급 수를 0~1 로 바꿉니다.
+# 값은 log1p 로 눌러 LOG_RESOLUTION 단위의 버킷으로 나누고, 버킷마다 "그 이하인 식당 비율"을 미리 계산해 두므로
+# 서빙에서는 장소마다 배열 한 번 조회로 끝나고 카카오가 어떤 45개를 돌려주든 같은 값이 나옵니다.
+# 리뷰 수는 (지역, 업종) → 업종 → 전체 순서로 표본이 MIN_GROUP_SIZE 이상인 표를 쓰고, 언급 수는 전체 표 하나입니다.
+# 크롤러(crawler.py, prototype.py)가 크롤링을 마치면 다시 만듭니다.
+
+LOG_RESOLUTION = 16  # log1p 1 단위당 버킷 수
+MIN_GROUP_SIZE = 30
+ANY = "*"
+
+# 네이버(mapinformation.category)와 카카오(category_name) 업종을 같은 묶음으로 맞추는 키워드 (앞에서부터 검사)
+CATEGORY_GROUPS = [
+    ("카페", ("카페", "커피", "다방", "디저트", "베이커리", "제과", "케이크", "아이스크림", "간식")),
+    ("치킨", ("치킨", "닭강정")),
+    ("주점", ("주점", "호프", "맥주", "술집", "포장마차", "이자카야")),
+    ("고기", ("고기", "육류", "곱창", "막창", "족발", "보쌈", "갈비", "삼겹", "오리")),
+    ("분식", ("분식", "김밥", "떡볶이", "국수", "만두", "도시락")),
+    ("중식", ("중식", "중국")),
+    ("일식", ("일식", "생선회", "횟집", "초밥", "돈가스", "돈까스", "우동")),
+    ("양식", ("양식", "피자", "햄버거", "패스트푸드", "파스타", "스테이크")),
+    ("한식", ("한식", "국밥", "찜닭", "백반", "찌개", "해장국", "냉면", "탕", "죽", "순대", "두부", "한정식")),
+]
+DEFAULT_CATEGORY = "기타"
+
+
+@lru_cache(maxsize=1024)
+def category_group(category):
+    """업종 문자열('카페,디저트', '음식점 > 카페 > 커피전문점')의 묶음 이름"""
+    if category:
+        for group, keywords in CATEGORY_GROUPS:
+            if any(keyword in category for keyword in keywords):
+                return group
+    return DEFAULT_CATEGORY
+
+
+def area_of_address(address):
+    """지번 주소('경북 경산시 하양읍 금락리 123-4')에서 mapinformation.area 모양의 지역('하양읍 금락리')"""
+    tokens = (address or "").split()[1:]  # 시/도
+    while tokens and tokens[0][-1:] in ("시", "군", "구"):
+        tokens = tokens[1:]
+    area = []
+    for token in tokens:
+        if any(ch.isdigit() for ch in token):
+            break
+        area.append(token)
+    return " ".join(area)
+
+
+def group_key(area, category):
+    return f"{area}|{category}"
+
+
+def _bucket(value):
+    return int(math.log1p(max(value, 0)) * LOG_RESOLUTION)
+
+
+def build_cdf(values):
+    """버킷 b 의 값 = 0 보다 큰 표본 중 버킷이 b 이하인 비율 (0 은 항상 0, 가장 큰 버킷 이상이면 1).
+
+    언급 수처럼 대부분이 0 인 분포에서도 언급 1회와 100회가 구분되도록 0 인 표본은 빼고 계산합니다.
+    """
+    counts = Counter(_bucket(value) for value in values if value > 0)
+    total = sum(counts.values())
+    if not total:
+        return [0.0]
+    table, at_or_below = [0.0], 0
+    for bucket in range(1, max(counts) + 1):
+        at_or_below += counts.get(bucket, 0)
+        table.append(round(at_or_below / total, 4))
+    return table
+
+
+def _lookup(table, value):
+    bucket = _bucket(value)
+    if not bucket:
+        return 0.0
+    return table[bucket] if bucket < len(table) else 1.0
+
+
+class ScoreTables:
+    """score_tables.json 을 읽은 정규화 표"""
+
+    def __init__(self, data):
+        self.metadata = data["metadata"]
+        self._reviews = data["reviews"]
+        self._mentions = data.get("mentions")
+
+    def __len__(self):
+        return len(self._reviews) + (1 if self._mentions else 0)
+
+    @property
+    def has_mentions(self):
+        return bool(self._mentions)
+
+    def review_percentile(self, count, area, category):
+        table = (self._reviews.get(group_key(area, category))
+                 or self._reviews.get(group_key(ANY, category))
+                 or self._reviews[group_key(ANY, ANY)])
+        return _lookup(table, count)
+
+    def mention_percentile(self, count):
+        return _lookup(self._mentions, count)
+
+
+def load_score_tables(path) -> ScoreTables:
+    with open(path, encoding="utf-8") as f:
+        return ScoreTables(json.load(f))
+
+
+def _review_number(raw):
+    text = str(raw).replace(",", "") if raw is not None else ""
+    return int(text) if text.isdigit() else None
+
+
+def build_score_tables(review_db_path, insta_db_path, output_path):
+    """restarant.db 리뷰 수와 finally.db 언급 수로 정규화 표를 만들어 output_path 에 원자적으로 씁니다"""
+    started = time.perf_counter()
+    conn = sqlite3.connect(f"file:{review_db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT area, category, reviewnum FROM mapinformation").fetchall()
+    finally:
+        conn.close()
+
+    samples = {}
+    for area, category, raw in rows:
+        count = _review_number(raw)
+        if count is None:
+            continue
+        group = category_group(category)
+        for key in (group_key(ANY, ANY), group_key(ANY, group), group_key(area or "", group)):
+            samples.setdefault(key, []).append(count)
+    reviews = {
+        key: build_cdf(values) for key, values in samples.items()
+        if len(values) >= MIN_GROUP_SIZE or key == group_key(ANY, ANY)
+    }
+
+    mentions = None
+    if insta_db_path and os.path.exists(insta_db_path):
+        # 모든 식당의 언급 수 (서빙 엔진들과 같은 규칙: 캡션 부분 일치 + 해시태그 정규화 태그 일치, 언급 없는 식당은 0)
+        place_keywords = load_catalog_keywords(review_db_path)
+        counts = count_mentions(load_post_snapshot(insta_db_path), place_keywords)
+        mentions = build_cdf([counts.get(place_id, 0) for place_id in place_keywords])
+
+    data = {
+        "metadata": {
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "log_resolution": LOG_RESOLUTION,
+            "min_group_size": MIN_GROUP_SIZE,
+            "review_samples": len(samples.get(group_key(ANY, ANY), [])),
+            "review_groups": len(reviews),
+            "mention_samples": len(place_keywords) if mentions is not None else 0,
+        },
+        "reviews": reviews,
+        "mentions": mentions,
+    }
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, output_path)
+    data["metadata"]["build_seconds"] = round(time.perf_counter() - started, 2)
+    return data["metadata"]
+
+
+# --- 직접 실행 시 정규화 표 생성 ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="랭킹 점수 전역 정규화(CDF) 표 생성")
+    parser.add_argument("--review-db", default="restarant.db")
+    parser.add_argument("--insta-db", default="finally.db")
+    parser.add_argument("--output", default="score_tables.json")
+    args = parser.parse_args()
+    metadata = build_score_tables(args.review_db, args.insta_db, args.output)
+    print(f"'{args.output}' 에 정규화 표를 만들었습니다. "
+          f"(리뷰 표 {metadata['review_groups']}개, 리뷰 표본 {metadata['review_samples']}개, "
+          f"언급 표본 {metadata['mention_samples']}개, {metadata['build_seconds']}초)")
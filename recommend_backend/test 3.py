@@ -1,11 +1,41 @@
 import asyncio
-import re
+import json
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import List, Optional
 
-import aiosqlite
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from admission import AdmissionLimiter, AdmissionRejected, SingleFlight, request_key
+from batch_match import build_batch_mention_query, build_nearby_batch_query
+from db_pool import ReadOnlyPool
+from enrichment_cache import EnrichmentCache, place_cache_key
+from insta_fts import FTS_EXISTS_QUERY, build_mention_count_query
+from link_mentions import LINK_EXISTS_QUERY
+from match_artifact import ArtifactHolder
+from mention_automaton import count_mentions, load_post_snapshot
+from observability import (DEADLINE_PARTIAL, STAGE_LATENCY, STRATEGY_MATCHES, Gauge, count_db_query, logger,
+                           observe_stage, render_metrics, request_scope, trace)
+from normalization import build_insta_keywords, clean_road_address
+from place_index import PlaceIndexHolder, SnapshotHolder, resolve_place, resolve_place_nearby
+from place_spatial import RTREE_EXISTS_QUERY, bounding_box
+from post_hashtags import HASHTAG_EXISTS_QUERY, HASHTAG_POSTS_QUERY, normalize_hashtag
+from score_tables import area_of_address, category_group, load_score_tables
+from trending import (TRENDING_AS_OF_QUERY, TRENDING_EXISTS_QUERY, TrendCounts, WINDOWS, adjust_expired,
+                      build_expired_query, build_trending_query, today_number)
+
+# --- 빠른 JSON 인코더 (선택) ---
+try:
+    import orjson
+    ORJSON_ENABLED = True
+except ImportError:
+    orjson = None
+    ORJSON_ENABLED = False
 
 # --- 1. Pydantic 모델 정의 및 FastAPI 앱 설정 ---
 class Place(BaseModel):
@@ -19,7 +49,28 @@ class SearchRequest(BaseModel):
 class RankedPlace(Place):
     review_count: int; instagram_mentions: int; score: float
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 수명 동안 읽기 전용 연결 풀과 메모리 인덱스를 관리합니다"""
+    warm_up_task = None
+    if await asyncio.to_thread(match_artifact_holder.load):
+        # 매칭은 아티팩트(mmap)로 바로 서빙하므로 메모리 인덱스는 만들지 않고, 나머지 사본만 백그라운드에서 읽습니다
+        warm_up_task = asyncio.create_task(warm_up_snapshots(place_index=False))
+    else:
+        await warm_up_snapshots()
+    for pool in (review_pool, insta_pool):
+        try:
+            await pool.open()
+        except Exception as e:
+            logger.error(f"❌ DB 연결 풀 열기 실패 ({pool.db_path}): {e}")
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    for pool in (review_pool, insta_pool):
+        await pool.close()
+    match_artifact_holder.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS 미들웨어 추가 ---
 origins = ["*"]
@@ -31,150 +82,219 @@ app.add_middleware(
 INSTA_DB_PATH = "finally.db"
 REVIEW_DB_PATH = "restarant.db"
 
+# 인스타 언급 수 조회 엔진: "like"(기본, 키워드별 LIKE 검색), "fts"(FTS5 트라이그램 인덱스),
+# "automaton"(메모리 사본을 요청당 한 번 훑는 아호-코라식 검색),
+# "linked"(link_mentions.py 로 미리 만든 게시물-식당 연결 테이블 집계)
+MENTION_ENGINE = os.environ.get("MATSPOT_MENTION_ENGINE", "like")
+
+# 리뷰 매칭 방식: "text"(기본, 이름/주소 4단계 전략), "proximity"(좌표 반경 안의 식당 이름을 먼저 비교하고
+# 못 찾으면 4단계 전략으로 대체, place_spatial.py 로 만든 R*Tree 필요)
+REVIEW_MATCH_MODE = os.environ.get("MATSPOT_REVIEW_MATCH_MODE", "text")
+PROXIMITY_RADIUS_M = float(os.environ.get("MATSPOT_PROXIMITY_RADIUS_M", "50"))
+
+# 로그 레벨 (DEBUG 로 두면 MATSPOT_TRACE_SAMPLE_RATE 비율의 요청에 대해 장소별 상세 로그를 남김)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("matspot").setLevel(os.environ.get("MATSPOT_LOG_LEVEL", "INFO"))
+
+# match_artifact.py 로 미리 빌드한 매칭 인덱스 (lifespan 에서 mmap, 없거나 읽을 수 없으면 메모리 인덱스 사용).
+# 원본 DB 가 바뀌면 기존 아티팩트로 계속 서빙하면서 백그라운드에서 다시 빌드합니다 (MATSPOT_ARTIFACT_REBUILD_INTERVAL 초에 한 번까지)
+MATCH_ARTIFACT_PATH = os.environ.get("MATSPOT_MATCH_ARTIFACT", "match_index.bin")
+ARTIFACT_REBUILD_INTERVAL = float(os.environ.get("MATSPOT_ARTIFACT_REBUILD_INTERVAL", "60"))
+match_artifact_holder = ArtifactHolder(MATCH_ARTIFACT_PATH, {"review": REVIEW_DB_PATH, "insta": INSTA_DB_PATH},
+                                       ARTIFACT_REBUILD_INTERVAL)
+
+# 장소별 리뷰 수/언급 수 캐시 (TTL·LRU, 매칭 실패도 저장, DB 파일이나 아티팩트가 바뀌면 비움)
+CACHE_MAX_ENTRIES = int(os.environ.get("MATSPOT_CACHE_SIZE", "5000"))
+CACHE_TTL = float(os.environ.get("MATSPOT_CACHE_TTL", "600"))
+CACHE_NEGATIVE_TTL = float(os.environ.get("MATSPOT_CACHE_NEGATIVE_TTL", "120"))
+review_cache = EnrichmentCache("review", [REVIEW_DB_PATH, MATCH_ARTIFACT_PATH], CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_NEGATIVE_TTL)
+mention_cache = EnrichmentCache("mention", [INSTA_DB_PATH, REVIEW_DB_PATH, MATCH_ARTIFACT_PATH], CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_NEGATIVE_TTL)
+Gauge("matspot_enrichment_cache_events", "Enrichment cache counters (hits, negative_hits, misses, evictions, invalidations, size).",
+      ("cache", "event"),
+      lambda: {(cache.name, event): value
+               for cache in (review_cache, mention_cache)
+               for event, value in cache.stats().items() if event not in ("name", "max_entries")})
+
+# mapinformation 메모리 인덱스 (restarant.db 가 바뀌면 자동으로 다시 읽음)
+place_index_holder = PlaceIndexHolder(REVIEW_DB_PATH)
+# instagram_posts 메모리 사본 (automaton 엔진용, finally.db 가 바뀌면 다시 읽음)
+insta_post_holder = SnapshotHolder(INSTA_DB_PATH, load_post_snapshot, "인스타 게시물 사본")
+
+# score_tables.py 로 만든 리뷰 수/언급 수 전역 정규화(CDF) 표 (파일이 바뀌면 다시 읽음, 없으면 요청 안 최댓값으로 정규화)
+SCORE_TABLES_PATH = os.environ.get("MATSPOT_SCORE_TABLES", "score_tables.json")
+score_tables_holder = SnapshotHolder(SCORE_TABLES_PATH, load_score_tables, "점수 정규화 표")
+
+# 읽기 전용 연결 풀 (lifespan 에서 열고 닫음)
+DB_POOL_SIZE = int(os.environ.get("MATSPOT_DB_POOL_SIZE", "4"))
+review_pool = ReadOnlyPool(REVIEW_DB_PATH, DB_POOL_SIZE)
+insta_pool = ReadOnlyPool(INSTA_DB_PATH, DB_POOL_SIZE)
+
+# 동시 처리 제한: 최대 MATSPOT_MAX_CONCURRENT 개 요청을 동시에 계산하고 (0 이면 제한 없음),
+# MATSPOT_QUEUE_TIMEOUT 초 안에 자리를 얻지 못한 요청은 바로 503 으로 돌려보냅니다.
+# MATSPOT_REQUEST_DEADLINE 초가 지나면 끝난 보강 결과만으로 랭킹합니다 (0 이면 끝까지 기다림).
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("MATSPOT_MAX_CONCURRENT", "8"))
+QUEUE_TIMEOUT = float(os.environ.get("MATSPOT_QUEUE_TIMEOUT", "0.5"))
+REQUEST_DEADLINE = float(os.environ.get("MATSPOT_REQUEST_DEADLINE", "3"))
+admission_limiter = AdmissionLimiter(MAX_CONCURRENT_REQUESTS, QUEUE_TIMEOUT)
+recommend_flight = SingleFlight()
+# 스트리밍 추천(/recommend/stream)은 장소를 이 개수씩 나눠 보강하고, 묶음이 끝날 때마다 갱신된 랭킹을 보냅니다
+STREAM_BATCH_SIZE = max(int(os.environ.get("MATSPOT_STREAM_BATCH_SIZE", "15")), 1)
+Gauge("matspot_admission", "Admission control state (active, waiting, rejected, coalesced).", ("event",),
+      lambda: {("active",): admission_limiter.active, ("waiting",): admission_limiter.waiting,
+               ("rejected",): admission_limiter.rejected, ("coalesced",): recommend_flight.coalesced})
+
+async def warm_up_snapshots(place_index=True):
+    """서버 시작 시 장소 인덱스(place_index 가 True 일 때)와 점수 표, 인스타 게시물 사본을 미리 읽어 둡니다"""
+    if place_index:
+        try:
+            await place_index_holder.current()
+        except Exception as e:
+            logger.error(f"❌ 장소 인덱스 로드 실패: {e}")
+    await current_score_tables()
+    if MENTION_ENGINE in ("automaton", "linked"):
+        try:
+            await insta_post_holder.current()
+        except Exception as e:
+            logger.error(f"❌ 인스타 게시물 사본 로드 실패: {e}")
+
 # --- 2. DB 조회 함수들 (최종 안정화 버전) ---
+async def current_place_index():
+    """매칭에 쓸 장소 인덱스: 아티팩트(mmap)가 열려 있으면 그것을, 아니면 메모리 인덱스"""
+    artifact = await match_artifact_holder.current("review")
+    if artifact is not None:
+        return artifact
+    return await place_index_holder.current()
+
+async def current_score_tables():
+    """전역 정규화 표, 파일이 없거나 읽지 못하면 None"""
+    if not os.path.exists(SCORE_TABLES_PATH):
+        return None
+    try:
+        return await score_tables_holder.current()
+    except Exception as e:
+        logger.error(f"❌ 점수 정규화 표 로드 실패: {e}")
+        return None
+
+async def fetch_nearby_rows(index, places: List[Place]) -> dict:
+    """카카오 좌표(x=경도, y=위도) 반경 PROXIMITY_RADIUS_M 안의 식당 행 번호를 R*Tree 로 찾습니다.
+    요청의 모든 장소 경계 상자를 CTE 로 묶어 한 번의 조인으로 조회합니다."""
+    nearby_map = {}
+    coordinates = {}
+    for place in places:
+        try:
+            coordinates[place.id] = (float(place.y), float(place.x))
+        except ValueError:
+            continue
+    if not coordinates:
+        return nearby_map
+
+    async with review_pool.connection() as db:
+        cursor = await db.execute(RTREE_EXISTS_QUERY)
+        count_db_query("review")
+        if not await cursor.fetchone():
+            logger.warning("⚠️ 좌표 R*Tree 가 없어 텍스트 매칭만 사용합니다 (python place_spatial.py 로 생성)")
+            return nearby_map
+        keys = list(coordinates)
+        boxes = {i: bounding_box(*coordinates[kakao_id], PROXIMITY_RADIUS_M) for i, kakao_id in enumerate(keys)}
+        cursor = await db.execute(*build_nearby_batch_query(boxes))
+        count_db_query("review")
+        found = {}
+        for key, place_id in await cursor.fetchall():
+            found.setdefault(key, []).append(place_id)
+
+    for i, kakao_id in enumerate(keys):
+        latitude, longitude = coordinates[kakao_id]
+        nearby_map[kakao_id] = index.nearby_rows(found.get(i, ()), latitude, longitude, PROXIMITY_RADIUS_M)
+    return nearby_map
+
 async def fetch_review_counts_from_db(places: List[Place]) -> dict:
     """리뷰 데이터베이스에서 리뷰 수를 조회합니다. (개선된 매칭 전략)"""
-    print(f"🔍 리뷰 DB 조회 시작 (장소 개수: {len(places)})")
+    logger.info(f"🔍 리뷰 DB 조회 시작 (장소 개수: {len(places)})")
     review_map = {}
     if not places: return review_map
     
-    TABLE_NAME, NAME_COL, ADDRESS_COL, REVIEW_COL = "mapinformation", "name", "address2", "reviewnum"
-    
-    def normalize_place_name(name):
-        """장소명을 정규화합니다"""
-        # 다양한 변형 처리
-        normalized = name
-        normalized = normalized.replace("영대점", "영남대점")
-        normalized = normalized.replace("경산영대", "경산영남대")
-        normalized = normalized.replace("영남대학교", "영남대")
-        return normalized
-    
-    def extract_core_name(name):
-        """핵심 매장명만 추출합니다 (지점명 제거)"""
-        # 지점명 패턴들 제거
-        core = re.sub(r'\s*(영대점|영남대점|경산점|본점|신대점)\s*$', '', name)
-        core = re.sub(r'\s*경산\s*', '', core)  # 경산 제거
-        return core.strip()
-    
-    def extract_address_keywords(address):
-        """주소에서 핵심 키워드들을 추출합니다"""
-        if not address:
-            return []
-        # 주요 도로명, 건물명 등 추출
-        keywords = []
-        # 도로명 추출 (예: "청운로", "대학로59길")
-        road_pattern = r'([가-힣]+(?:로|길)\d*[가-힣]*)'
-        roads = re.findall(road_pattern, address)
-        keywords.extend(roads)
-        
-        # 건물번호 추출 (예: "12-6", "280")
-        number_pattern = r'(\d+(?:-\d+)?)'
-        numbers = re.findall(number_pattern, address)
-        keywords.extend(numbers)
-        
-        return keywords
-    
     try:
-        async with aiosqlite.connect(REVIEW_DB_PATH) as db:
-            for place in places:
-                cleaned_address = place.road_address_name
-                if cleaned_address: 
-                    cleaned_address = re.sub(r'\s+[A-Za-z0-9가-힣]+층$', '', cleaned_address).strip()
-                
-                original_name = place.place_name
-                print(f"  📋 검색: '{original_name}' + '{cleaned_address}'")
-                
-                # 전략 1: 원본 이름 + 주소로 검색
-                query = f"SELECT {REVIEW_COL} FROM {TABLE_NAME} WHERE {NAME_COL} LIKE ? AND {ADDRESS_COL} LIKE ? LIMIT 1"
-                params = (f"%{original_name}%", f"%{cleaned_address}%")
-                cursor = await db.execute(query, params)
-                result = await cursor.fetchone()
-                
-                # 전략 2: 정규화된 이름 + 주소로 검색
-                if not result:
-                    normalized_name = normalize_place_name(original_name)
-                    if normalized_name != original_name:
-                        print(f"    🔄 정규화된 이름: '{normalized_name}'")
-                        params = (f"%{normalized_name}%", f"%{cleaned_address}%")
-                        cursor = await db.execute(query, params)
-                        result = await cursor.fetchone()
-                
-                # 전략 3: 핵심 이름만 + 주소 키워드 매칭
-                if not result:
-                    core_name = extract_core_name(original_name)
-                    address_keywords = extract_address_keywords(cleaned_address)
-                    
-                    if core_name and address_keywords:
-                        print(f"    🔄 핵심 매칭: '{core_name}' + 주소키워드 {address_keywords}")
-                        
-                        # 주소 키워드 중 가장 구체적인 것으로 매칭
-                        for keyword in address_keywords:
-                            if len(keyword) >= 2:  # 너무 짧은 키워드는 제외
-                                query = f"SELECT {REVIEW_COL} FROM {TABLE_NAME} WHERE {NAME_COL} LIKE ? AND {ADDRESS_COL} LIKE ? LIMIT 1"
-                                params = (f"%{core_name}%", f"%{keyword}%")
-                                cursor = await db.execute(query, params)
-                                result = await cursor.fetchone()
-                                if result:
-                                    print(f"      ✅ 키워드 '{keyword}'로 매칭됨")
-                                    break
-                
-                # 전략 4: 주소 기준 우선 매칭 (이름은 부분 매칭)
-                if not result and cleaned_address:
-                    address_keywords = extract_address_keywords(cleaned_address)
-                    core_name = extract_core_name(original_name)
-                    
-                    # 가장 긴 주소 키워드로 먼저 매칭 시도
-                    if address_keywords:
-                        main_keyword = max(address_keywords, key=len)
-                        if len(main_keyword) >= 3:
-                            print(f"    🔄 주소 우선 매칭: 주소 '{main_keyword}' + 이름 부분매칭")
-                            
-                            # 주소가 정확히 매칭되는 곳에서 이름 유사도 검사
-                            query = f"SELECT {NAME_COL}, {REVIEW_COL} FROM {TABLE_NAME} WHERE {ADDRESS_COL} LIKE ? AND {NAME_COL} LIKE ?"
-                            params = (f"%{main_keyword}%", f"%{core_name[:3]}%")  # 이름 앞 3글자로 필터링
-                            cursor = await db.execute(query, params)
-                            candidates = await cursor.fetchall()
-                            
-                            if candidates:
-                                # 가장 유사한 이름 선택
-                                best_match = None
-                                best_score = 0
-                                
-                                for candidate_name, review_count in candidates:
-                                    # 간단한 유사도 계산 (공통 글자 수 / 전체 글자 수)
-                                    common_chars = len(set(core_name) & set(candidate_name))
-                                    similarity = common_chars / max(len(core_name), len(candidate_name))
-                                    
-                                    if similarity > best_score:
-                                        best_score = similarity
-                                        best_match = (candidate_name, review_count)
-                                
-                                if best_match and best_score > 0.3:  # 30% 이상 유사하면 매칭
-                                    result = (best_match[1],)
-                                    print(f"      ✅ 주소매칭 '{best_match[0]}' (유사도: {best_score:.2f})")
+        review_cache.validate()
+        pending = []
+        for place in places:
+            # 캐시(매칭 실패 포함)에 있으면 4단계 전략을 건너뜁니다
+            hit, cached_count = review_cache.lookup(place_cache_key(place))
+            if hit:
+                if cached_count is not None:
+                    review_map[place.id] = cached_count
+            else:
+                pending.append(place)
+
+        index = await current_place_index() if pending else None
+        nearby_map = {}
+        if REVIEW_MATCH_MODE == "proximity" and pending:
+            nearby_map = await fetch_nearby_rows(index, pending)
+
+        for place in pending:
+            cache_key = place_cache_key(place)
+            cleaned_address = clean_road_address(place.road_address_name)
+            
+            original_name = place.place_name
+            trace("review_lookup", place=original_name, address=cleaned_address)
+            
+            # proximity 모드면 좌표 반경 안의 식당 이름부터 비교합니다
+            row, strategy = resolve_place_nearby(index, original_name, nearby_map.get(place.id))
+            if row is None:
+                # 4단계 전략(원본 이름 → 정규화 이름 → 핵심 이름+주소 키워드 → 주소 우선 유사도)으로 매칭
+                row, strategy = resolve_place(index, original_name, cleaned_address)
+            result = (index.reviews[row],) if row is not None else None
+            STRATEGY_MATCHES.inc(str(strategy) if strategy else "none")
+
+            # 결과 처리
+            if result and result[0] is not None:
+                try:
+                    review_count = int(result[0]) if str(result[0]).isdigit() else 0
+                    review_map[place.id] = review_count
+                    trace("review_match", place=original_name, strategy=strategy, review_count=review_count)
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"❌ 리뷰수 변환 실패: {result[0]} (오류: {e})")
+                    review_map[place.id] = 0
+            else:
+                trace("review_match", place=original_name, strategy=None)
+            review_cache.store(cache_key, review_map.get(place.id))
                 
-                # 결과 처리
-                if result and result[0] is not None:
-                    try:
-                        review_count = int(result[0]) if str(result[0]).isdigit() else 0
-                        review_map[place.id] = review_count
-                        print(f"    ✅ 최종 매칭: {review_count}개 리뷰")
-                    except (ValueError, TypeError) as e:
-                        print(f"    ❌ 리뷰수 변환 실패: {result[0]} (오류: {e})")
-                        review_map[place.id] = 0
-                else:
-                    print(f"    ❌ 모든 전략 실패")
-                    
-        print(f"🔍 리뷰 DB 조회 완료. {len(review_map)}개 장소 매칭됨.")
+        logger.info(f"🔍 리뷰 DB 조회 완료. {len(review_map)}개 장소 매칭됨.")
         return review_map
         
     except Exception as e: 
-        print(f"❌ 리뷰 DB 조회 오류: {e}")
+        logger.error(f"❌ 리뷰 DB 조회 오류: {e}")
         return {}
 
 async def fetch_insta_mentions_from_db(places: List[Place]) -> dict:
+    """설정된 엔진(MENTION_ENGINE)으로 인스타그램 언급 수를 조회합니다. (캐시에 없는 장소만 조회)"""
+    mention_cache.validate()
+    mention_map = {}
+    pending = []
+    for place in places:
+        hit, cached_mentions = mention_cache.lookup(place_cache_key(place))
+        if hit:
+            mention_map[place.id] = cached_mentions
+        else:
+            pending.append(place)
+    if not pending:
+        return mention_map
+
+    engine = MENTION_ENGINES.get(MENTION_ENGINE, fetch_insta_mentions_like)
+    try:
+        fetched = await engine(pending)
+    except Exception as e:
+        # 오류 결과는 캐시에 넣지 않습니다
+        logger.error(f"❌ 인스타 DB 조회 오류 ({MENTION_ENGINE}): {e}")
+        fetched = {p.id: 0 for p in pending}
+    else:
+        for place in pending:
+            mention_cache.store(place_cache_key(place), fetched.get(place.id, 0))
+    mention_map.update(fetched)
+    return mention_map
+
+async def fetch_insta_mentions_like(places: List[Place]) -> dict:
     """[개선] 인스타그램 언급 수를 더 정확하게 카운트합니다."""
-    print(f"📸 인스타 DB 조회 시작 (장소 개수: {len(places)})")
+    logger.info(f"📸 인스타 DB 조회 시작 (장소 개수: {len(places)})")
     mention_map = {p.id: 0 for p in places}
     if not places: return mention_map
     
@@ -182,158 +302,449 @@ async def fetch_insta_mentions_from_db(places: List[Place]) -> dict:
     CAPTION_COL = "caption_text"
     HASHTAG_COL = "hashtags_representation"
 
-    def normalize_place_name(name):
-        """장소명을 정규화합니다 (리뷰 DB와 동일한 로직)"""
-        normalized = name
-        normalized = normalized.replace("영대점", "영남대점")
-        normalized = normalized.replace("경산영대", "경산영남대")
-        normalized = normalized.replace("영남대학교", "영남대")
-        return normalized
-    
-    def extract_core_name(name):
-        """핵심 매장명만 추출합니다 (지점명 제거)"""
-        core = re.sub(r'\s*(영대점|영남대점|경산점|본점|신대점)\s*$', '', name)
-        core = re.sub(r'\s*경산\s*', '', core)
-        return core.strip()
+    async with insta_pool.connection() as db:
+        # 해시태그는 post_hashtags 가 있으면 정규화 태그 인덱스로 찾고, 없으면 JSON 문자열을 LIKE 로 훑습니다
+        cursor = await db.execute(HASHTAG_EXISTS_QUERY)
+        count_db_query("insta")
+        use_hashtag_table = await cursor.fetchone() is not None
+        if not use_hashtag_table:
+            logger.warning("⚠️ post_hashtags 테이블이 없어 해시태그를 LIKE 로 검색합니다 (python post_hashtags.py finally.db 로 생성)")
 
-    try:
-        async with aiosqlite.connect(INSTA_DB_PATH) as db:
-            for place in places:
-                main_name = place.place_name.split()[0]
-                unique_keywords = set()
-                
-                # 이름 길이에 따른 검색 전략
-                if len(main_name) < 2:
-                    print(f"  📋 '{place.place_name}' - 한 글자 이름, 주소로 검색")
-                    cleaned_address = place.road_address_name
-                    if cleaned_address:
-                        cleaned_address = re.sub(r'\s+[A-Za-z0-9가-힣]+층$', '', cleaned_address).strip()
-                        if cleaned_address: 
-                            unique_keywords.add(cleaned_address)
-                else:
-                    print(f"  📋 '{place.place_name}' - 두 글자 이상, 이름으로 검색")
-                    
-                    # 원본 이름들 추가
-                    original_name = place.place_name
-                    unique_keywords.add(original_name)
-                    unique_keywords.add(original_name.replace(" ", ""))
-                    unique_keywords.add(main_name)
-                    
-                    # 정규화된 이름들 추가 (영대점 -> 영남대점 등)
-                    normalized_name = normalize_place_name(original_name)
-                    if normalized_name != original_name:
-                        print(f"    🔄 정규화된 이름 추가: '{normalized_name}'")
-                        unique_keywords.add(normalized_name)
-                        unique_keywords.add(normalized_name.replace(" ", ""))
-                    
-                    # 핵심 이름 추가 (지점명 제거)
-                    core_name = extract_core_name(original_name)
-                    if core_name and core_name != original_name:
-                        print(f"    🔄 핵심 이름 추가: '{core_name}'")
-                        unique_keywords.add(core_name)
-                
-                unique_keywords = {kw for kw in unique_keywords if kw and len(kw) >= 2}
-                print(f"    🔍 검색 키워드: {unique_keywords}")
+        for place in places:
+            unique_keywords, search_hashtags = build_insta_keywords(place.place_name, place.road_address_name)
+            trace("insta_keywords", place=place.place_name, keywords=sorted(unique_keywords), hashtags=search_hashtags)
 
-                if not unique_keywords:
-                    print(f"    ❌ 검색 키워드 없음")
-                    continue
+            if not unique_keywords:
+                continue
 
-                # 각 키워드별로 개별 검색하여 총합 계산 (중복 제거)
-                total_mentions = 0
-                found_posts = set()  # 중복 제거를 위한 포스트 ID 저장
+            # 각 키워드별로 개별 검색하여 총합 계산 (중복 제거)
+            total_mentions = 0
+            found_posts = set()  # 중복 제거를 위한 포스트 ID 저장
+            
+            for keyword in unique_keywords:
+                # 캡션에서 검색
+                caption_query = f"SELECT id FROM {TABLE_NAME} WHERE {CAPTION_COL} LIKE ?"
+                cursor = await db.execute(caption_query, (f"%{keyword}%",))
+                count_db_query("insta")
+                caption_posts = await cursor.fetchall()
+                caption_count = len(caption_posts)
                 
-                for keyword in unique_keywords:
-                    # 캡션에서 검색
-                    caption_query = f"SELECT id FROM {TABLE_NAME} WHERE {CAPTION_COL} LIKE ?"
-                    cursor = await db.execute(caption_query, (f"%{keyword}%",))
-                    caption_posts = await cursor.fetchall()
-                    caption_count = len(caption_posts)
-                    
-                    # 해시태그에서 검색 (이름인 경우만)
-                    hashtag_count = 0
-                    hashtag_posts = []
-                    if len(main_name) >= 2:
+                # 해시태그에서 검색 (이름인 경우만)
+                hashtag_count = 0
+                hashtag_posts = []
+                if search_hashtags:
+                    if use_hashtag_table:
+                        cursor = await db.execute(HASHTAG_POSTS_QUERY, (normalize_hashtag(keyword),))
+                    else:
                         hashtag_query = f"SELECT id FROM {TABLE_NAME} WHERE {HASHTAG_COL} LIKE ?"
                         cursor = await db.execute(hashtag_query, (f"%#{keyword}%",))
-                        hashtag_posts = await cursor.fetchall()
-                        hashtag_count = len(hashtag_posts)
-                    
-                    # 중복 제거하여 포스트 ID 추가
-                    for post in caption_posts:
-                        found_posts.add(post[0])
-                    for post in hashtag_posts:
-                        found_posts.add(post[0])
-                    
-                    keyword_total = caption_count + hashtag_count
-                    print(f"      '{keyword}': 캡션 {caption_count} + 해시태그 {hashtag_count} = {keyword_total}")
-
-                # 중복 제거된 총 언급 수
-                total_mentions = len(found_posts)
-                mention_map[place.id] = total_mentions
-                print(f"    ✅ 총 언급 수 (중복제거): {total_mentions}")
-
-        matched_count = sum(1 for v in mention_map.values() if v > 0)
-        print(f"📸 인스타 DB 조회 완료. {matched_count}개 장소 매칭됨.")
+                    count_db_query("insta")
+                    hashtag_posts = await cursor.fetchall()
+                    hashtag_count = len(hashtag_posts)
+                
+                # 중복 제거하여 포스트 ID 추가
+                for post in caption_posts:
+                    found_posts.add(post[0])
+                for post in hashtag_posts:
+                    found_posts.add(post[0])
+                
+                keyword_total = caption_count + hashtag_count
+                trace("insta_keyword", keyword=keyword, caption=caption_count, hashtag=hashtag_count, total=keyword_total)
+
+            # 중복 제거된 총 언급 수
+            total_mentions = len(found_posts)
+            mention_map[place.id] = total_mentions
+            trace("insta_mentions", place=place.place_name, mentions=total_mentions)
+
+    matched_count = sum(1 for v in mention_map.values() if v > 0)
+    logger.info(f"📸 인스타 DB 조회 완료. {matched_count}개 장소 매칭됨.")
+    return mention_map
+
+async def fetch_insta_mentions_fts(places: List[Place]) -> dict:
+    """FTS5 트라이그램 인덱스로 장소당 한 번의 쿼리로 언급 수를 셉니다."""
+    logger.info(f"📸 인스타 DB(FTS) 조회 시작 (장소 개수: {len(places)})")
+    mention_map = {p.id: 0 for p in places}
+    if not places: return mention_map
+
+    async with insta_pool.connection() as db:
+        cursor = await db.execute(FTS_EXISTS_QUERY)
+        count_db_query("insta")
+        if not await cursor.fetchone():
+            logger.warning("⚠️ FTS 인덱스가 없어 LIKE 검색으로 대체합니다 (python insta_fts.py 로 생성)")
+            return await fetch_insta_mentions_like(places)
+        cursor = await db.execute(HASHTAG_EXISTS_QUERY)
+        count_db_query("insta")
+        hashtag_table = await cursor.fetchone() is not None
+
+        for place in places:
+            unique_keywords, search_hashtags = build_insta_keywords(place.place_name, place.road_address_name)
+            if not unique_keywords:
+                continue
+            query, params = build_mention_count_query(unique_keywords, search_hashtags, hashtag_table)
+            cursor = await db.execute(query, params)
+            count_db_query("insta")
+            mention_map[place.id] = (await cursor.fetchone())[0]
+            trace("insta_mentions", place=place.place_name, mentions=mention_map[place.id], keywords=len(unique_keywords))
+
+    matched_count = sum(1 for v in mention_map.values() if v > 0)
+    logger.info(f"📸 인스타 DB(FTS) 조회 완료. {matched_count}개 장소 매칭됨.")
+    return mention_map
+
+async def fetch_insta_mentions_batch(places: List[Place]) -> dict:
+    """요청의 모든 장소 키워드를 CTE 로 묶어 한 번의 조인으로 언급 수를 셉니다. (결과는 like 엔진과 같음)"""
+    logger.info(f"📸 인스타 DB(일괄) 조회 시작 (장소 개수: {len(places)})")
+    mention_map = {p.id: 0 for p in places}
+    if not places: return mention_map
+
+    place_keywords = {}
+    for i, place in enumerate(places):
+        keywords, search_hashtags = build_insta_keywords(place.place_name, place.road_address_name)
+        if keywords:
+            place_keywords[i] = (keywords, search_hashtags)
+    if not place_keywords:
         return mention_map
-        
-    except Exception as e: 
-        print(f"❌ 인스타 DB 조회 오류: {e}")
-        return {p.id: 0 for p in places}
+
+    async with insta_pool.connection() as db:
+        cursor = await db.execute(HASHTAG_EXISTS_QUERY)
+        count_db_query("insta")
+        hashtag_table = await cursor.fetchone() is not None
+        cursor = await db.execute(*build_batch_mention_query(place_keywords, hashtag_table))
+        count_db_query("insta")
+        for i, mentions in await cursor.fetchall():
+            mention_map[places[i].id] = mentions
+    trace("insta_batch", places=len(place_keywords), hashtag_table=hashtag_table)
+
+    matched_count = sum(1 for v in mention_map.values() if v > 0)
+    logger.info(f"📸 인스타 DB(일괄) 조회 완료. {matched_count}개 장소 매칭됨.")
+    return mention_map
+
+async def fetch_insta_mentions_automaton(places: List[Place]) -> dict:
+    """요청 전체의 키워드로 오토마톤을 만들어 게시물을 한 번만 훑어 언급 수를 셉니다."""
+    logger.info(f"📸 인스타 DB(오토마톤) 조회 시작 (장소 개수: {len(places)})")
+    mention_map = {p.id: 0 for p in places}
+    if not places: return mention_map
+
+    posts = await insta_post_holder.current()
+    place_keywords = {
+        place.id: build_insta_keywords(place.place_name, place.road_address_name)
+        for place in places
+    }
+    hashtag_index = await match_artifact_holder.current("insta")
+    mention_map.update(await asyncio.to_thread(count_mentions, posts, place_keywords, hashtag_index))
+
+    matched_count = sum(1 for v in mention_map.values() if v > 0)
+    logger.info(f"📸 인스타 DB(오토마톤) 조회 완료. {matched_count}개 장소 매칭됨.")
+    return mention_map
+
+async def resolve_catalog_ids(places: List[Place]):
+    """카카오 장소를 mapinformation.id 로 바꿉니다. ({카카오 id: mapinformation.id}, 찾지 못한 장소 목록)"""
+    index = await current_place_index() if places else None
+    place_ids = {}
+    unresolved = []
+    for place in places:
+        cleaned_address = clean_road_address(place.road_address_name)
+        row, _ = resolve_place(index, place.place_name, cleaned_address)
+        if row is None:
+            unresolved.append(place)
+        else:
+            place_ids[place.id] = index.ids[row]
+    return place_ids, unresolved
+
+async def fetch_insta_mentions_linked(places: List[Place]) -> dict:
+    """미리 연결해 둔 post_place_mentions 에서 식당 id 별 언급 수를 집계합니다."""
+    logger.info(f"📸 인스타 DB(연결 테이블) 조회 시작 (장소 개수: {len(places)})")
+    mention_map = {p.id: 0 for p in places}
+    if not places: return mention_map
+
+    place_ids, unresolved = await resolve_catalog_ids(places)
+
+    async with insta_pool.connection() as db:
+        cursor = await db.execute(LINK_EXISTS_QUERY)
+        count_db_query("insta")
+        if not await cursor.fetchone():
+            logger.warning("⚠️ 연결 테이블이 없어 오토마톤 검색으로 대체합니다 (python link_mentions.py 로 생성)")
+            return await fetch_insta_mentions_automaton(places)
+
+        if place_ids:
+            unique_ids = sorted(set(place_ids.values()))
+            query = (f"SELECT place_id, COUNT(*) FROM post_place_mentions "
+                     f"WHERE place_id IN ({','.join('?' * len(unique_ids))}) GROUP BY place_id")
+            cursor = await db.execute(query, unique_ids)
+            count_db_query("insta")
+            counts = dict(await cursor.fetchall())
+            for kakao_id, place_id in place_ids.items():
+                mention_map[kakao_id] = counts.get(place_id, 0)
+
+    # 카탈로그에 없는 장소는 이름 키워드로 직접 셉니다
+    if unresolved:
+        trace("insta_unresolved", places=len(unresolved))
+        mention_map.update(await fetch_insta_mentions_automaton(unresolved))
+
+    matched_count = sum(1 for v in mention_map.values() if v > 0)
+    logger.info(f"📸 인스타 DB(연결 테이블) 조회 완료. {matched_count}개 장소 매칭됨.")
+    return mention_map
+
+async def fetch_trending_mentions(places: List[Place]) -> dict:
+    """link_mentions.py 가 미리 올려 둔 식당별 7/30/90일 언급 수(place_trending)를 읽습니다. {카카오 id: TrendCounts}"""
+    logger.info(f"🔥 트렌딩 언급 수 조회 시작 (장소 개수: {len(places)})")
+    trend_map = {p.id: TrendCounts() for p in places}
+    if not places: return trend_map
+
+    place_ids, _ = await resolve_catalog_ids(places)
+    async with insta_pool.connection() as db:
+        cursor = await db.execute(TRENDING_EXISTS_QUERY)
+        count_db_query("insta")
+        if not await cursor.fetchone():
+            logger.warning("⚠️ 트렌딩 카운터가 없습니다 (prototype.py 크롤링 또는 python link_mentions.py 로 생성)")
+            return trend_map
+        if not place_ids:
+            return trend_map
+
+        unique_ids = sorted(set(place_ids.values()))
+        cursor = await db.execute(build_trending_query(len(unique_ids)), unique_ids)
+        count_db_query("insta")
+        counters = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+
+        # 카운터는 마지막으로 옮긴 날 기준이라, 그 뒤로 창 밖으로 나간 날짜만 일별 표에서 빼 줍니다
+        cursor = await db.execute(TRENDING_AS_OF_QUERY)
+        count_db_query("insta")
+        as_of_row = await cursor.fetchone()
+        today = today_number()
+        if counters and as_of_row and as_of_row[0] < today:
+            ids = sorted(counters)
+            cursor = await db.execute(build_expired_query(len(ids)), (*ids, today - min(WINDOWS)))
+            count_db_query("insta")
+            trends = adjust_expired(counters, await cursor.fetchall(), as_of_row[0], today)
+        else:
+            trends = {place_id: TrendCounts(*values) for place_id, values in counters.items()}
+
+    for kakao_id, place_id in place_ids.items():
+        trend_map[kakao_id] = trends.get(place_id, TrendCounts())
+    logger.info(f"🔥 트렌딩 언급 수 조회 완료. {sum(1 for t in trend_map.values() if any(t))}개 장소에 최근 언급 있음.")
+    return trend_map
+
+MENTION_ENGINES = {
+    "like": fetch_insta_mentions_like,
+    "fts": fetch_insta_mentions_fts,
+    "batch": fetch_insta_mentions_batch,
+    "automaton": fetch_insta_mentions_automaton,
+    "linked": fetch_insta_mentions_linked,
+}
 
 # --- 3. API 엔드포인트 및 핵심 로직 (이전과 동일) ---
+# 응답은 입력을 한 번만 검증한 뒤 점수를 매긴 dict 목록을 바로 JSON 으로 씁니다.
+# (RankedPlace 객체 생성과 response_model 재검증을 건너뜀, 스키마는 response_model 과 같음)
+def encode_json(content) -> bytes:
+    if ORJSON_ENABLED:
+        return orjson.dumps(content)
+    # FastAPI JSONResponse 와 같은 설정
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def json_response(content) -> Response:
+    return Response(content=encode_json(content), media_type="application/json")
+
 @app.post("/api/restaurants/process-search", response_model=List[RankedPlace])
 async def process_and_rank_restaurants(request: SearchRequest):
-    search_results = request.searchResults
-    ranking_preference = request.rankingPreference
+    return json_response(await rank_request(request.searchResults, request.rankingPreference))
+
+async def rank_request(search_results: List[Place], ranking_preference: str) -> List[dict]:
+    """검증된 장소 목록을 랭킹합니다 (RankedPlace 형태의 dict 목록)"""
+    # 같은 장소 집합 + 가중치 프리셋으로 진행 중인 요청이 있으면 그 결과를 같이 씁니다
+    key = request_key(search_results, ranking_preference)
+    return await recommend_flight.do(key, lambda: admitted_rank_places(search_results, ranking_preference))
+
+async def admitted_rank_places(search_results: List[Place], ranking_preference: str) -> List[dict]:
+    deadline = request_deadline()
+    async with admitted():
+        with request_scope():
+            return await rank_places(search_results, ranking_preference, deadline)
+
+def request_deadline():
+    if REQUEST_DEADLINE <= 0:
+        return None
+    return asyncio.get_running_loop().time() + REQUEST_DEADLINE
+
+@asynccontextmanager
+async def admitted():
+    """처리 자리를 얻을 때까지 기다리고, 대기 시간 예산을 넘으면 503 을 돌려줍니다"""
+    try:
+        async with admission_limiter.slot():
+            yield
+    except AdmissionRejected as e:
+        logger.warning(f"⏳ 요청 거절 (동시 처리 {admission_limiter.active}개, 대기 {admission_limiter.waiting}개): {e}")
+        raise HTTPException(status_code=503, detail="요청이 많아 잠시 후 다시 시도해 주세요.", headers={"Retry-After": "1"})
+
+WEIGHT_PRESETS = {
+    'distance':  {'distance': 0.45, 'reviews': 0.3, 'mentions': 0.25},
+    'reviews':   {'distance': 0.2, 'reviews': 0.8, 'mentions': 0.0},
+    'instagram': {'distance': 0.2, 'reviews': 0.0, 'mentions': 0.8},
+    'balanced':  {'distance': 0.25, 'reviews': 0.375, 'mentions': 0.375},
+    # 최근 언급 수(7/30/90일 카운터 가중합)로 점수를 매깁니다. instagram_mentions 에는 30일 언급 수가 들어갑니다
+    'trending':  {'distance': 0.2, 'reviews': 0.1, 'mentions': 0.7}
+}
+TRENDING_PREFERENCE = 'trending'
+
+async def rank_places(search_results: List[Place], ranking_preference: str, deadline=None) -> List[dict]:
+    """장소 목록을 보강(리뷰 수, 인스타 언급 수)한 뒤 가중치 프리셋으로 점수를 매겨 정렬합니다."""
     if not search_results: return []
+    review_map, insta_map = await enrich_places(search_results, deadline, trending=ranking_preference == TRENDING_PREFERENCE)
+    return score_places(search_results, ranking_preference, review_map, insta_map, await current_score_tables())
+
+# 마감 시간이 지나 기다리지 않고 남겨 둔 조회 작업 (끝날 때까지 참조를 잡아 두어 중간에 수거되지 않게 함)
+background_lookups = set()
+STAGE_CACHES = {"review_lookup": review_cache, "instagram_lookup": mention_cache}
+
+def keep_lookup_running(stage: str, task: asyncio.Future):
+    """마감 시간이 지난 조회를 백그라운드에서 끝까지 돌립니다 (결과는 조회 함수가 캐시에 넣고, 실패하면 로그만 남김)"""
+    def report(done):
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"❌ 백그라운드 {stage} 실패: {done.exception()}")
+    background_lookups.add(task)
+    task.add_done_callback(background_lookups.discard)
+    task.add_done_callback(report)
+
+def cached_stage_results(stage: str, places: List[Place]) -> dict:
+    """마감 시간까지 끝나지 않은 단계 대신 쓸, 캐시에 이미 있는 장소별 값 (캐시에 없거나 매칭 실패면 비워 둠)"""
+    cache = STAGE_CACHES.get(stage)
+    results = {}
+    if cache is None:
+        return results
+    for place in places:
+        hit, value = cache.peek(place_cache_key(place))
+        if hit and value is not None:
+            results[place.id] = value
+    return results
 
-    WEIGHT_PRESETS = {
-        'distance':  {'distance': 0.45, 'reviews': 0.3, 'mentions': 0.25},
-        'reviews':   {'distance': 0.2, 'reviews': 0.8, 'mentions': 0.0},
-        'instagram': {'distance': 0.2, 'reviews': 0.0, 'mentions': 0.8},
-        'balanced':  {'distance': 0.25, 'reviews': 0.375, 'mentions': 0.375}
+async def enrich_places(places: List[Place], deadline=None, trending=False):
+    """리뷰 수와 인스타 언급 수를 동시에 조회해 (review_map, insta_map) 을 돌려줍니다.
+
+    trending 이면 인스타 언급 수 대신 최근 7/30/90일 카운터(TrendCounts)를 읽습니다.
+    deadline(이벤트 루프 시각)까지 끝나지 않은 조회는 캐시에 있는 장소의 값만으로 바로 랭킹합니다.
+    남은 조회는 백그라운드에서 마저 끝나 캐시를 채우므로 다음 요청은 결과를 받습니다.
+    """
+    mention_stage = ("trending_lookup", fetch_trending_mentions(places)) if trending else ("instagram_lookup", fetch_insta_mentions_from_db(places))
+    stages = {
+        "review_lookup": asyncio.ensure_future(observe_stage("review_lookup", fetch_review_counts_from_db(places))),
+        mention_stage[0]: asyncio.ensure_future(observe_stage(*mention_stage)),
     }
+    timeout = None if deadline is None else max(deadline - asyncio.get_running_loop().time(), 0)
+    await asyncio.wait(stages.values(), timeout=timeout)
+
+    for stage, task in stages.items():
+        if not task.done():
+            keep_lookup_running(stage, task)
+    results = []
+    for stage, task in stages.items():
+        if not task.done():
+            DEADLINE_PARTIAL.inc(stage)
+            logger.warning(f"⏱️ 요청 마감 시간 초과: {stage} 는 캐시에 있는 장소의 값만으로 랭킹합니다")
+            results.append(cached_stage_results(stage, places))
+        elif task.exception() is not None:
+            raise HTTPException(status_code=500, detail=f"DB 조회 중 심각한 오류 발생: {task.exception()}")
+        else:
+            results.append(task.result())
+    return results
+
+def score_places(search_results: List[Place], ranking_preference: str, review_map: dict, insta_map: dict, tables=None) -> List[dict]:
+    """보강된 값으로 점수를 매겨 상위 45개를 RankedPlace 형태의 dict 로 돌려줍니다.
+
+    tables(전역 정규화 표)가 있으면 리뷰 수는 (지역, 업종)별, 언급 수는 전체 식당 분포의 백분위로 정규화하고,
+    없으면 이 목록 안의 최댓값으로 나눕니다. 거리는 요청 위치 기준이라 항상 목록 안의 최댓값으로 나눕니다.
+    'trending' 프리셋이면 insta_map 값은 TrendCounts 이고, 창별 가중합을 목록 안의 최댓값으로 나눕니다.
+    """
+    if not search_results: return []
+
     weights = WEIGHT_PRESETS.get(ranking_preference, WEIGHT_PRESETS['balanced'])
-    print(f"\n--- 가중치 프리셋 '{ranking_preference}'(으)로 랭킹을 계산합니다. (가중치: {weights}) ---")
+    logger.info(f"--- 가중치 프리셋 '{ranking_preference}'(으)로 랭킹을 계산합니다. (가중치: {weights}) ---")
 
-    try:
-        review_map, insta_map = await asyncio.gather(
-            fetch_review_counts_from_db(search_results), 
-            fetch_insta_mentions_from_db(search_results)        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"DB 조회 중 심각한 오류 발생: {e}")
-
-    enriched_places = []
-    print("\n📊 데이터 통합 시작:")
-    for place in search_results:
-        enriched_data = place.model_dump()
-        review_count = review_map.get(place.id, 0)
-        insta_mentions = insta_map.get(place.id, 0)
-        
-        enriched_data['review_count'] = review_count
-        enriched_data['instagram_mentions'] = insta_mentions
-        enriched_data['distance'] = int(place.distance) if place.distance and place.distance.isdigit() else 99999
-        
-        print(f"  🏪 {place.place_name}: 리뷰 {review_count}, 인스타 {insta_mentions}, 거리 {enriched_data['distance']}m")
-        enriched_places.append(enriched_data)
-    
-    if not enriched_places: return []
-    max_dist = max(p['distance'] for p in enriched_places) or 1
-    max_revs = max(p['review_count'] for p in enriched_places) or 1
-    max_ment = max(p['instagram_mentions'] for p in enriched_places) or 1
+    scoring_start = time.perf_counter()
+    # 장소별 값은 배열로만 다루고, 응답 dict 는 상위 45개에 대해서만 만듭니다
+    distances = [int(p.distance) if p.distance and p.distance.isdigit() else 99999 for p in search_results]
+    review_counts = [review_map.get(p.id, 0) for p in search_results]
+    if ranking_preference == TRENDING_PREFERENCE:
+        trends = [insta_map.get(p.id) or TrendCounts() for p in search_results]
+        mention_counts = [trend.mentions_30d for trend in trends]
+        mention_signals = [trend.score for trend in trends]
+    else:
+        mention_counts = [insta_map.get(p.id, 0) for p in search_results]
+        mention_signals = None
+    for place, distance, review_count, insta_mentions in zip(search_results, distances, review_counts, mention_counts):
+        trace("enriched_place", place=place.place_name, review_count=review_count, mentions=insta_mentions, distance=distance)
+
+    max_dist = max(distances) or 1
+    if tables is not None:
+        review_norms = [tables.review_percentile(count, area_of_address(p.address_name), category_group(p.category_name))
+                        for p, count in zip(search_results, review_counts)]
+    else:
+        max_revs = max(review_counts) or 1
+        review_norms = [count / max_revs for count in review_counts]
+    if mention_signals is not None:
+        max_signal = max(mention_signals) or 1
+        mention_norms = [signal / max_signal for signal in mention_signals]
+    elif tables is not None and tables.has_mentions:
+        mention_norms = [tables.mention_percentile(count) for count in mention_counts]
+    else:
+        max_ment = max(mention_counts) or 1
+        mention_norms = [count / max_ment for count in mention_counts]
     
-    scored_places = []
-    for p in enriched_places:
-        norm_revs = (p['review_count'] / max_revs) if max_revs > 0 else 0
-        norm_ment = (p['instagram_mentions'] / max_ment) if max_ment > 0 else 0
-        norm_dist = (1 - (p['distance'] / max_dist)) if max_dist > 0 else 0
-        score = norm_dist * weights['distance'] + norm_revs * weights['reviews'] + norm_ment * weights['mentions']
-        p['distance'] = str(p['distance'])
-        scored_places.append(RankedPlace(**p, score=score))
+    scores = []
+    for distance, norm_revs, norm_ment in zip(distances, review_norms, mention_norms):
+        norm_dist = (1 - (distance / max_dist)) if max_dist > 0 else 0
+        scores.append(norm_dist * weights['distance'] + norm_revs * weights['reviews'] + norm_ment * weights['mentions'])
     
-    ranked_list = sorted(scored_places, key=lambda p: p.score, reverse=True)
-    return ranked_list[:45]
+    # sorted 는 안정 정렬이므로 점수가 같으면 입력 순서가 유지됩니다 (이전 RankedPlace 정렬과 같음)
+    order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:45]
+    ranked_list = []
+    for i in order:
+        # Place 필드는 모두 str/None 이라 model_dump() 대신 필드 dict 를 복사합니다
+        ranked = dict(search_results[i].__dict__)
+        ranked['distance'] = str(distances[i])
+        ranked['review_count'] = review_counts[i]
+        ranked['instagram_mentions'] = mention_counts[i]
+        ranked['score'] = scores[i]
+        ranked_list.append(ranked)
+    STAGE_LATENCY.observe(time.perf_counter() - scoring_start, "scoring")
+    return ranked_list
+
+# 경로 만들기(구간별 검색)용 일괄 랭킹 엔드포인트
+class BatchSearchRequest(BaseModel):
+    groups: List[SearchRequest]
+
+class BatchSearchResponse(BaseModel):
+    rankings: List[List[RankedPlace]]
+
+@app.post("/api/restaurants/process-search/batch", response_model=BatchSearchResponse)
+async def process_and_rank_batch(request: BatchSearchRequest):
+    """여러 검색 그룹을 한 번에 랭킹합니다.
+    그룹 사이에 겹치는 장소는 한 번만 보강하고, 점수는 그룹별로 따로 계산해
+    각 그룹을 process-search 로 따로 보낸 것과 같은 결과를 돌려줍니다.
+    """
+    deadline = request_deadline()
+    async with admitted():
+        with request_scope():
+            unique_places = {}
+            for group in request.groups:
+                for place in group.searchResults:
+                    unique_places.setdefault(place.id, place)
+            logger.info(f"🧭 일괄 랭킹: 그룹 {len(request.groups)}개, 중복 제거 후 장소 {len(unique_places)}개")
+
+            if unique_places:
+                review_map, insta_map = await enrich_places(list(unique_places.values()), deadline)
+            else:
+                review_map, insta_map = {}, {}
+            # 'trending' 그룹의 장소는 최근 언급 수 카운터도 읽습니다
+            trending_places = {
+                place.id: place for group in request.groups if group.rankingPreference == TRENDING_PREFERENCE
+                for place in group.searchResults
+            }
+            trend_map = await observe_stage("trending_lookup", fetch_trending_mentions(list(trending_places.values()))) if trending_places else {}
+            tables = await current_score_tables()
+            rankings = [
+                score_places(group.searchResults, group.rankingPreference, review_map,
+                             trend_map if group.rankingPreference == TRENDING_PREFERENCE else insta_map, tables)
+                for group in request.groups
+            ]
+    return json_response({"rankings": rankings})
 
 # 프론트엔드 요청을 위한 /recommend 엔드포인트 추가
 class RecommendRequest(BaseModel):
@@ -346,16 +757,109 @@ class RecommendResponse(BaseModel):
 @app.post("/recommend", response_model=RecommendResponse)
 async def recommend_places(request: RecommendRequest):
     """프론트엔드에서 사용하는 추천 엔드포인트"""
-    # 기존 SearchRequest 형식으로 변환
-    search_request = SearchRequest(
-        searchResults=request.places,
-        rankingPreference=request.ranking_preference
+    # 이미 검증된 장소 목록으로 기존 추천 로직을 그대로 사용 (SearchRequest 로 다시 검증하지 않음)
+    recommended_places = await rank_request(request.places, request.ranking_preference)
+    return json_response({"recommended_places": recommended_places})
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+@app.post("/recommend/stream", response_model=RecommendResponse)
+async def recommend_places_stream(request: RecommendRequest, stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$")):
+    """/recommend 의 스트리밍 버전.
+
+    거리만으로 매긴 랭킹(initial)을 바로 보내고, 장소 묶음의 리뷰 수/인스타 언급 수가 도착할 때마다
+    갱신된 랭킹(progress)을 보낸 뒤, /recommend 응답과 같은 최종 랭킹(final)으로 끝납니다.
+    ndjson 은 한 줄에 {"event": ..., "data": ...}, sse 는 event:/data: 메시지 하나씩입니다.
+    (response_model 은 final 메시지 data 의 스키마)
+    """
+    # 처리 자리는 스트림이 끝날 때까지 잡고 있습니다. 자리를 얻지 못하면 스트림을 시작하기 전에 503
+    admission = AsyncExitStack()
+    await admission.enter_async_context(admitted())
+    return AdmittedStreamingResponse(
+        stream_events(stream_ranking(request.places, request.ranking_preference), stream_format),
+        admission, media_type=STREAM_MEDIA_TYPES[stream_format],
     )
-    
-    # 기존 추천 로직 재사용
-    recommended_places = await process_and_rank_restaurants(search_request)
-    
-    return RecommendResponse(recommended_places=recommended_places)
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """응답이 끝나면 처리 자리를 돌려주는 StreamingResponse.
+
+    본문을 보내기 전에 연결이 끊겨 제너레이터가 시작되지 않은 경우에도 돌려줍니다.
+    """
+
+    def __init__(self, content, admission: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.admission.aclose()
+
+async def stream_events(events, stream_format: str):
+    async for event, data in events:
+        if stream_format == "sse":
+            yield b"event: " + event.encode() + b"\ndata: " + encode_json(data) + b"\n\n"
+        else:
+            yield encode_json({"event": event, "data": data}) + b"\n"
+
+async def stream_ranking(search_results: List[Place], ranking_preference: str):
+    """(이벤트 이름, data) 를 차례로 내보냅니다. 점수 정규화는 매번 전체 장소 목록 기준입니다"""
+    with request_scope():
+        deadline = request_deadline()
+        tables = await current_score_tables()
+        review_map, insta_map = {}, {}
+        yield "initial", {"recommended_places": score_places(search_results, ranking_preference, review_map, insta_map, tables),
+                          "enriched": 0, "total": len(search_results)}
+
+        # 묶음별 리뷰/인스타 조회를 모두 띄워 두고 끝나는 대로 결과를 합칩니다
+        pending = {}
+        batches = [search_results[start:start + STREAM_BATCH_SIZE] for start in range(0, len(search_results), STREAM_BATCH_SIZE)]
+        for number, batch in enumerate(batches):
+            pending[asyncio.ensure_future(fetch_review_counts_from_db(batch))] = ("review_lookup", review_map, number)
+            if ranking_preference == TRENDING_PREFERENCE:
+                pending[asyncio.ensure_future(fetch_trending_mentions(batch))] = ("trending_lookup", insta_map, number)
+            else:
+                pending[asyncio.ensure_future(fetch_insta_mentions_from_db(batch))] = ("instagram_lookup", insta_map, number)
+        lookups_left = [2] * len(batches)
+        enriched = 0  # 리뷰/인스타 조회가 모두 끝난 장소 수
+        while pending:
+            timeout = None if deadline is None else max(deadline - asyncio.get_running_loop().time(), 0)
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # 남은 조회는 enrich_places 와 같이 백그라운드에서 끝나 캐시를 채우고, 지금은 캐시에 있는 값만 씁니다
+                for task, (stage, result_map, number) in pending.items():
+                    keep_lookup_running(stage, task)
+                    result_map.update(cached_stage_results(stage, batches[number]))
+                for stage in sorted({stage for stage, _, _ in pending.values()}):
+                    DEADLINE_PARTIAL.inc(stage)
+                    logger.warning(f"⏱️ 요청 마감 시간 초과: {stage} 결과 일부 없이 랭킹합니다")
+                break
+            for task in done:
+                stage, result_map, number = pending.pop(task)
+                if task.exception() is not None:
+                    logger.error(f"❌ 스트리밍 {stage} 실패: {task.exception()}")
+                    yield "error", {"detail": f"DB 조회 중 심각한 오류 발생: {task.exception()}"}
+                    return
+                result_map.update(task.result())
+                lookups_left[number] -= 1
+                if not lookups_left[number]:
+                    enriched += len(batches[number])
+            if pending:
+                yield "progress", {"recommended_places": score_places(search_results, ranking_preference, review_map, insta_map, tables),
+                                   "enriched": enriched, "total": len(search_results)}
+
+        yield "final", {"recommended_places": score_places(search_results, ranking_preference, review_map, insta_map, tables)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 텍스트 형식 메트릭 (단계별 지연 시간, 매칭 전략별 횟수, DB 쿼리 수, 캐시 통계)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """보강 데이터 캐시의 적중/미스 통계"""
+    return {"review": review_cache.stats(), "mention": mention_cache.stats()}
 
 # =======================================================
 #  ★ 서버 실행 블록 ★
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 백엔드 모듈은 패키지가 아니라 recommend_backend 폴더에서 바로 import 하므로 경로에 추가합니다
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,101 @@
+import pytest
+
+import enrichment_cache
+from enrichment_cache import EnrichmentCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(enrichment_cache.time, "monotonic", clock)
+    return clock
+
+
+def make_cache(max_entries=10):
+    return EnrichmentCache("test", [], max_entries=max_entries, ttl=600.0, negative_ttl=120.0)
+
+
+def test_found_values_use_positive_ttl_even_when_zero(clock):
+    cache = make_cache()
+    cache.store("reviews", 42)
+    cache.store("zero", 0)  # 찾았지만 0 인 값은 미스가 아님
+    clock.now += 599
+    assert cache.lookup("reviews") == (True, 42)
+    assert cache.lookup("zero") == (True, 0)
+    clock.now += 2
+    assert cache.lookup("reviews") == (False, None)
+    assert cache.lookup("zero") == (False, None)
+    assert (cache.hits, cache.negative_hits, cache.misses) == (2, 0, 2)
+
+
+def test_misses_use_negative_ttl(clock):
+    cache = make_cache()
+    cache.store("unmatched", None)
+    clock.now += 119
+    assert cache.lookup("unmatched") == (True, None)
+    assert cache.negative_hits == 1 and cache.hits == 0
+    clock.now += 2
+    assert cache.lookup("unmatched") == (False, None)
+    assert cache.stats()["size"] == 0  # 만료된 항목은 지움
+
+
+def test_restore_switches_ttl(clock):
+    cache = make_cache()
+    cache.store("place", None)
+    cache.store("place", 7)  # 다시 찾으면 positive TTL 로 바뀜
+    clock.now += 300
+    assert cache.lookup("place") == (True, 7)
+
+
+def test_peek_leaves_stats_and_order_alone(clock):
+    cache = make_cache(max_entries=2)
+    cache.store("a", 1)
+    cache.store("b", None)
+    assert cache.peek("a") == (True, 1)
+    assert cache.peek("b") == (True, None)
+    assert cache.peek("c") == (False, None)
+    assert (cache.hits, cache.negative_hits, cache.misses) == (0, 0, 0)
+    cache.store("c", 3)  # peek 은 LRU 순서를 바꾸지 않으므로 a 가 밀려남
+    assert cache.peek("a") == (False, None)
+    clock.now += 121
+    assert cache.peek("b") == (False, None)
+
+
+def test_lru_eviction(clock):
+    cache = make_cache(max_entries=2)
+    cache.store("a", 1)
+    cache.store("b", 2)
+    cache.lookup("a")
+    cache.store("c", 3)
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, 1)
+    assert cache.evictions == 1
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = make_cache(max_entries=0)
+    cache.store("a", 1)
+    assert not cache.enabled
+    assert cache.lookup("a") == (False, None)
+
+
+def test_validate_clears_when_source_changes(tmp_path, clock):
+    source = tmp_path / "restarant.db"
+    source.write_bytes(b"v1")
+    cache = EnrichmentCache("test", [str(source)], ttl=600.0, negative_ttl=120.0)
+    cache.validate()
+    cache.store("a", 1)
+    cache.validate()
+    assert cache.lookup("a") == (True, 1)
+    source.write_bytes(b"version 2")
+    cache.validate()
+    assert cache.lookup("a") == (False, None)
+    assert cache.invalidations == 1
@@ -0,0 +1,111 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import match_artifact
+from match_artifact import ArtifactHolder, MatchArtifact, build_artifact
+from normalization import clean_road_address
+from place_index import load_place_index, resolve_place
+
+# (id, name, address2, reviewnum, latitude, longitude) — 리뷰 수/좌표가 NULL 인 행도 넣습니다
+ROWS = [
+    (1, "BHC치킨 경산하양점", "경북 경산시 하양읍 하양로37길 19", "120", 35.9131, 128.8201),
+    (2, "맘스터치 영남대점", "경북 경산시 대학로 300 1층", "80", 35.8325, 128.7541),
+    (3, "스타벅스 영남대점", "경북 경산시 청운로 16 1~3층 (대동)", "900", 35.8342, 128.7567),
+    (4, "스타벅스 경산중방DT점", "경북 경산시 경안로 222 (중방동)", None, None, None),
+    (5, "카페봄봄 경일대점", "경북 경산시 하양읍 가마실길 46", "30", 35.9052, 128.8136),
+    (6, "맘스터치 대구경일대점", "경북 경산시 하양읍 가마실길 46", "40", 35.9052, 128.8137),
+    (7, "Cafe_100%", "경북 경산시 하양읍 하양로 100", "많음", 35.9140, 128.8190),
+    (8, "하양 국밥집", None, "12", None, None),
+]
+QUERIES = [
+    ("BHC치킨 경산하양점", "경북 경산시 하양읍 하양로37길 19"),  # exact
+    ("bhc치킨", "경북 경산시 하양읍 하양로37길 19"),             # 전략 1 (ASCII 대소문자 무시)
+    ("맘스터치 영대점", "경북 경산시 대학로 300"),                 # 별칭
+    ("스타벅스 영남대", "경북 경산시 청운로 16"),                  # 전략 3
+    ("봄봄카페", "경북 경산시 하양읍 가마실길 46"),                # 전략 4 (n-gram)
+    ("맘스터치 경일대점", "경북 경산시 하양읍 가마실길 46"),
+    ("Cafe_100%", "경북 경산시 하양읍 하양로 100"),
+    ("없는식당", "경북 경산시 하양읍 하양로 1"),
+    ("국밥", ""),
+]
+
+
+def make_review_db(path, rows=ROWS):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS mapinformation (id INTEGER PRIMARY KEY, name TEXT, address2 TEXT, "
+                 "reviewnum TEXT, latitude REAL, longitude REAL)")
+    conn.executemany("INSERT OR REPLACE INTO mapinformation VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def sources(tmp_path):
+    review, insta = str(tmp_path / "restarant.db"), str(tmp_path / "finally.db")
+    make_review_db(review)
+    conn = sqlite3.connect(insta)
+    conn.execute("CREATE TABLE instagram_posts (id INTEGER PRIMARY KEY, hashtags_representation TEXT)")
+    conn.execute("""INSERT INTO instagram_posts VALUES (1, '["#BHC치킨", "#하양맛집"]')""")
+    conn.commit()
+    conn.close()
+    return {"review": review, "insta": insta}
+
+
+@pytest.fixture
+def artifact_path(sources, tmp_path):
+    path = str(tmp_path / "match_index.bin")
+    build_artifact(sources["review"], sources["insta"], path)
+    return path
+
+
+def test_artifact_matches_place_index(sources, artifact_path):
+    index = load_place_index(sources["review"])
+    artifact = MatchArtifact(artifact_path)
+    assert len(artifact) == len(index)
+    for pos in range(len(index)):
+        assert artifact.ids[pos] == index.ids[pos]
+        assert artifact.names[pos] == index.names[pos] and artifact.addresses[pos] == index.addresses[pos]
+        assert (artifact.latitudes[pos], artifact.longitudes[pos]) == (index.latitudes[pos], index.longitudes[pos])
+    assert [artifact.reviews[pos] for pos in range(len(artifact))] == [120, 80, 900, None, 30, 40, 0, 12]
+
+    for name, address in QUERIES:
+        cleaned = clean_road_address(address)
+        assert resolve_place(artifact, name, cleaned) == resolve_place(index, name, cleaned), name
+        assert artifact.name_matcher.top_k(name, threshold=0.0) == index.name_matcher.top_k(name, threshold=0.0)
+    for text in ("하양", "Cafe_1", "%맘스%", "a", ""):
+        assert artifact.name_contains(text) == index.name_contains(text)
+        assert artifact.address_contains(text) == index.address_contains(text)
+    assert artifact.nearby_rows([1, 5, 6, 4, 99], 35.9052, 128.8136, 50) == index.nearby_rows([1, 5, 6, 4, 99], 35.9052, 128.8136, 50)
+    assert artifact.hashtag_posts("bhc치킨") == {1} and artifact.hashtag_posts("없는태그") == set()
+
+
+def test_stale_artifact_is_served_while_rebuilding(sources, artifact_path):
+    holder = ArtifactHolder(artifact_path, sources, rebuild_interval=0)
+    assert holder.load()
+    old = asyncio.run(holder.current("review"))
+
+    make_review_db(sources["review"], [(9, "새로 생긴 식당", "경북 경산시 하양읍 하양로 7", "3", None, None)])
+    assert asyncio.run(holder.current("review")) is old  # 다시 빌드하는 동안은 기존 아티팩트
+    holder.wait_for_rebuild(10)
+    rebuilt = asyncio.run(holder.current("review"))
+    assert rebuilt is not old and len(rebuilt) == len(ROWS) + 1
+    assert resolve_place(rebuilt, "새로 생긴 식당", "경북 경산시 하양읍 하양로 7") == (len(ROWS), "exact")
+    holder.close()
+
+
+def test_unreadable_artifact_falls_back_and_rebuilds(sources, artifact_path):
+    with open(artifact_path, "r+b") as f:
+        f.seek(8)
+        f.write((match_artifact.FORMAT_VERSION - 1).to_bytes(4, "little"))  # 이전 형식 버전
+    holder = ArtifactHolder(artifact_path, sources, rebuild_interval=0)
+    assert not holder.load()  # 다시 빌드가 끝날 때까지는 메모리 인덱스
+    holder.wait_for_rebuild(10)
+    assert asyncio.run(holder.current()) is not None
+    assert MatchArtifact(artifact_path).metadata["format_version"] == match_artifact.FORMAT_VERSION
+
+    # 다시 빌드한 직후에는 rebuild_interval 동안 다시 시작하지 않습니다
+    holder.rebuild_interval = 3600
+    assert not holder.start_rebuild()
+    holder.close()
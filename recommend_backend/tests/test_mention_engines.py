@@ -0,0 +1,103 @@
+import asyncio
+import importlib.util
+import json
+import os
+import sqlite3
+
+import pytest
+
+from conftest import BACKEND_DIR
+from insta_fts import ensure_fts_index
+from link_mentions import link_new_posts
+from match_artifact import build_artifact
+from post_hashtags import backfill_hashtags
+
+# 해시태그는 정규화 태그가 키워드와 같을 때만 언급으로 셉니다 ('#스타벅스하양점맛집' 은 '스타벅스' 언급이 아님).
+# 캡션은 그대로 부분 문자열 검색입니다. 모든 MENTION_ENGINES 가 같은 수를 내야 합니다.
+PLACES = [
+    # (카카오 id, 이름, 도로명 주소, 기대 언급 수)
+    ("k1", "스타벅스 하양점", "경북 경산시 하양읍 하양로 18", 3),  # 게시물 1(캡션), 2(#스타벅스), 4(#스타벅스하양점)
+    ("k2", "bhc치킨 하양점", "경북 경산시 하양읍 하양로37길 19", 1),  # 게시물 6(#BHC치킨)
+    ("k3", "한솥도시락 경일대점", "경북 경산시 하양읍 가마실길 46", 0),  # '#한솥도시락맛집' 만 있음
+]
+POSTS = [
+    (1, "어제 스타벅스 다녀옴", None),
+    (2, "커피 한 잔", ["#스타벅스"]),
+    (3, "커피 두 잔", ["#스타벅스하양점맛집", "#하양카페"]),
+    (4, "빵", [" #스타벅스하양점 "]),
+    (5, "치킨", ["#치킨"]),
+    (6, "치킨 또", ["#BHC치킨"]),
+    (7, "치킨 또또", ["#bhc치킨맛집"]),
+    (8, "도시락", ["#한솥도시락맛집"]),
+]
+
+
+@pytest.fixture(scope="module")
+def backend_dir(tmp_path_factory):
+    work = tmp_path_factory.mktemp("mention_engines")
+    review = sqlite3.connect(work / "restarant.db")
+    review.execute("CREATE TABLE mapinformation (id INTEGER PRIMARY KEY, name TEXT, area TEXT, category TEXT, "
+                   "address2 TEXT, reviewnum INTEGER, rating REAL)")
+    review.executemany("INSERT INTO mapinformation VALUES (?, ?, '하양읍', '음식점', ?, 10, 4.5)",
+                       [(i + 1, name, address) for i, (_, name, address, _) in enumerate(PLACES)])
+    review.commit()
+    review.close()
+
+    insta = sqlite3.connect(work / "finally.db")
+    insta.execute("CREATE TABLE instagram_posts (id INTEGER NOT NULL, instagram_post_url VARCHAR(512) NOT NULL, "
+                  "caption_text TEXT, hashtags_representation TEXT, PRIMARY KEY (id))")
+    insta.executemany("INSERT INTO instagram_posts VALUES (?, ?, ?, ?)", [
+        (post_id, f"https://www.instagram.com/p/{post_id}/", caption, json.dumps(tags, ensure_ascii=False) if tags else None)
+        for post_id, caption, tags in POSTS
+    ])
+    insta.commit()
+    backfill_hashtags(insta)
+    ensure_fts_index(insta)
+    insta.close()
+    link_new_posts(str(work / "finally.db"), str(work / "restarant.db"))
+    build_artifact(str(work / "restarant.db"), str(work / "finally.db"), str(work / "match_index.bin"))
+    return work
+
+
+@pytest.fixture
+def backend(backend_dir, monkeypatch):
+    # 서버 모듈은 DB 를 작업 폴더 기준 상대 경로로 열므로 임시 폴더에서 읽어 들입니다
+    monkeypatch.chdir(backend_dir)
+    monkeypatch.setenv("MATSPOT_MATCH_ARTIFACT", "missing_index.bin")
+    spec = importlib.util.spec_from_file_location("matspot_backend", os.path.join(BACKEND_DIR, "test 3.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def count(backend, engine, use_artifact=False):
+    places = [backend.Place(id=kakao_id, place_name=name, category_name="음식점", address_name=address,
+                            road_address_name=address, x="128.8", y="35.9", place_url="")
+              for kakao_id, name, address, _ in PLACES]
+
+    async def run():
+        if use_artifact:
+            backend.match_artifact_holder.path = "match_index.bin"
+            assert await asyncio.to_thread(backend.match_artifact_holder.load)
+        await backend.insta_pool.open()
+        try:
+            return await backend.MENTION_ENGINES[engine](places)
+        finally:
+            await backend.insta_pool.close()
+            backend.match_artifact_holder.close()
+
+    return asyncio.run(run())
+
+
+EXPECTED = {kakao_id: mentions for kakao_id, _, _, mentions in PLACES}
+
+
+@pytest.mark.parametrize("engine", ["like", "fts", "batch", "automaton", "linked"])
+def test_every_engine_counts_exact_hashtags_only(backend, engine):
+    assert set(backend.MENTION_ENGINES) == {"like", "fts", "batch", "automaton", "linked"}
+    assert count(backend, engine) == EXPECTED
+
+
+@pytest.mark.parametrize("engine", ["automaton", "linked"])
+def test_artifact_hashtag_table_matches_post_hashtags(backend, engine):
+    assert count(backend, engine, use_artifact=True) == EXPECTED
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from normalization import clean_road_address, extract_core_name, normalize_place_name, road_tokens
+from place_index import PlaceIndex, resolve_place
+
+# (id, name, address2, reviewnum) — 행 번호는 id 순서
+ROWS = [
+    (1, "BHC치킨 경산하양점", "경북 경산시 하양읍 하양로37길 19", 120),
+    (2, "맘스터치 영남대점", "경북 경산시 대학로 300 1층", 80),
+    (3, "스타벅스 영남대점", "경북 경산시 청운로 16 1~3층 (대동)", 900),
+    (4, "스타벅스 경산중방DT점", "경북 경산시 경안로 222 (중방동)", 500),
+    (5, "카페봄봄 경일대점", "경북 경산시 하양읍 가마실길 46", 30),
+    (6, "맘스터치 대구경일대점", "경북 경산시 하양읍 가마실길 46", 40),
+    (7, "Cafe_100%", "경북 경산시 하양읍 하양로 100", 5),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PlaceIndex(ROWS)
+
+
+# --- 정규화 ---
+@pytest.mark.parametrize("name, expected", [
+    ("맘스터치 영대점", "맘스터치 영남대점"),
+    ("봉자막창 경산영대점", "봉자막창 경산영남대점"),
+    ("영남대학교 학생식당", "영남대 학생식당"),
+    ("스타벅스 경산중방DT점", "스타벅스 경산중방DT점"),
+])
+def test_normalize_place_name_applies_aliases(name, expected):
+    assert normalize_place_name(name) == expected
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("스타벅스 경산점", "스타벅스"),
+    ("맘스터치 영남대점", "맘스터치"),
+    ("교촌치킨 영대점", "교촌치킨"),
+    ("혼샤브 하양본점", "혼샤브 하양"),
+    ("경산 중앙식당", "중앙식당"),
+])
+def test_extract_core_name_drops_branch_and_region(name, expected):
+    assert extract_core_name(name) == expected
+
+
+def test_road_tokens_ignore_floor_and_detail():
+    assert clean_road_address("경북 경산시 대학로 300 1층") == "경북 경산시 대학로 300"
+    assert road_tokens("경북 경산시 대학로 300 1층") == road_tokens("경북 경산시 대학로 300") == "대학로 300"
+    assert road_tokens("경북 경산시 경안로 222 (중방동)") == "경안로 222"
+
+
+# --- LIKE 와 같은 결과 ---
+@pytest.mark.parametrize("name_text, address_text", [
+    ("bhc치킨", "하양로37길"),
+    ("BHC치킨 경산하양점", "경북 경산시 하양읍 하양로37길 19"),
+    ("스타벅스", "경북"),
+    ("맘스터치", "가마실길 46"),
+    ("경일대", "가마실길"),
+    ("_", "하양"),
+    ("100%", "하양로"),
+    ("Cafe_1", "100"),
+    ("스타벅스", "없는로"),
+])
+def test_first_matches_sqlite_like(index, name_text, address_text):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE mapinformation (id INTEGER PRIMARY KEY, name TEXT, address2 TEXT, reviewnum INTEGER)")
+    conn.executemany("INSERT INTO mapinformation VALUES (?, ?, ?, ?)", ROWS)
+    expected = conn.execute(
+        "SELECT id FROM mapinformation WHERE name LIKE ? AND address2 LIKE ? LIMIT 1",
+        (f"%{name_text}%", f"%{address_text}%"),
+    ).fetchone()
+    row = index.first(name_text, address_text)
+    assert (index.ids[row] if row is not None else None) == (expected[0] if expected else None)
+
+
+# --- 4단계 전략 ---
+@pytest.mark.parametrize("name, address, expected_id, expected_strategy", [
+    # 별칭(영대점 → 영남대점)을 적용한 정규화 이름 + 도로명 키 같음
+    ("맘스터치 영대점", "경북 경산시 대학로 300", 2, "exact"),
+    # 주소의 동 이름 괄호는 도로명 키에서 빠짐
+    ("스타벅스 경산중방DT점", "경북 경산시 경안로 222", 4, "exact"),
+    # 영문 대소문자만 다르면 LIKE 처럼 전략 1 에서 찾음
+    ("bhc치킨 경산하양점", "경북 경산시 하양읍 하양로37길 19", 1, 1),
+    # 핵심 이름 + 도로명
+    ("스타벅스 경산점", "경북 경산시 청운로 16", 3, 3),
+    # 같은 건물의 다른 가게가 아니라 이름이 가장 비슷한 곳
+    ("맘스터치 경일대점", "경북 경산시 하양읍 가마실길 46", 6, 4),
+    ("카페봄봄 경일대점", "경북 경산시 하양읍 가마실길 46", 5, "exact"),
+    ("없는식당", "경북 경산시 없는로 1", None, None),
+])
+def test_resolve_place_strategies(index, name, address, expected_id, expected_strategy):
+    row, strategy = resolve_place(index, name, clean_road_address(address))
+    assert (index.ids[row] if row is not None else None) == expected_id
+    assert strategy == expected_strategy
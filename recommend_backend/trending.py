@@ -0,0 +1,172 @@
+import sqlite3
+import sys
+from datetime import date, datetime
+from typing import NamedTuple
+
+# --- 최근 언급 수(트렌딩) 카운터 ---
+# prototype.py 가 게시물을 저장할 때 crawled_at 을 남기고, link_mentions.py 가 게시물을 식당과 연결하면서
+# 식당별 7/30/90일 언급 수(place_trending)와 그 바탕이 되는 일별 언급 수(place_mention_daily)를 함께 올립니다.
+# 하루가 지나 창 밖으로 나간 날짜의 언급 수는 일별 표에서 그 날짜만 골라 빼므로 게시물을 다시 세지 않습니다.
+# 서빙("trending" 가중치 프리셋)은 place_trending 을 place_id 로 읽기만 합니다.
+
+WINDOWS = (7, 30, 90)
+TRENDING_COLUMNS = tuple(f"mentions_{days}d" for days in WINDOWS)
+
+TRENDING_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS place_mention_daily (
+        place_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        mentions INTEGER NOT NULL,
+        PRIMARY KEY (place_id, day)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_place_mention_daily_day ON place_mention_daily (day)",
+    f"""CREATE TABLE IF NOT EXISTS place_trending (
+        place_id INTEGER PRIMARY KEY,
+        {', '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in TRENDING_COLUMNS)}
+    )""",
+    """CREATE TABLE IF NOT EXISTS trending_state (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )""",
+]
+
+TRENDING_EXISTS_QUERY = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'place_trending'"
+TRENDING_AS_OF_QUERY = "SELECT value FROM trending_state WHERE name = 'as_of_day'"
+
+# 점수에 쓰는 창별 가중치 (최근일수록 크게)
+WINDOW_WEIGHTS = {7: 1.0, 30: 0.3, 90: 0.1}
+
+
+class TrendCounts(NamedTuple):
+    mentions_7d: int = 0
+    mentions_30d: int = 0
+    mentions_90d: int = 0
+
+    @property
+    def score(self):
+        return sum(WINDOW_WEIGHTS[days] * count for days, count in zip(WINDOWS, self))
+
+
+def day_number(timestamp):
+    """'2024-05-01T12:30:00' 같은 시각 문자열(또는 date/datetime)의 날짜 번호, 없으면 None"""
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, (date, datetime)):
+        return timestamp.toordinal()
+    try:
+        return date.fromisoformat(str(timestamp)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def today_number():
+    return date.today().toordinal()
+
+
+def ensure_trending_tables(conn):
+    for statement in TRENDING_SCHEMA:
+        conn.execute(statement)
+
+
+def clear_trending(conn):
+    conn.execute("DELETE FROM place_mention_daily")
+    conn.execute("DELETE FROM place_trending")
+    conn.execute("DELETE FROM trending_state")
+
+
+def _as_of(conn):
+    row = conn.execute(TRENDING_AS_OF_QUERY).fetchone()
+    return row[0] if row else None
+
+
+def roll_windows(conn, today):
+    """카운터를 today 기준으로 옮깁니다: 지난 기준일 이후 창 밖으로 나간 날짜의 언급 수를 뺍니다"""
+    as_of = _as_of(conn)
+    if as_of is not None and today > as_of:
+        for days, column in zip(WINDOWS, TRENDING_COLUMNS):
+            # 창 [기준일 - days + 1, 기준일] 에서 [today - days + 1, today] 로 옮기며 빠지는 날짜: (as_of - days, today - days]
+            conn.execute(
+                f"""UPDATE place_trending SET {column} = {column} - (
+                        SELECT COALESCE(SUM(mentions), 0) FROM place_mention_daily d
+                        WHERE d.place_id = place_trending.place_id AND d.day > ? AND d.day <= ?)
+                    WHERE place_id IN (SELECT place_id FROM place_mention_daily WHERE day > ? AND day <= ?)""",
+                (as_of - days, today - days, as_of - days, today - days),
+            )
+        # 가장 긴 창보다 오래된 일별 행은 더 이상 필요 없습니다
+        conn.execute("DELETE FROM place_mention_daily WHERE day <= ?", (today - max(WINDOWS),))
+    if as_of is None or today > as_of:
+        conn.execute(
+            "INSERT INTO trending_state (name, value) VALUES ('as_of_day', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (today,),
+        )
+    return max(today, as_of or today)
+
+
+def record_mentions(conn, place_days, today):
+    """새 (place_id, 날짜 번호) 언급들을 일별 표와 창별 카운터에 더합니다. 더한 언급 수를 돌려줍니다"""
+    as_of = roll_windows(conn, today)
+    daily = {}
+    for place_id, day in place_days:
+        if day is None or day <= as_of - max(WINDOWS) or day > as_of:
+            continue
+        daily[(place_id, day)] = daily.get((place_id, day), 0) + 1
+    if not daily:
+        return 0
+
+    conn.executemany(
+        "INSERT INTO place_mention_daily (place_id, day, mentions) VALUES (?, ?, ?) "
+        "ON CONFLICT(place_id, day) DO UPDATE SET mentions = mentions + excluded.mentions",
+        [(place_id, day, count) for (place_id, day), count in daily.items()],
+    )
+    per_place = {}
+    for (place_id, day), count in daily.items():
+        totals = per_place.setdefault(place_id, [0] * len(WINDOWS))
+        for i, days in enumerate(WINDOWS):
+            if day > as_of - days:
+                totals[i] += count
+    assignments = ", ".join(f"{column} = {column} + excluded.{column}" for column in TRENDING_COLUMNS)
+    conn.executemany(
+        f"INSERT INTO place_trending (place_id, {', '.join(TRENDING_COLUMNS)}) VALUES (?, {', '.join('?' * len(WINDOWS))}) "
+        f"ON CONFLICT(place_id) DO UPDATE SET {assignments}",
+        [(place_id, *totals) for place_id, totals in per_place.items()],
+    )
+    return sum(daily.values())
+
+
+def build_trending_query(count):
+    return (f"SELECT place_id, {', '.join(TRENDING_COLUMNS)} FROM place_trending "
+            f"WHERE place_id IN ({','.join('?' * count)})")
+
+
+def build_expired_query(count):
+    """기준일 이후 창 밖으로 나간 날짜의 일별 언급 수 (서빙 시 카운터가 오래됐을 때만 사용)"""
+    return (f"SELECT place_id, day, mentions FROM place_mention_daily "
+            f"WHERE place_id IN ({','.join('?' * count)}) AND day <= ?")
+
+
+def adjust_expired(counters, expired_rows, as_of, today):
+    """as_of 기준 카운터에서 today 까지 창 밖으로 나간 언급 수를 뺀 TrendCounts"""
+    adjusted = {place_id: list(values) for place_id, values in counters.items()}
+    for place_id, day, mentions in expired_rows:
+        values = adjusted.get(place_id)
+        if values is None:
+            continue
+        for i, days in enumerate(WINDOWS):
+            if as_of - days < day <= today - days:
+                values[i] -= mentions
+    return {place_id: TrendCounts(*values) for place_id, values in adjusted.items()}
+
+
+# --- 직접 실행 시 카운터를 오늘 기준으로 옮기기 ---
+# 크롤링이 없는 날이 길어도 서빙은 일별 표로 보정하지만, 주기적으로 돌리면 보정 없이 바로 읽습니다.
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "finally.db"
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_trending_tables(conn)
+        roll_windows(conn, today_number())
+        conn.commit()
+        print(f"'{db_path}' 의 트렌딩 카운터를 {date.today()} 기준으로 옮겼습니다.")
+    finally:
+        conn.close()
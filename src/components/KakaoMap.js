@@ -418,6 +418,8 @@ const KakaoMap = forwardRef(({ distance = 1000, searchKeyword = '', searchCount
       let rankingPreference = 'distance';
       if (sortOption === 'sns') {
         rankingPreference = 'instagram';
+      } else if (sortOption === 'trending') {
+        rankingPreference = 'trending';
       } else if (sortOption === 'rating') {
         rankingPreference = 'reviews';
       } else if (sortOption === 'balanced') {
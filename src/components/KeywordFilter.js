@@ -42,6 +42,7 @@ const KeywordFilter = ({ place, updatePlace, onSearch }) => {
     const sortOptions = [
         { id: 'distance', name: '거리순', emoji: '📍' },
         { id: 'sns', name: 'SNS 인기순', emoji: '📱' },
+        { id: 'trending', name: '요즘 뜨는', emoji: '🔥' },
         { id: 'rating', name: '리뷰수', emoji: '📝' },
         { id: 'balanced', name: '종합점수', emoji: '⭐' }
     ];
@@ -577,6 +577,9 @@ const RouteCreationPage = () => {
                         {activePlace?.selectedSortOption === 'sns' && currentSearchResults.length > 0 && (
                             <span className="sort-indicator">📱 SNS 인기순</span>
                         )}
+                        {activePlace?.selectedSortOption === 'trending' && currentSearchResults.length > 0 && (
+                            <span className="sort-indicator">🔥 요즘 뜨는 순</span>
+                        )}
                         {activePlace?.selectedSortOption === 'rating' && currentSearchResults.length > 0 && (
                             <span className="sort-indicator">💬 리뷰수순</span>
                         )}